@@ -0,0 +1,55 @@
+
+import time
+import tracemalloc
+
+from shapely.geometry import Point, mapping
+
+from pygis.vec.geom import Geom
+
+###
+def constructions(
+  args: list,
+  repeat: int = 3 ) -> float:
+  """
+  Returns the best rate of `Geom` constructions per second over `repeat` runs.
+  """
+  best = 0.0
+  for _ in range( repeat ):
+    t = time.perf_counter()
+    for a in args:
+      Geom( a )
+    best = max( best, len( args ) / ( time.perf_counter() - t ) )
+  return best
+
+###
+def instance_bytes(
+  args: list ) -> float:
+  """
+  Returns the bytes allocated per `Geom`, excluding its input.
+  """
+  tracemalloc.start()
+  before = tracemalloc.get_traced_memory()[ 0 ]
+  geoms = [ Geom( a ) for a in args ]
+  after = tracemalloc.get_traced_memory()[ 0 ]
+  tracemalloc.stop()
+  return ( after - before ) / len( geoms )
+
+###
+def main(
+  n: int = 200000 ) -> None:
+  """
+  Measures `Geom` construction speed and size for each input type.
+  """
+  shapes = [ Point( i, i ) for i in range( n ) ]
+  inputs = {
+    'shapely': shapes,
+    'dict': [ mapping( s ) for s in shapes ],
+    'geojson': [ Geom( s ).geojson for s in shapes ],
+    'wkb': [ s.wkb for s in shapes ] }
+  for name, args in inputs.items():
+    print( f"{name:8} {constructions( args ):12.0f} geoms/s "
+      f"{instance_bytes( args ):8.1f} bytes/geom" )
+
+###
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,47 @@
+
+import random
+import time
+
+from shapely.geometry import Polygon, mapping, shape
+
+from pygis.vec.geom import reproject, reproject_batch
+
+###
+def parcels(
+  n: int,
+  seed: int = 0 ) -> list:
+  """
+  Returns `n` small random quadrilaterals in EPSG:4326.
+  """
+  rnd = random.Random( seed )
+  result = []
+  for _ in range( n ):
+    x = rnd.uniform( -96.0, -90.0 )
+    y = rnd.uniform( 40.0, 43.0 )
+    d = rnd.uniform( 0.001, 0.01 )
+    result.append( Polygon( ( ( x, y ), ( x + d, y ), ( x + d, y + d ), ( x, y + d ) ) ) )
+  return result
+
+###
+def main(
+  n: int = 20000 ) -> None:
+  """
+  Compares the per-geometry reprojection loop with `reproject_batch`.
+  """
+  gseq = parcels( n )
+
+  t = time.perf_counter()
+  loop = [ shape( reproject( mapping( g ), 4326, 3857 ) ) for g in gseq ]
+  t_loop = time.perf_counter() - t
+
+  t = time.perf_counter()
+  batch = reproject_batch( gseq, 4326, 3857 )
+  t_batch = time.perf_counter() - t
+
+  assert all( a.equals_exact( b, 1e-6 ) for a, b in zip( loop, batch ) )
+  print( f"loop:  {n / t_loop:12.0f} geoms/s" )
+  print( f"batch: {n / t_batch:12.0f} geoms/s ({t_loop / t_batch:.1f}x)" )
+
+###
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,288 @@
+
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+import fiona
+from shapely.geometry import GeometryCollection, LineString
+from shapely.geometry import Point, Polygon, mapping
+
+from pygis.vec.featcol import dataset_extract
+from pygis.vec.geom import Geom, build_geometry, collection_extract, multi
+from pygis.vec.geom import reproject, reproject_batch
+
+###
+SCALES = { 'small': 2000, 'medium': 20000, 'large': 200000 }
+
+###
+DRIVERS = {
+  'shp': ( 'ESRI Shapefile', '.shp' ),
+  'gpkg': ( 'GPKG', '.gpkg' ),
+  'geojson': ( 'GeoJSON', '.geojson' ) }
+
+###
+BASELINE = os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), 'baseline.json' )
+
+###
+# A case returns a fresh state from `setup` and the number of items
+# processed from `run( state )`
+Case = Tuple[ Callable[ [], Any ], Callable[ [ Any ], int ] ]
+
+################################################################################
+
+###
+def polygons(
+  n: int,
+  seed: int = 0 ) -> List[ Polygon ]:
+  """
+  Returns `n` random star-shaped polygons of 8 to 64 vertices in EPSG:4326.
+  """
+  rnd = random.Random( seed )
+  result = []
+  for _ in range( n ):
+    x = rnd.uniform( -96.0, -90.0 )
+    y = rnd.uniform( 40.0, 43.0 )
+    k = rnd.randint( 8, 64 )
+    ring = []
+    for j in range( k ):
+      a = 2.0 * math.pi * j / k
+      r = rnd.uniform( 0.002, 0.01 )
+      ring.append( ( x + r * math.cos( a ), y + r * math.sin( a ) ) )
+    result.append( Polygon( ring ) )
+  return result
+
+###
+def collections(
+  shapes: List[ Polygon ],
+  seed: int = 0 ) -> List[ GeometryCollection ]:
+  """
+  Wraps groups of polygons with points, lines and nested collections.
+  """
+  rnd = random.Random( seed )
+  result = []
+  for i in range( 0, len( shapes ), 4 ):
+    polys = shapes[ i : i + 4 ]
+    c = polys[ 0 ].centroid
+    nested = GeometryCollection( polys[ 1: ] + [ Point( c.x, c.y ) ] )
+    line = LineString( [ ( c.x, c.y ), ( c.x + rnd.random() * 0.01, c.y ) ] )
+    result.append( GeometryCollection( [ polys[ 0 ], line, nested ] ) )
+  return result
+
+###
+def write_dataset(
+  path: str,
+  shapes: List[ Polygon ],
+  driver: str ) -> None:
+  """
+  """
+  schema = { 'geometry': 'Polygon',
+    'properties': { 'id': 'int', 'name': 'str:16', 'value': 'float' } }
+  with fiona.open( path, 'w', driver = driver, schema = schema, crs = 'EPSG:4326' ) as sink:
+    sink.writerecords( {
+      'geometry': mapping( s ),
+      'properties': { 'id': i, 'name': f"feat{i}", 'value': i * 0.5 } }
+      for i, s in enumerate( shapes ) )
+
+################################################################################
+
+###
+def geom_cases(
+  shapes: List[ Polygon ] ) -> Dict[ str, Case ]:
+  """
+  `Geom` construction from each input type and every representation
+  transition.
+  """
+  inputs = {
+    'shape': shapes,
+    'dict': [ mapping( s ) for s in shapes ],
+    'geojson': [ Geom( s ).geojson for s in shapes ],
+    'wkb': [ s.wkb for s in shapes ] }
+  cases = {}
+
+  for src, args in inputs.items():
+    cases[ f"geom.init.{src}" ] = (
+      lambda args = args: args,
+      lambda args: len( [ Geom( a ) for a in args ] ) )
+
+    for dst in inputs:
+      if dst == src:
+        continue
+      cases[ f"geom.{src}->{dst}" ] = (
+        lambda args = args: [ Geom( a ) for a in args ],
+        lambda geoms, dst = dst: len( [ getattr( g, dst ) for g in geoms ] ) )
+
+  return cases
+
+###
+def op_cases(
+  shapes: List[ Polygon ] ) -> Dict[ str, Case ]:
+  """
+  `multi`, `build_geometry`, `collection_extract` and `reproject`.
+  """
+  gcs = collections( shapes )
+  groups = [ shapes[ i : i + 4 ] for i in range( 0, len( shapes ), 4 ) ]
+  dicts = [ mapping( s ) for s in shapes ]
+  return {
+    'multi': (
+      lambda: shapes,
+      lambda gseq: len( [ multi( g ) for g in gseq ] ) ),
+    'build_geometry': (
+      lambda: groups,
+      lambda groups: len( [ build_geometry( g ) for g in groups ] ) ),
+    'collection_extract': (
+      lambda: gcs,
+      lambda gseq: len( [ collection_extract( g, 'Polygon' ) for g in gseq ] ) ),
+    'reproject.each': (
+      lambda: dicts,
+      lambda dseq: len( [ reproject( d, 4326, 3857 ) for d in dseq ] ) ),
+    'reproject.batch': (
+      lambda: shapes,
+      lambda gseq: len( reproject_batch( gseq, 4326, 3857 ) ) ) }
+
+###
+def extract_cases(
+  paths: Dict[ str, str ] ) -> Dict[ str, Case ]:
+  """
+  `dataset_extract` end to end, with and without reprojection.
+  """
+  cases = {}
+  for fmt, path in paths.items():
+    cases[ f"extract.{fmt}" ] = (
+      lambda path = path: path,
+      lambda path: len( dataset_extract( path, 'Polygon' ) ) )
+    cases[ f"extract.{fmt}.3857" ] = (
+      lambda path = path: path,
+      lambda path: len( dataset_extract( path, 'Polygon', dst_srid = 3857 ) ) )
+  return cases
+
+################################################################################
+
+###
+def measure(
+  case: Case,
+  repeat: int = 3 ) -> Dict[ str, float ]:
+  """
+  Returns the best throughput over `repeat` runs and the peak Python heap
+  of one more traced run. Setup is excluded from both, allocations made by
+  GEOS or GDAL are not seen by `tracemalloc`.
+  """
+  setup, run = case
+  rate = 0.0
+  for _ in range( repeat ):
+    state = setup()
+    t = time.perf_counter()
+    count = run( state )
+    rate = max( rate, count / max( time.perf_counter() - t, 1e-9 ) )
+
+  state = setup()
+  tracemalloc.start()
+  run( state )
+  peak = tracemalloc.get_traced_memory()[ 1 ]
+  tracemalloc.stop()
+  return { 'rate': rate, 'peak': peak }
+
+###
+def compare(
+  results: Dict[ str, Dict[ str, float ] ],
+  baseline: Dict[ str, Dict[ str, float ] ],
+  tolerance: float ) -> List[ str ]:
+  """
+  Returns the cases that are slower, or use more memory, than the baseline
+  by more than `tolerance`.
+  """
+  regressions = []
+  for name, res in results.items():
+    base = baseline.get( name )
+    if base is None:
+      continue
+    if res[ 'rate' ] < base[ 'rate' ] * ( 1.0 - tolerance ) \
+      or res[ 'peak' ] > base[ 'peak' ] * ( 1.0 + tolerance ):
+      regressions.append( name )
+  return regressions
+
+###
+def main() -> int:
+  """
+  Runs the suite, prints throughput and peak memory per case and compares
+  with the stored baseline. Returns 1 if any case regressed or has no
+  baseline, 2 if there is no baseline for the scale at all. Baselines are
+  per machine, record one before making changes with
+    python -m bench.suite --scale small --save
+  from the repository root, then check for regressions with
+    python -m bench.suite --scale small
+  """
+  parser = argparse.ArgumentParser( description = 'pygis.vec benchmark suite',
+    epilog = 'Record a baseline on this machine with --save before comparing against it.' )
+  parser.add_argument( '--scale', choices = SCALES, default = 'small' )
+  parser.add_argument( '--repeat', type = int, default = 3 )
+  parser.add_argument( '--filter', default = '', help = 'only run cases containing this' )
+  parser.add_argument( '--baseline', default = BASELINE )
+  parser.add_argument( '--save', action = 'store_true', help = 'store results as the baseline' )
+  parser.add_argument( '--tolerance', type = float, default = 0.2 )
+  parser.add_argument( '--data-dir', help = 'keep generated datasets here' )
+  args = parser.parse_args()
+
+  baseline = {}
+  if os.path.exists( args.baseline ):
+    with open( args.baseline ) as f:
+      baseline = json.load( f ).get( args.scale, {} )
+  if not baseline and not args.save:
+    print( f"no baseline for scale {args.scale} in {args.baseline}, record one with --save",
+      file = sys.stderr )
+    return 2
+
+  n = SCALES[ args.scale ]
+  shapes = polygons( n )
+  data_dir = args.data_dir or tempfile.mkdtemp( prefix = 'pygis-bench' )
+  try:
+    paths = {}
+    for fmt, ( driver, ext ) in DRIVERS.items():
+      path = paths[ fmt ] = os.path.join( data_dir, f"{args.scale}{ext}" )
+      if not os.path.exists( path ):
+        write_dataset( path, shapes, driver )
+
+    cases = { **geom_cases( shapes ), **op_cases( shapes ), **extract_cases( paths ) }
+
+    results = {}
+    for name, case in cases.items():
+      if args.filter not in name:
+        continue
+      res = results[ name ] = measure( case, args.repeat )
+      line = f"{name:24} {res[ 'rate' ]:12.0f} /s {res[ 'peak' ] / 2**20:9.2f} MiB"
+      base = baseline.get( name )
+      if base is not None:
+        line += f"  {res[ 'rate' ] / base[ 'rate' ]:6.2f}x {res[ 'peak' ] / max( base[ 'peak' ], 1 ):6.2f}x mem"
+      print( line, flush = True )
+  finally:
+    if args.data_dir is None:
+      shutil.rmtree( data_dir, ignore_errors = True )
+
+  if args.save:
+    stored = {}
+    if os.path.exists( args.baseline ):
+      with open( args.baseline ) as f:
+        stored = json.load( f )
+    stored.setdefault( args.scale, {} ).update( results )
+    with open( args.baseline, 'w' ) as f:
+      json.dump( stored, f, indent = 2, sort_keys = True )
+    return 0
+
+  regressions = compare( results, baseline, args.tolerance )
+  for name in regressions:
+    print( f"regression: {name}", file = sys.stderr )
+  missing = [ name for name in results if name not in baseline ]
+  for name in missing:
+    print( f"no baseline: {name}", file = sys.stderr )
+  return 1 if regressions or missing else 0
+
+###
+if __name__ == '__main__':
+  sys.exit( main() )
@@ -0,0 +1,616 @@
+
+import glob
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import shutil
+import tempfile
+from contextlib import nullcontext
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import fiona
+
+import numpy as np
+
+import shapely
+
+from .featcol import CHUNK_SIZE, GTYPES, FeatPair, ValidationReport
+from .featcol import dataset_filter, dataset_schema, dataset_srid, extract_records
+from .featcol import open_dataset, property_columns
+from .geom import Geom
+
+###
+CACHE_VERSION = 2
+
+###
+def cache_path(
+  cache_dir: str,
+  dataset: str,
+  **options ) -> str:
+  """
+  Returns the cache directory for a dataset extracted with `options`.
+  The key covers the absolute path, size and mtime of the dataset and of
+  its sidecar files (.dbf, .shx, ...), so any change to the source maps to
+  a new entry.
+  """
+  dataset = os.path.abspath( dataset )
+  stem = os.path.splitext( dataset )[ 0 ]
+  files = sorted( set( glob.glob( glob.escape( stem ) + '.*' ) ) | { dataset } )
+  stats = []
+  for f in files:
+    st = os.stat( f )
+    stats.append( ( f, st.st_size, st.st_mtime_ns ) )
+
+  key = json.dumps( [ CACHE_VERSION, stats, sorted( options.items() ) ], default = str )
+  digest = hashlib.blake2b( key.encode(), digest_size = 16 ).hexdigest()
+  return os.path.join( cache_dir, digest )
+
+################################################################################
+
+###
+class CacheWriter:
+  """
+  Writes extracted features to a cache directory:
+    wkb.bin      concatenated WKB blobs
+    offsets.npy  int64 offsets of each blob, n + 1 entries
+    col<i>.*     one column per property field, see `_save_column`
+    <name>.npy   arrays added with `attach`
+    meta.json    field names and column kinds, srid, feature count,
+                 validation report and `extra` metadata
+  Everything is written to a temporary directory that replaces `path` on a
+  clean exit, an exception (or an abandoned generator) discards it.
+  """
+
+  ###
+  def __init__(
+    self: 'CacheWriter',
+    path: str,
+    schema: Optional[ Dict[ str, Any ] ],
+    srid: int,
+    report: Optional[ ValidationReport ] = None,
+    extra: Optional[ Dict[ str, Any ] ] = None ) -> None:
+    """
+    `report` is read when the entry is committed, so it may keep filling
+    while chunks are written.
+    """
+    self.path = path
+    self.schema = schema
+    self.srid = srid
+    self.report = report
+    self.extra = extra or {}
+    self.__tmp = None
+    self.__wkb = None
+    self.__offsets = [ np.zeros( 1, dtype = np.int64 ) ]
+    self.__columns = []
+    self.__size = 0
+
+  ###
+  def __enter__(
+    self: 'CacheWriter' ) -> 'CacheWriter':
+    """
+    """
+    parent = os.path.dirname( self.path )
+    os.makedirs( parent, exist_ok = True )
+    self.__tmp = tempfile.mkdtemp( dir = parent, prefix = '.tmp' )
+    self.__wkb = open( os.path.join( self.__tmp, 'wkb.bin' ), 'wb' )
+    return self
+
+  ###
+  def __exit__(
+    self: 'CacheWriter',
+    exc_type, exc, tb ) -> None:
+    """
+    """
+    self.__wkb.close()
+    if exc_type is None:
+      self.__commit()
+    else:
+      shutil.rmtree( self.__tmp, ignore_errors = True )
+
+  ###
+  def write(
+    self: 'CacheWriter',
+    chunk: List[ FeatPair ] ) -> None:
+    """
+    Appends a chunk of (properties, geometry) pairs.
+    """
+    if not chunk:
+      return
+    if self.schema is None:
+      self.schema = { 'properties': dict.fromkeys( chunk[ 0 ][ 0 ], 'str' ) }
+
+    blobs = shapely.to_wkb( [ g for _, g in chunk ] )
+    sizes = np.fromiter( ( 0 if b is None else len( b ) for b in blobs ),
+      dtype = np.int64, count = len( blobs ) )
+    self.__wkb.write( b''.join( b for b in blobs if b is not None ) )
+    self.__offsets.append( self.__size + np.cumsum( sizes ) )
+    self.__size += int( sizes.sum() )
+    self.__columns.append( property_columns( [ p for p, _ in chunk ], self.schema ) )
+
+  ###
+  def copy(
+    self: 'CacheWriter',
+    reader: 'CacheReader',
+    rows: Sequence[ int ] ) -> None:
+    """
+    Appends features of another entry, WKB blobs are copied as they are,
+    without decoding. The entry must have the same fields.
+    """
+    rows = np.asarray( rows, dtype = np.int64 )
+    if not len( rows ):
+      return
+    sizes = reader.offsets[ rows + 1 ] - reader.offsets[ rows ]
+    self.__wkb.write( b''.join( reader.wkb( i ) or b'' for i in rows.tolist() ) )
+    self.__offsets.append( self.__size + np.cumsum( sizes ) )
+    self.__size += int( sizes.sum() )
+    self.__columns.append( { name: col[ rows ] for name, col in reader.columns.items() } )
+
+  ###
+  def attach(
+    self: 'CacheWriter',
+    name: str,
+    array: np.ndarray ) -> None:
+    """
+    Stores an extra array with the entry, see `CacheReader.array`.
+    """
+    np.save( os.path.join( self.__tmp, f"{name}.npy" ), array )
+
+  ###
+  def __commit(
+    self: 'CacheWriter' ) -> None:
+    """
+    """
+    offsets = np.concatenate( self.__offsets )
+    np.save( os.path.join( self.__tmp, 'offsets.npy' ), offsets )
+
+    fields = list( self.schema[ 'properties' ] ) if self.schema else []
+    kinds = []
+    for i, name in enumerate( fields ):
+      col = np.concatenate( [ c[ name ] for c in self.__columns ] ) \
+        if self.__columns else np.empty( 0, dtype = object )
+      kinds.append( _save_column( os.path.join( self.__tmp, f"col{i}" ), col ) )
+
+    report = self.report or ValidationReport()
+    with open( os.path.join( self.__tmp, 'meta.json' ), 'w' ) as f:
+      json.dump( {
+        'version': CACHE_VERSION,
+        'fields': fields,
+        'columns': kinds,
+        'srid': self.srid,
+        'count': len( offsets ) - 1,
+        'repaired': report.repaired,
+        'dropped': report.dropped,
+        'extra': self.extra }, f )
+
+    shutil.rmtree( self.path, ignore_errors = True )
+    os.replace( self.__tmp, self.path )
+
+###
+def _save_column(
+  stem: str,
+  col: np.ndarray ) -> str:
+  """
+  Saves a property column under `stem` and returns its kind:
+    array   typed values in <stem>.npy
+    masked  typed values in <stem>.npy, nulls in <stem>.null.npy
+    text    strings as a UTF-8 blob <stem>.bin, their n + 1 offsets in
+            <stem>.npy and nulls in <stem>.null.npy
+  None of them is pickled, so every column can be memory-mapped.
+  """
+  if col.dtype != object:
+    np.save( stem + '.npy', col )
+    return 'array'
+
+  nulls = np.fromiter( ( v is None for v in col ), dtype = np.bool_, count = len( col ) )
+  np.save( stem + '.null.npy', nulls )
+  values = col[ ~nulls ].tolist()
+  if all( isinstance( v, str ) for v in values ):
+    blobs = [ b'' if v is None else v.encode( 'utf-8' ) for v in col.tolist() ]
+    sizes = np.fromiter( map( len, blobs ), dtype = np.int64, count = len( blobs ) )
+    np.save( stem + '.npy', np.concatenate( ( np.zeros( 1, dtype = np.int64 ), np.cumsum( sizes ) ) ) )
+    with open( stem + '.bin', 'wb' ) as f:
+      f.write( b''.join( blobs ) )
+    return 'text'
+
+  if all( isinstance( v, ( bool, int, float ) ) for v in values ):
+    typed = np.array( values )
+    out = np.zeros( len( col ), dtype = typed.dtype )
+    out[ ~nulls ] = typed
+    np.save( stem + '.npy', out )
+    return 'masked'
+
+  bad = next( v for v in values if not isinstance( v, ( str, bool, int, float ) ) )
+  raise TypeError( f"CacheWriter: unsupported property value ({type( bad ).__name__})" )
+
+###
+def _map_file(
+  path: str ) -> Optional[ mmap.mmap ]:
+  """
+  Memory-maps a file read-only, `None` if it is empty.
+  """
+  if not os.path.getsize( path ):
+    return None
+  with open( path, 'rb' ) as f:
+    return mmap.mmap( f.fileno(), 0, access = mmap.ACCESS_READ )
+
+###
+class _MaskedColumn:
+  """
+  A mapped typed column with nulls, indexing returns object arrays.
+  """
+
+  ###
+  def __init__(
+    self: '_MaskedColumn',
+    values: np.ndarray,
+    nulls: np.ndarray ) -> None:
+    """
+    """
+    self.values = values
+    self.nulls = nulls
+
+  ###
+  def __len__(
+    self: '_MaskedColumn' ) -> int:
+    """
+    """
+    return len( self.values )
+
+  ###
+  def __getitem__(
+    self: '_MaskedColumn',
+    key: Any ) -> np.ndarray:
+    """
+    `key` is a slice or an array of rows.
+    """
+    out = self.values[ key ].astype( object )
+    out[ self.nulls[ key ] ] = None
+    return out
+
+###
+class _TextColumn:
+  """
+  A mapped string column, indexing decodes the selected rows only and
+  returns object arrays.
+  """
+
+  ###
+  def __init__(
+    self: '_TextColumn',
+    offsets: np.ndarray,
+    blob: Optional[ mmap.mmap ],
+    nulls: np.ndarray ) -> None:
+    """
+    """
+    self.offsets = offsets
+    self.blob = blob
+    self.nulls = nulls
+
+  ###
+  def __len__(
+    self: '_TextColumn' ) -> int:
+    """
+    """
+    return len( self.nulls )
+
+  ###
+  def __getitem__(
+    self: '_TextColumn',
+    key: Any ) -> np.ndarray:
+    """
+    `key` is a slice or an array of rows.
+    """
+    rows = np.arange( len( self ) )[ key ]
+    starts = self.offsets[ rows ].tolist()
+    stops = self.offsets[ rows + 1 ].tolist()
+    out = np.empty( len( rows ), dtype = object )
+    out[ : ] = [ None if null else self.blob[ a : b ].decode( 'utf-8' ) if b > a else ''
+      for a, b, null in zip( starts, stops, self.nulls[ rows ].tolist() ) ]
+    return out
+
+################################################################################
+
+###
+class CacheReader:
+  """
+  Memory-maps a cache directory written by `CacheWriter`.
+  WKB blobs and property columns, strings included, are read straight
+  from the mapped files, nothing is decoded until a feature is accessed.
+  Use it as a context manager or `close` it to release the mappings.
+  """
+
+  ###
+  def __init__(
+    self: 'CacheReader',
+    path: str ) -> None:
+    """
+    """
+    with open( os.path.join( path, 'meta.json' ) ) as f:
+      meta = json.load( f )
+    self.path = path
+    self.srid = meta[ 'srid' ]
+    self.count = meta[ 'count' ]
+    self.report = ValidationReport( meta[ 'repaired' ], meta[ 'dropped' ] )
+    self.extra = meta.get( 'extra', {} )
+    self.offsets = np.load( os.path.join( path, 'offsets.npy' ), mmap_mode = 'r' )
+    self.__mmap = _map_file( os.path.join( path, 'wkb.bin' ) )
+    self.__blobs = []
+    self.columns = {}
+    for i, ( name, kind ) in enumerate( zip( meta[ 'fields' ], meta[ 'columns' ] ) ):
+      stem = os.path.join( path, f"col{i}" )
+      values = np.load( stem + '.npy', mmap_mode = 'r' )
+      if kind == 'array':
+        self.columns[ name ] = values
+        continue
+      nulls = np.load( stem + '.null.npy', mmap_mode = 'r' )
+      if kind == 'masked':
+        self.columns[ name ] = _MaskedColumn( values, nulls )
+      else:
+        blob = _map_file( stem + '.bin' )
+        self.__blobs.append( blob )
+        self.columns[ name ] = _TextColumn( values, blob, nulls )
+
+  ###
+  def __enter__(
+    self: 'CacheReader' ) -> 'CacheReader':
+    """
+    """
+    return self
+
+  ###
+  def __exit__(
+    self: 'CacheReader',
+    exc_type, exc, tb ) -> None:
+    """
+    """
+    self.close()
+
+  ###
+  def close(
+    self: 'CacheReader' ) -> None:
+    """
+    Releases the mapped files, the reader cannot be used afterwards.
+    """
+    for blob in [ self.__mmap ] + self.__blobs:
+      if blob is not None:
+        blob.close()
+    self.__mmap = None
+    self.__blobs = []
+    self.columns = {}
+
+  ###
+  @staticmethod
+  def exists(
+    path: str ) -> bool:
+    """
+    Whether `path` holds an entry written by this version.
+    """
+    try:
+      with open( os.path.join( path, 'meta.json' ) ) as f:
+        return json.load( f ).get( 'version' ) == CACHE_VERSION
+    except FileNotFoundError:
+      return False
+
+  ###
+  def __len__(
+    self: 'CacheReader' ) -> int:
+    """
+    """
+    return self.count
+
+  ###
+  def array(
+    self: 'CacheReader',
+    name: str ) -> np.ndarray:
+    """
+    Memory-maps an array stored with `CacheWriter.attach`.
+    """
+    return np.load( os.path.join( self.path, f"{name}.npy" ), mmap_mode = 'r' )
+
+  ###
+  def wkb(
+    self: 'CacheReader',
+    i: int ) -> Optional[ bytes ]:
+    """
+    """
+    start, stop = self.offsets[ i ], self.offsets[ i + 1 ]
+    return self.__mmap[ start : stop ] if stop > start else None
+
+  ###
+  def geom(
+    self: 'CacheReader',
+    i: int ) -> Optional[ Geom ]:
+    """
+    Returns a `Geom` holding only the WKB of feature `i`.
+    """
+    wkb = self.wkb( i )
+    return None if wkb is None else Geom( wkb, srid = self.srid )
+
+  ###
+  def chunk(
+    self: 'CacheReader',
+    start: int,
+    stop: int ) -> List[ FeatPair ]:
+    """
+    Decodes features [start, stop) into (properties, geometry) pairs.
+    """
+    stop = min( stop, self.count )
+    geoms = shapely.from_wkb( [ self.wkb( i ) for i in range( start, stop ) ] ).tolist()
+    values = [ col[ start : stop ].tolist() for col in self.columns.values() ]
+    names = list( self.columns )
+    props = [ dict( zip( names, row ) ) for row in zip( *values ) ] \
+      if names else [ {} for _ in geoms ]
+    return list( zip( props, geoms ) )
+
+  ###
+  def chunks(
+    self: 'CacheReader',
+    chunk_size: int = CHUNK_SIZE ) -> Iterator[ List[ FeatPair ] ]:
+    """
+    """
+    for start in range( 0, self.count, chunk_size ):
+      yield self.chunk( start, start + chunk_size )
+
+################################################################################
+
+###
+class ChangeReport:
+  """
+  Feature ids inserted, modified and deleted since the previous run of
+  `extract_incremental`, and the number of unchanged features.
+  """
+
+  ###
+  def __init__(
+    self: 'ChangeReport',
+    inserted: Iterable[ Any ] = (),
+    modified: Iterable[ Any ] = (),
+    deleted: Iterable[ Any ] = (),
+    unchanged: int = 0 ) -> None:
+    """
+    """
+    self.inserted = list( inserted )
+    self.modified = list( modified )
+    self.deleted = list( deleted )
+    self.unchanged = unchanged
+
+  ###
+  def __bool__(
+    self: 'ChangeReport' ) -> bool:
+    """
+    """
+    return bool( self.inserted or self.modified or self.deleted )
+
+###
+def fingerprint(
+  record: fiona.Feature ) -> bytes:
+  """
+  Returns a 16 byte digest of the geometry and properties of a record,
+  computed from the coordinates as read, before any decoding.
+  """
+  token = ( _geometry_token( record.geometry ), tuple( record.properties.items() ) )
+  return hashlib.blake2b( pickle.dumps( token, pickle.HIGHEST_PROTOCOL ), digest_size = 16 ).digest()
+
+###
+def _geometry_token(
+  geom: Optional[ fiona.Geometry ] ) -> Any:
+  """
+  """
+  if geom is None:
+    return None
+  if geom.type == 'GeometryCollection':
+    return ( geom.type, [ _geometry_token( g ) for g in geom.geometries ] )
+  return ( geom.type, geom.coordinates )
+
+###
+def extract_incremental(
+  dataset: str,
+  gtype: str,
+  path: str,
+  dst_srid: int = 0,
+  chunk_size: int = CHUNK_SIZE,
+  invalid: str = 'fail',
+  repair: str = 'make_valid',
+  where: Optional[ str ] = None,
+  columns: Optional[ Sequence[ str ] ] = None ) -> ChangeReport:
+  """
+  Extracts a dataset into the cache entry at `path`, like `iter_dataset`
+  does, re-processing only the features that changed since the entry was
+  written. Each record is fingerprinted by its id and a digest of its
+  coordinates and properties (`fingerprint`). Unchanged records are
+  copied from the previous entry as they are, new and modified ones are
+  decoded, reprojected and validated, the entry is then replaced. Read
+  the result with `CacheReader( path )`, features are in source order and
+  the validation report covers the whole dataset.
+
+  An entry written with other options, or from a dataset with another
+  schema or srid, is rebuilt from scratch. Returns the changes.
+  """
+  if gtype is not None and gtype not in GTYPES:
+    raise ValueError( f"extract_incremental: unknown geometry type ({gtype})" )
+  opts = { 'gtype': gtype, 'invalid': invalid, 'repair': repair }
+  if where is not None:
+    opts[ 'where' ] = where
+  if columns is not None:
+    opts[ 'columns' ] = list( columns )
+
+  prev = CacheReader( path ) if CacheReader.exists( path ) else None
+  with nullcontext() if prev is None else prev, open_dataset( dataset, opts ) as source:
+    schema = dataset_schema( source, opts )
+    src_srid = dataset_srid( source )
+    if dst_srid == 0:
+      dst_srid = src_srid
+    key = json.dumps( [ CACHE_VERSION, src_srid, dst_srid,
+      schema[ 'properties' ], sorted( opts.items() ) ], default = str )
+
+    # Fingerprints of the previous run: digest and output row (-1 if the
+    # feature was dropped) by feature id
+    known = {}
+    repaired = dropped = set()
+    if prev is not None and prev.extra.get( 'key' ) == key:
+      blob = prev.array( 'digests' ).tobytes()
+      known = { fid: ( blob[ 16 * i : 16 * i + 16 ], row ) for i, ( fid, row ) in
+        enumerate( zip( prev.array( 'fids' ).tolist(), prev.array( 'rows' ).tolist() ) ) }
+      repaired = set( prev.report.repaired )
+      dropped = set( prev.report.dropped )
+
+    changes = ChangeReport()
+    local = ValidationReport()
+    fids = []
+    digests = []
+    rows = []
+    filters = dataset_filter( src_srid, dst_srid, opts )
+    records = source.filter( **filters ) if filters else iter( source )
+    with CacheWriter( path, schema, dst_srid, local, { 'key': key } ) as writer:
+      count = 0
+      while True:
+        chunk = list( islice( records, chunk_size ) )
+        if not chunk:
+          break
+
+        # Split the chunk into runs of records to process (None) and of
+        # previous rows to copy, keeping source order
+        runs = []
+        for rec in chunk:
+          digest = fingerprint( rec )
+          fids.append( rec.id )
+          digests.append( digest )
+          old = known.pop( rec.id, None )
+          if old is not None and old[ 0 ] == digest:
+            changes.unchanged += 1
+            item = old[ 1 ]
+            if rec.id in repaired:
+              local.repaired.append( rec.id )
+            elif rec.id in dropped:
+              local.dropped.append( rec.id )
+          else:
+            ( changes.inserted if old is None else changes.modified ).append( rec.id )
+            item = rec
+          if runs and isinstance( item, int ) == isinstance( runs[ -1 ][ 0 ], int ):
+            runs[ -1 ].append( item )
+          else:
+            runs.append( [ item ] )
+
+        for run in runs:
+          if isinstance( run[ 0 ], int ):
+            old = np.array( run, dtype = np.int64 )
+            new = count + np.cumsum( old >= 0 ) - 1
+            rows.extend( np.where( old >= 0, new, -1 ).tolist() )
+            writer.copy( prev, old[ old >= 0 ] )
+            count += int( ( old >= 0 ).sum() )
+          else:
+            ids, pairs = extract_records( run, src_srid, dst_srid, opts, local )
+            new = dict( zip( ids, range( count, count + len( ids ) ) ) )
+            rows.extend( new.get( rec.id, -1 ) for rec in run )
+            writer.write( pairs )
+            count += len( pairs )
+
+      changes.deleted = list( known )
+      writer.attach( 'fids', np.array( fids, dtype = str ) )
+      writer.attach( 'digests', np.frombuffer( b''.join( digests ), dtype = np.uint8 ) )
+      writer.attach( 'rows', np.array( rows, dtype = np.int64 ) )
+
+  return changes
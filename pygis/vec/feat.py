@@ -1,86 +1,151 @@
 
-import copy
-from functools import singledispatch
+from collections.abc import Mapping
 import json
-from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple, Union
 
-import fiona
-from fiona.crs import from_epsg
+from shapely.geometry.base import BaseGeometry
 
-import shapely
-from shapely.geometry.base import BaseGeometry, BaseMultipartGeometry
-
-import geom
+from .geom import Geom, dualmethod
 
 ###
 class Feat:
-"""
-"""
-  ###
-  def __init__(
-    self,
-    arg = None ) -> None:
   """
+  A feature: a `Geom` together with its properties.
   """
-    # Initialize geometry
-    init_registry = self.__init.registry
-    self.__init = singledispatch( init_registry[ object ] )
-    self.__init.register( ( dict, BaseGeometry ), self.__init_from_featpair )
-    self.__init.register( BaseGeometry, self.__init_from_shapely )
-    self.__init.register( dict, self.__init_from_dict )
-    self.__init.register( str, self.__init_from_geojson )
-    self.__geom = None
-    self.__dict = None
-    self.__geojson = None
-    self.__init( arg )
-
-    # Initialize other vars
-    self.meta = col.meta
-    self.srid = int( ''.join( filter( str.isdigit, col.meta[ 'crs' ][ 'init' ] ) ) )
-
-    # Hacky ¯\_(ツ)_/¯
-    self.reproject = self.__reproject
-
-  ###
-  @singledispatch
-  def __init(
+
+  ###
+  __slots__ = ( 'props', 'geom' )
+
+  ###
+  def __init__(
     self: 'Feat',
-    arg: Union[] ) -> None:
+    arg = None,
+    srid: int = 4326 ) -> None:
+    """
+    """
+    # Initialize geometry
+    self.props = {}
+    self.geom = None
+    try:
+      init = self.__inits[ arg.__class__ ]
+    except KeyError:
+      init = self.__resolve( arg.__class__ )
+    init( self, arg, srid )
+
+  ###
+  @classmethod
+  def __resolve(
+    cls: 'Feat',
+    argtype: type ) -> Callable:
     """
+    Finds the initializer for `argtype` along its MRO and caches it in the
+    class-level dispatch table.
     """
-    raise TypeError( f"{type( arg )} not supported." )
+    for base in argtype.__mro__:
+      if base in cls.__inits:
+        init = cls.__inits[ argtype ] = cls.__inits[ base ]
+        return init
+    raise TypeError( f"{argtype} not supported." )
 
   ###
   def __init_from_featpair(
     self: 'Feat',
-    arg: ( Dict[ str, Any ], BaseGeometry ) ) -> None:
+    arg: Tuple[ Dict[ str, Any ], Any ],
+    srid: int ) -> None:
     """
+    A (properties, geometry) pair as returned by `dataset_extract`,
+    the geometry may be anything `Geom` accepts, a `Geom` or `None`.
     """
-    self.__geom = arg
+    props, geom = arg
+    self.props = props
+    if geom is None or isinstance( geom, Geom ):
+      self.geom = geom
+    else:
+      self.geom = Geom( geom, srid = srid )
 
   ###
   def __init_from_shapely(
     self: 'Feat',
-    arg: BaseGeometry ) -> None:
+    arg: BaseGeometry,
+    srid: int ) -> None:
     """
     """
-    self.__geom = arg
+    self.geom = Geom( arg, srid = srid )
+
+  ###
+  def __init_from_geom(
+    self: 'Feat',
+    arg: Geom,
+    srid: int ) -> None:
+    """
+    """
+    self.geom = arg
 
   ###
   def __init_from_dict(
     self: 'Feat',
-    arg: Dict[ str, Any ] ) -> None:
+    arg: Dict[ str, Any ],
+    srid: int ) -> None:
     """
+    A GeoJSON-like feature mapping.
     """
-    self.__dict = arg
+    self.props = dict( arg.get( 'properties' ) or {} )
+    geom = arg.get( 'geometry' )
+    if geom is not None:
+      self.geom = Geom( dict( geom ), srid = srid )
 
   ###
   def __init_from_geojson(
-    self: 'Geom',
-    arg: str ) -> None:
+    self: 'Feat',
+    arg: str,
+    srid: int ) -> None:
     """
     """
-    self.__geojson = arg
+    self.__init_from_dict( json.loads( arg ), srid )
+
+  ###
+  __inits = {
+    tuple: __init_from_featpair,
+    BaseGeometry: __init_from_shapely,
+    Geom: __init_from_geom,
+    dict: __init_from_dict,
+    str: __init_from_geojson }
+
+  ###
+  def __getitem__(
+    self: 'Feat',
+    key: str ) -> Any:
+    """
+    """
+    return self.props[ key ]
+
+  ###
+  @property
+  def srid(
+    self: 'Feat' ) -> Optional[ int ]:
+    """
+    """
+    return None if self.geom is None else self.geom.srid
+
+  ###
+  @property
+  def dict(
+    self: 'Feat' ) -> Dict[ str, Any ]:
+    """
+    The feature as a GeoJSON-like mapping.
+    """
+    return {
+      'type': 'Feature',
+      'geometry': None if self.geom is None else self.geom.dict,
+      'properties': dict( self.props ) }
+
+  ###
+  @property
+  def geojson(
+    self: 'Feat' ) -> str:
+    """
+    """
+    return json.dumps( self.dict )
 
   ###
   def __reproject(
@@ -91,56 +156,185 @@ class Feat:
     precision: int = -1 ) -> None:
     """
     """
-    self.dict = reproject( self.dict, self.srid, srid,
-      antimeridian_cutting, antimeridian_offset, precision )
-    self.srid = srid
+    if self.geom is not None:
+      self.geom.reproject( srid,
+        antimeridian_cutting, antimeridian_offset, precision )
 
   ###
-  @classmethod
-  def reproject(
+  def __class_reproject(
     cls: 'Feat',
     feat: 'Feat',
     srid: int,
     antimeridian_cutting: bool = False,
     antimeridian_offset: float = 10.0,
-    precision: int = -1 ) -> 'Geom':
+    precision: int = -1 ) -> 'Feat':
     """
     """
-    #return cls( reproject( feat.dict, feat.srid, srid,
-      #antimeridian_cutting, antimeridian_offset, precision ), srid = srid )
+    geom = feat.geom
+    if geom is not None:
+      geom = Geom.reproject( geom, srid,
+        antimeridian_cutting, antimeridian_offset, precision )
+    return cls( ( dict( feat.props ), geom ), srid = srid )
+
+  ###
+  reproject = dualmethod( __reproject, __class_reproject )
 
 ################################################################################
 
 ###
-def dataset_extract(
-  dataset: str,
-  gtype: str,
-  dst_srid: int = 0 ) -> List[ Tuple[ Dict[ str, Any ], BaseGeometry ] ]:
+class Schema:
   """
+  Field names and types shared by the property rows of one dataset,
+  captured once (e.g. from `source.meta['schema']`) instead of being
+  repeated as the keys of every feature's dict.
   """
-  result = []
-  with fiona.open( dataset, 'r' ) as source:
-    meta = source.meta
-    crs = meta[ 'crs' ]
-    epsg = crs[ 'init' ]
-    src_srid = int( ''.join( filter( str.isdigit, epsg ) ) or 4326 )
-    if dst_srid == 0:
-      dst_srid = src_srid
-    reproject = ( dst_srid != src_srid )
-    for feat in source:
-      try:
-        props = feat[ 'properties' ]
-        geom = shape( feat[ 'geometry' ] )
-        if reproject:
-          geom = reproject( geom, srs_srid, dst_srid )
-        if not geom.is_valid:
-          # Do something
-          #clean = geom.buffer( 0.0 )
-          raise RuntimeError( 'dataset_extract: error' )
-        result.append( ( props, geom ) )
-
-      except Exception:
-        # Do something
-        raise RuntimeError( 'dataset_extract: error' )
-
-  return result
+
+  ###
+  __slots__ = ( 'names', 'types', 'index' )
+
+  ###
+  def __init__(
+    self: 'Schema',
+    fields: Union[ Dict[ str, str ], Sequence[ str ] ] ) -> None:
+    """
+    `fields` maps names to fiona types, or is a sequence of names.
+    """
+    if isinstance( fields, dict ):
+      self.names = tuple( fields )
+      self.types = tuple( fields.values() )
+    else:
+      self.names = tuple( fields )
+      self.types = ( 'str', ) * len( self.names )
+    self.index = { name: i for i, name in enumerate( self.names ) }
+
+  ###
+  @classmethod
+  def from_source(
+    cls: 'Schema',
+    source: Any ) -> 'Schema':
+    """
+    """
+    return cls( source.meta[ 'schema' ][ 'properties' ] )
+
+  ###
+  def __len__(
+    self: 'Schema' ) -> int:
+    """
+    """
+    return len( self.names )
+
+  ###
+  def __eq__(
+    self: 'Schema',
+    other: Any ) -> bool:
+    """
+    """
+    return isinstance( other, Schema ) and \
+      self.names == other.names and self.types == other.types
+
+  ###
+  def __hash__(
+    self: 'Schema' ) -> int:
+    """
+    """
+    return hash( self.names )
+
+  ###
+  def __getstate__(
+    self: 'Schema' ) -> Tuple[ Tuple[ str, ... ], Tuple[ str, ... ] ]:
+    """
+    """
+    return ( self.names, self.types )
+
+  ###
+  def __setstate__(
+    self: 'Schema',
+    state: Tuple[ Tuple[ str, ... ], Tuple[ str, ... ] ] ) -> None:
+    """
+    """
+    self.names, self.types = state
+    self.index = { name: i for i, name in enumerate( self.names ) }
+
+  ###
+  def __repr__(
+    self: 'Schema' ) -> str:
+    """
+    """
+    return f"Schema({ dict( zip( self.names, self.types ) ) })"
+
+  ###
+  def row(
+    self: 'Schema',
+    props: Dict[ str, Any ] ) -> 'Props':
+    """
+    Returns the values of `props` as a row of this schema, fields it
+    lacks are `None` and fields the schema lacks are dropped.
+    """
+    return Props( self, tuple( props.get( name ) for name in self.names ) )
+
+###
+class Props( Mapping ):
+  """
+  A read-only mapping view of one row of values of a shared `Schema`.
+  Compares equal to the dict with the same items, `dict( props )` makes
+  an editable copy.
+  """
+
+  ###
+  __slots__ = ( 'schema', 'row' )
+
+  ###
+  def __init__(
+    self: 'Props',
+    schema: Schema,
+    row: Sequence[ Any ] ) -> None:
+    """
+    """
+    self.schema = schema
+    self.row = row
+
+  ###
+  def __getitem__(
+    self: 'Props',
+    key: str ) -> Any:
+    """
+    """
+    return self.row[ self.schema.index[ key ] ]
+
+  ###
+  def __iter__(
+    self: 'Props' ) -> Iterator[ str ]:
+    """
+    """
+    return iter( self.schema.names )
+
+  ###
+  def __len__(
+    self: 'Props' ) -> int:
+    """
+    """
+    return len( self.schema.names )
+
+  ###
+  def __contains__(
+    self: 'Props',
+    key: Any ) -> bool:
+    """
+    """
+    return key in self.schema.index
+
+  ###
+  def __repr__(
+    self: 'Props' ) -> str:
+    """
+    """
+    return repr( dict( zip( self.schema.names, self.row ) ) )
+
+  ###
+  def __reduce__(
+    self: 'Props' ) -> Tuple[ Any, ... ]:
+    """
+    """
+    return ( Props, ( self.schema, self.row ) )
+
+################################################################################
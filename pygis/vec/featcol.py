@@ -1,112 +1,1877 @@
 
-import copy
-from functools import singledispatch
-import json
-from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from itertools import islice
+import glob
+import os
+import pickle
+import re
+from datetime import date, datetime, time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 import fiona
-from fiona.crs import from_epsg
+from fiona.crs import CRS
+from fiona.drvsupport import driver_from_extension
+
+import numpy as np
 
 import shapely
-from shapely.geometry.base import BaseGeometry, BaseMultipartGeometry
+from shapely.geometry import box, mapping, shape
+from shapely.geometry.base import BaseGeometry
+
+from .feat import Feat, Props, Schema
+from .geom import Geom, build_geometry, collection_extract, multi, reproject_batch
+
+###
+FeatPair = Tuple[ Dict[ str, Any ], Optional[ BaseGeometry ] ]
+
+###
+CHUNK_SIZE = 4096
+
+###
+# Geometry types accepted for each `gtype`, anything else is skipped
+# before it is decoded (collections are searched for parts of the type)
+GTYPES = {
+  'Point': ( 'Point', 'MultiPoint' ),
+  'LineString': ( 'LineString', 'MultiLineString' ),
+  'Polygon': ( 'Polygon', 'MultiPolygon' ) }
+
+###
+BBox = Tuple[ float, float, float, float ]
+
+################################################################################
+
+###
+def dataset_srid(
+  source: fiona.Collection ) -> int:
+  """
+  Returns the EPSG code of an open dataset, defaulting to 4326.
+  """
+  crs = source.crs
+  return ( crs.to_epsg() if crs else None ) or 4326
+
+###
+def open_dataset(
+  dataset: str,
+  opts: Optional[ Dict[ str, Any ] ] = None ) -> fiona.Collection:
+  """
+  Opens a layer of a dataset (the `layer` of `opts`, by default the first)
+  for reading, restricted to the `columns` of `opts` and without
+  geometries if `ignore_geometry` is set.
+  Some drivers evaluate `where` after dropping the ignored fields, so the
+  fields it names are read too, `extract_chunk` leaves them out again.
+  """
+  opts = opts or {}
+  kwargs = {}
+  if opts.get( 'layer' ) is not None:
+    kwargs[ 'layer' ] = opts[ 'layer' ]
+  columns = opts.get( 'columns' )
+  if columns is not None:
+    columns = list( columns )
+    where = opts.get( 'where' )
+    if where:
+      with fiona.open( dataset, 'r', **kwargs ) as source:
+        names = source.schema[ 'properties' ]
+      columns = columns + [ n for n in names if n not in columns
+        and re.search( r'\b' + re.escape( n ) + r'\b', where, re.IGNORECASE ) ]
+    kwargs[ 'include_fields' ] = columns
+  if opts.get( 'ignore_geometry' ):
+    kwargs[ 'ignore_geometry' ] = True
+  return fiona.open( dataset, 'r', **kwargs )
+
+###
+def dataset_schema(
+  source: fiona.Collection,
+  opts: Optional[ Dict[ str, Any ] ] = None ) -> Dict[ str, Any ]:
+  """
+  Returns the schema of a dataset opened with `open_dataset`, restricted
+  to the `columns` of `opts`.
+  """
+  schema = source.meta[ 'schema' ]
+  columns = ( opts or {} ).get( 'columns' )
+  if columns is not None:
+    fields = schema[ 'properties' ]
+    schema = dict( schema, properties = { n: fields[ n ] for n in columns } )
+  return schema
+
+###
+def dataset_extract(
+  dataset: str,
+  gtype: str,
+  dst_srid: int = 0,
+  workers: Optional[ int ] = 1,
+  cache_dir: Optional[ str ] = None,
+  invalid: str = 'fail',
+  repair: str = 'make_valid',
+  report: Optional[ 'ValidationReport' ] = None,
+  bbox: Optional[ BBox ] = None,
+  mask: Optional[ BaseGeometry ] = None,
+  where: Optional[ str ] = None,
+  columns: Optional[ Sequence[ str ] ] = None,
+  ignore_geometry: bool = False,
+  order: Optional[ str ] = None,
+  layer: Optional[ Union[ str, int ] ] = None,
+  compact: bool = False ) -> List[ FeatPair ]:
+  """
+  Reads the features of a dataset into a list of (properties, geometry)
+  pairs, reprojected to `dst_srid` (0 keeps the source srid).
+  See `iter_dataset` for the other arguments, features are in source
+  order unless `order` is given.
+  """
+  return list( iter_dataset( dataset, gtype, dst_srid,
+    workers = workers, cache_dir = cache_dir,
+    invalid = invalid, repair = repair, report = report,
+    bbox = bbox, mask = mask, where = where,
+    columns = columns, ignore_geometry = ignore_geometry, order = order,
+    layer = layer, compact = compact ) )
+
+###
+def iter_dataset(
+  dataset: str,
+  gtype: str,
+  dst_srid: int = 0,
+  chunk_size: Optional[ int ] = None,
+  workers: Optional[ int ] = 1,
+  ordered: bool = True,
+  cache_dir: Optional[ str ] = None,
+  invalid: str = 'fail',
+  repair: str = 'make_valid',
+  report: Optional[ 'ValidationReport' ] = None,
+  bbox: Optional[ BBox ] = None,
+  mask: Optional[ BaseGeometry ] = None,
+  where: Optional[ str ] = None,
+  columns: Optional[ Sequence[ str ] ] = None,
+  ignore_geometry: bool = False,
+  order: Optional[ str ] = None,
+  run_size: Optional[ int ] = None,
+  layer: Optional[ Union[ str, int ] ] = None,
+  compact: bool = False ) -> Iterator[ Union[ FeatPair, List[ FeatPair ] ] ]:
+  """
+  Streaming variant of `dataset_extract`.
+  Features are read, reprojected and validated one chunk at a time while
+  the dataset is open, so memory stays bounded by the chunk size.
+  Yields (properties, geometry) pairs, or lists of at most `chunk_size`
+  pairs if `chunk_size` is given.
+
+  gtype: str
+    ``'Point'``, ``'LineString'`` or ``'Polygon'``. Features of other
+    types are skipped before their geometry is decoded, the parts of the
+    type are extracted from geometry collections. `None` keeps every
+    feature.
+
+  workers: int, optional
+    Number of worker processes, `None` uses every core.
+    With more than one worker the dataset is split into index ranges of
+    `chunk_size` (or `CHUNK_SIZE`) features, each worker opens its own
+    handle and processes whole ranges.
+  ordered: bool, optional
+    ``True`` to yield results in source order, ``False`` to yield each
+    range as soon as it is done.
+  cache_dir: str, optional
+    Directory of the on-disk extraction cache (see `pygis.vec.cache`).
+    A fresh entry for this dataset and these options is memory-mapped
+    instead of reading the source, otherwise the results are written
+    to a new entry as they are yielded. Entries are stored, and served,
+    in source order whatever `ordered` is.
+  invalid: str, optional
+    What to do with invalid geometries, see `validate`:
+    ``'fail'`` (the default) raises `RuntimeError`, ``'skip'`` drops the
+    feature and ``'repair'`` fixes it.
+  repair: str, optional
+    Repair method, ``'make_valid'`` or ``'buffer'``.
+  report: ValidationReport, optional
+    Collects the ids of repaired and dropped features.
+  bbox: (minx, miny, maxx, maxy), optional
+  mask: BaseGeometry, optional
+    Only features intersecting this box or geometry, given in `dst_srid`.
+    The filter is transformed to the source CRS and handed to OGR, so
+    features outside of it are never read, the reprojected features are
+    then tested exactly.
+  where: str, optional
+    OGR SQL attribute filter, e.g. ``"STATEFP = '19'"``.
+  columns: sequence of str, optional
+    Names of the properties to read, OGR skips the other fields entirely.
+    `where` may still refer to any field.
+  ignore_geometry: bool, optional
+    ``True`` for an attribute-only read, geometries are not read from the
+    source and every pair holds `None`.
+  order: str, optional
+    ``'hilbert'`` or ``'zorder'`` to yield the features sorted along that
+    curve through their bounding box centers instead of in source order
+    (see `pygis.vec.order`), which keeps spatially close features close
+    in the output.
+  run_size: int, optional
+    Number of features sorted in memory when `order` is given, longer
+    streams are sorted in runs spilled to temporary files and merged.
+  layer: str or int, optional
+    Name or index of the layer to read, by default the first one.
+  compact: bool, optional
+    ``True`` for properties as read-only `Props` rows of one `Schema`,
+    taken from the source, instead of one dict per feature. Rows compare
+    equal to the dicts they replace, `PropStore` turns them into columns.
+  """
+  # Imported here, the order module builds on this one
+  from .order import CURVES, RUN_SIZE
+
+  if order is not None and order not in CURVES:
+    raise ValueError( f"iter_dataset: unknown order ({order})" )
+  if ignore_geometry and order is not None:
+    raise ValueError( 'iter_dataset: ordering needs the geometry' )
+  opts = dataset_opts( gtype, invalid, repair, bbox, mask, where, columns, ignore_geometry )
+  if layer is not None:
+    opts[ 'layer' ] = layer
+  size = chunk_size or CHUNK_SIZE
+  if cache_dir is not None:
+    chunks = _iter_cached( dataset, dst_srid, size, workers, cache_dir, opts, report )
+  elif workers != 1:
+    chunks = _iter_parallel( dataset, dst_srid, size, workers, ordered, opts, report )
+  else:
+    chunks = _iter_serial( dataset, dst_srid, size, opts, report )
+  if order is not None:
+    chunks = _iter_ordered( chunks, dataset, dst_srid, size, order, run_size or RUN_SIZE, opts )
+  if compact:
+    with open_dataset( dataset, opts ) as source:
+      schema = Schema( dataset_schema( source, opts )[ 'properties' ] )
+    chunks = ( [ ( schema.row( p ), g ) for p, g in chunk ] for chunk in chunks )
+
+  for chunk in chunks:
+    if chunk_size is None:
+      yield from chunk
+    else:
+      yield chunk
+
+###
+def dataset_opts(
+  gtype: str,
+  invalid: str = 'fail',
+  repair: str = 'make_valid',
+  bbox: Optional[ BBox ] = None,
+  mask: Optional[ BaseGeometry ] = None,
+  where: Optional[ str ] = None,
+  columns: Optional[ Sequence[ str ] ] = None,
+  ignore_geometry: bool = False ) -> Dict[ str, Any ]:
+  """
+  Checks the extraction options of `iter_dataset` and returns them as the
+  `opts` dict handed to the readers and workers.
+  """
+  if gtype is not None and gtype not in GTYPES:
+    raise ValueError( f"iter_dataset: unknown geometry type ({gtype})" )
+  if invalid not in ( 'fail', 'skip', 'repair' ):
+    raise ValueError( f"iter_dataset: unknown invalid mode ({invalid})" )
+  if repair not in ( 'make_valid', 'buffer' ):
+    raise ValueError( f"iter_dataset: unknown repair method ({repair})" )
+  if bbox is not None and mask is not None:
+    raise ValueError( 'iter_dataset: bbox and mask can not be used together' )
+  if ignore_geometry and ( bbox is not None or mask is not None ):
+    raise ValueError( 'iter_dataset: spatial filters need the geometry' )
+
+  opts = { 'gtype': gtype, 'invalid': invalid, 'repair': repair }
+  if bbox is not None:
+    opts[ 'bbox' ] = tuple( bbox )
+  if mask is not None:
+    opts[ 'mask' ] = mask
+  if where is not None:
+    opts[ 'where' ] = where
+  if columns is not None:
+    opts[ 'columns' ] = list( columns )
+  if ignore_geometry:
+    opts[ 'ignore_geometry' ] = True
+  return opts
+
+###
+def _iter_serial(
+  dataset: str,
+  dst_srid: int,
+  size: int,
+  opts: Dict[ str, Any ],
+  report: Optional[ 'ValidationReport' ] ) -> Iterator[ List[ FeatPair ] ]:
+  """
+  Reads a dataset in chunks of `size` records.
+  """
+  with open_dataset( dataset, opts ) as source:
+    src_srid = dataset_srid( source )
+    if dst_srid == 0:
+      dst_srid = src_srid
+
+    filters = dataset_filter( src_srid, dst_srid, opts )
+    records = source.filter( **filters ) if filters else iter( source )
+    while True:
+      chunk = list( islice( records, size ) )
+      if not chunk:
+        break
+      yield extract_chunk( chunk, src_srid, dst_srid, opts, report )
+
+###
+def _iter_ordered(
+  chunks: Iterator[ List[ FeatPair ] ],
+  dataset: str,
+  dst_srid: int,
+  size: int,
+  order: str,
+  run_size: int,
+  opts: Dict[ str, Any ] ) -> Iterator[ List[ FeatPair ] ]:
+  """
+  Re-chunks the features of `chunks` sorted along the `order` curve,
+  keyed on the extent of the dataset so the runs of a long stream agree.
+  """
+  from .order import external_sort
+
+  feats = external_sort( chunks, dataset_extent( dataset, dst_srid, opts ), order, run_size )
+  while True:
+    chunk = list( islice( feats, size ) )
+    if not chunk:
+      break
+    yield chunk
+
+###
+def _iter_cached(
+  dataset: str,
+  dst_srid: int,
+  size: int,
+  workers: Optional[ int ],
+  cache_dir: str,
+  opts: Dict[ str, Any ],
+  report: Optional[ 'ValidationReport' ] ) -> Iterator[ List[ FeatPair ] ]:
+  """
+  Serves `iter_dataset` from the extraction cache, filling it on a miss.
+  The validation report is stored with the entry and replayed on a hit,
+  on a miss it is filled once the dataset has been read completely.
+  Entries are always filled in source order.
+  """
+  # Imported here, the cache module builds on this one
+  from .cache import CacheReader, CacheWriter, cache_path
+
+  # The key covers the source files, so a hit never has to open the source
+  path = cache_path( cache_dir, dataset, dst_srid = dst_srid, **opts )
+  if CacheReader.exists( path ):
+    with CacheReader( path ) as reader:
+      if report is not None:
+        report.merge( reader.report )
+      yield from reader.chunks( size )
+    return
+
+  with open_dataset( dataset, opts ) as source:
+    schema = dataset_schema( source, opts )
+    if dst_srid == 0:
+      dst_srid = dataset_srid( source )
+
+  local = ValidationReport()
+  if workers != 1:
+    chunks = _iter_parallel( dataset, dst_srid, size, workers, True, opts, local )
+  else:
+    chunks = _iter_serial( dataset, dst_srid, size, opts, local )
+
+  with CacheWriter( path, schema, dst_srid, local ) as writer:
+    for chunk in chunks:
+      writer.write( chunk )
+      yield chunk
+  if report is not None:
+    report.merge( local )
+
+###
+def _iter_parallel(
+  dataset: str,
+  dst_srid: int,
+  size: int,
+  workers: Optional[ int ],
+  ordered: bool,
+  opts: Dict[ str, Any ],
+  report: Optional[ 'ValidationReport' ] ) -> Iterator[ List[ FeatPair ] ]:
+  """
+  Fans index ranges of a dataset out to a process pool.
+  """
+  tasks = ( ( None, args ) for args in _shard_tasks( dataset, dst_srid, size, opts ) )
+  for _, chunk in _run_shards( tasks, workers, ordered, report ):
+    yield chunk
+
+###
+def _shard_tasks(
+  dataset: str,
+  dst_srid: int,
+  size: int,
+  opts: Dict[ str, Any ] ) -> Iterator[ Tuple[ Any, ... ] ]:
+  """
+  Yields the `_extract_shard` arguments of each index range of a dataset.
+  """
+  with open_dataset( dataset, opts ) as source:
+    src_srid = dataset_srid( source )
+    if dst_srid == 0:
+      dst_srid = src_srid
+    # Filtered ranges are not addressable by index, their feature ids are
+    # collected up front and handed to the workers instead
+    filters = dataset_filter( src_srid, dst_srid, opts )
+    fids = list( source.keys( **filters ) ) if filters else None
+    count = len( source ) if fids is None else len( fids )
+
+  for start in range( 0, count, size ):
+    stop = min( start + size, count )
+    yield ( dataset, start, stop, src_srid, dst_srid, opts,
+      None if fids is None else fids[ start : stop ] )
+
+###
+def bounded_map(
+  pool: Optional[ Executor ],
+  tasks: Iterable[ Tuple[ Any, Callable, Tuple[ Any, ... ] ] ],
+  workers: int,
+  ordered: bool = True ) -> Iterator[ Tuple[ Any, Any ] ]:
+  """
+  Runs (tag, function, arguments) tasks on `pool`, or in this process if
+  it is `None`, and yields (tag, result) pairs. Tasks are pulled lazily
+  and at most two per worker are in flight, so memory stays bounded even
+  when the consumer is slower than the pool. Results come in task order
+  if `ordered`, otherwise as they are done.
+  """
+  tasks = iter( tasks )
+  if pool is None:
+    for tag, fn, args in tasks:
+      yield tag, fn( *args )
+    return
+
+  window = 2 * workers
+  pending = deque()
+  tags = {}
+
+  def submit() -> None:
+    for tag, fn, args in islice( tasks, window - len( pending ) ):
+      f = pool.submit( fn, *args )
+      tags[ f ] = tag
+      pending.append( f )
+
+  submit()
+  while pending:
+    if ordered:
+      done = [ pending.popleft() ]
+    else:
+      done, _ = wait( pending, return_when = FIRST_COMPLETED )
+      for f in done:
+        pending.remove( f )
+    for f in done:
+      yield tags.pop( f ), f.result()
+    submit()
+
+###
+def _run_shards(
+  tasks: Iterator[ Tuple[ Any, Tuple[ Any, ... ] ] ],
+  workers: Optional[ int ],
+  ordered: bool,
+  report: Optional[ 'ValidationReport' ] ) -> Iterator[ Tuple[ Any, List[ FeatPair ] ] ]:
+  """
+  Runs (tag, `_extract_shard` arguments) tasks on a process pool with
+  `bounded_map` and yields (tag, chunk) pairs.
+  """
+  workers = workers or os.cpu_count() or 1
+  with ProcessPoolExecutor( workers ) as pool:
+    shards = ( ( tag, _extract_shard, args ) for tag, args in tasks )
+    for tag, ( chunk, shard_report ) in bounded_map( pool, shards, workers, ordered ):
+      if report is not None:
+        report.merge( shard_report )
+      yield tag, chunk
+
+###
+def _extract_shard(
+  dataset: str,
+  start: int,
+  stop: int,
+  src_srid: int,
+  dst_srid: int,
+  opts: Dict[ str, Any ],
+  fids: Optional[ List[ int ] ] = None ) -> Tuple[ List[ FeatPair ], 'ValidationReport' ]:
+  """
+  Worker side of `_run_shards`, extracts features [start, stop), or
+  the features `fids` of a filtered dataset.
+  """
+  report = ValidationReport()
+  with open_dataset( dataset, opts ) as source:
+    if fids is None:
+      records = [ feat for _, feat in source.items( start, stop ) ]
+    else:
+      records = [ source[ fid ] for fid in fids ]
+    return extract_chunk( records, src_srid, dst_srid, opts, report ), report
+
+###
+def dataset_filter(
+  src_srid: int,
+  dst_srid: int,
+  opts: Dict[ str, Any ] ) -> Dict[ str, Any ]:
+  """
+  Returns the `bbox`, `mask` and `where` arguments of `fiona.Collection.filter`
+  for the filters in `opts`, spatial filters are transformed from `dst_srid`
+  to `src_srid`.
+  """
+  filters = {}
+  if 'where' in opts:
+    filters[ 'where' ] = opts[ 'where' ]
+
+  region = filter_region( opts )
+  if region is None:
+    return filters
+  region = transform_region( region, dst_srid, src_srid )
+
+  if 'bbox' in opts:
+    filters[ 'bbox' ] = region.bounds
+  else:
+    filters[ 'mask' ] = mapping( region )
+  return filters
+
+###
+def transform_region(
+  region: BaseGeometry,
+  src_srid: int,
+  dst_srid: int ) -> BaseGeometry:
+  """
+  Transforms a filter region or extent. Edges are densified first so the
+  result still covers the curved image of the original region.
+  """
+  if src_srid == dst_srid:
+    return region
+  xmin, ymin, xmax, ymax = region.bounds
+  step = max( xmax - xmin, ymax - ymin ) / 32.0
+  if step > 0.0:
+    region = shapely.segmentize( region, step )
+  return reproject_batch( [ region ], src_srid, dst_srid )[ 0 ]
+
+###
+def dataset_extent(
+  dataset: str,
+  dst_srid: int,
+  opts: Optional[ Dict[ str, Any ] ] = None ) -> BBox:
+  """
+  Returns the bounds of a dataset in `dst_srid` (0 for the source srid),
+  clipped to the spatial filter of `opts` if any.
+  """
+  opts = opts or {}
+  with open_dataset( dataset, opts ) as source:
+    src_srid = dataset_srid( source )
+    extent = box( *source.bounds )
+  if dst_srid == 0:
+    dst_srid = src_srid
+  extent = transform_region( extent, src_srid, dst_srid )
+  region = filter_region( opts )
+  if region is not None:
+    clipped = extent.intersection( box( *region.bounds ) )
+    if not clipped.is_empty:
+      extent = clipped
+  return extent.bounds
+
+###
+def filter_region(
+  opts: Dict[ str, Any ] ) -> Optional[ BaseGeometry ]:
+  """
+  Returns the spatial filter in `opts` as a geometry, `None` if there is none.
+  """
+  if 'bbox' in opts:
+    return box( *opts[ 'bbox' ] )
+  return opts.get( 'mask' )
+
+###
+def extract_chunk(
+  records: Iterable[ fiona.Feature ],
+  src_srid: int,
+  dst_srid: int,
+  opts: Optional[ Dict[ str, Any ] ] = None,
+  report: Optional[ 'ValidationReport' ] = None ) -> List[ FeatPair ]:
+  """
+  Converts a chunk of fiona records into (properties, geometry) pairs.
+  Records of the wrong geometry type are skipped before decoding, the rest
+  of the chunk is reprojected in bulk, validated in a single pass and
+  tested against the spatial filter, if any.
+  """
+  return extract_records( records, src_srid, dst_srid, opts, report )[ 1 ]
+
+###
+def extract_records(
+  records: Iterable[ fiona.Feature ],
+  src_srid: int,
+  dst_srid: int,
+  opts: Optional[ Dict[ str, Any ] ] = None,
+  report: Optional[ 'ValidationReport' ] = None ) -> Tuple[ List[ Any ], List[ FeatPair ] ]:
+  """
+  `extract_chunk` that also returns the ids of the records kept.
+  """
+  opts = opts or {}
+  gtype = opts.get( 'gtype' )
+  accept = GTYPES.get( gtype )
+  columns = opts.get( 'columns' )
+  ids = []
+  props = []
+  geoms = []
+  for feat in records:
+    geom = feat.geometry
+    if geom is None:
+      pass
+    elif accept is None or geom.type in accept:
+      geom = shape( geom )
+    elif geom.type == 'GeometryCollection':
+      geom = build_geometry( collection_extract( shape( geom ), gtype ) )
+      if geom is None:
+        continue
+    else:
+      continue
+    ids.append( feat.id )
+    fields = feat.properties
+    props.append( dict( fields ) if columns is None else { n: fields[ n ] for n in columns } )
+    geoms.append( geom )
+
+  if dst_srid != src_srid:
+    geoms = reproject_batch( geoms, src_srid, dst_srid )
+
+  geoms, keep = validate( geoms, ids,
+    opts.get( 'invalid', 'fail' ), opts.get( 'repair', 'make_valid' ), report )
+
+  region = filter_region( opts )
+  if region is not None:
+    garr = np.empty( len( geoms ), dtype = object )
+    garr[ : ] = geoms
+    shapely.prepare( region )
+    hit = shapely.intersects( region, garr )
+    keep = hit if keep is None else keep & hit
+
+  if keep is None:
+    return ids, list( zip( props, geoms ) )
+  keep = np.flatnonzero( keep )
+  return [ ids[ i ] for i in keep ], [ ( props[ i ], geoms[ i ] ) for i in keep ]
+
+################################################################################
 
-import geom
+###
+# A path, glob or directory, or a (path, layer) pair
+Source = Union[ str, Tuple[ str, Union[ str, int ] ] ]
 
 ###
-class Feat:
-"""
-"""
+def expand_sources(
+  sources: Union[ Source, Sequence[ Source ] ] ) -> List[ Tuple[ str, Optional[ Union[ str, int ] ] ] ]:
+  """
+  Expands sources into (path, layer) pairs. Globs are expanded, in sorted
+  order, and every layer of a multi-layer dataset (a GeoPackage, or a
+  directory of shapefiles) becomes its own source, single-layer datasets
+  get layer `None`. (path, layer) pairs are kept as they are.
+  """
+  if isinstance( sources, ( str, tuple ) ):
+    sources = [ sources ]
+  expanded = []
+  for src in sources:
+    if isinstance( src, tuple ):
+      expanded.append( src )
+      continue
+    paths = sorted( glob.glob( src, recursive = True ) ) if any( c in src for c in '*?[' ) else [ src ]
+    for path in paths:
+      layers = fiona.listlayers( path )
+      if len( layers ) == 1:
+        expanded.append( ( path, None ) )
+      else:
+        expanded.extend( ( path, layer ) for layer in layers )
+  if not expanded:
+    raise ValueError( f"expand_sources: no datasets found ({sources})" )
+  return expanded
+
+###
+def source_tag(
+  path: str,
+  layer: Optional[ Union[ str, int ] ] ) -> str:
+  """
+  """
+  return path if layer is None else f"{path}|{layer}"
+
+###
+def sources_schema(
+  sources: Union[ Source, Sequence[ Source ] ],
+  mode: str = 'union' ) -> Dict[ str, Any ]:
+  """
+  Reconciles the schemas of several sources into one:
+    'strict'  every source must have the same fields
+    'union'   every field of any source, missing values read as `None`
+    'common'  only the fields all sources share
+  A field must have the same base type ('int', 'str', ...) everywhere.
+  The geometry type is 'Unknown' if the sources disagree on it.
+  """
+  if mode not in ( 'strict', 'union', 'common' ):
+    raise ValueError( f"sources_schema: unknown mode ({mode})" )
+  schemas = []
+  for path, layer in expand_sources( sources ):
+    with open_dataset( path, { 'layer': layer } ) as source:
+      schemas.append( ( source_tag( path, layer ), source.schema ) )
+
+  tag, first = schemas[ 0 ]
+  fields = dict( first[ 'properties' ] )
+  gtypes = { s[ 'geometry' ] for _, s in schemas }
+  for other, schema in schemas[ 1: ]:
+    props = schema[ 'properties' ]
+    if mode == 'strict' and set( props ) != set( fields ):
+      raise ValueError( f"sources_schema: fields of {other} differ from {tag}" )
+    for name, ftype in props.items():
+      if name in fields and fields[ name ].split( ':' )[ 0 ] != ftype.split( ':' )[ 0 ]:
+        raise ValueError( f"sources_schema: {name} is {ftype} in {other} but {fields[ name ]} in {tag}" )
+      if mode == 'union':
+        fields.setdefault( name, ftype )
+    if mode == 'common':
+      fields = { n: t for n, t in fields.items() if n in props }
+
+  return {
+    'geometry': gtypes.pop() if len( gtypes ) == 1 else 'Unknown',
+    'properties': fields }
+
+###
+def iter_datasets(
+  sources: Union[ Source, Sequence[ Source ] ],
+  gtype: str,
+  dst_srid: int = 0,
+  chunk_size: Optional[ int ] = None,
+  workers: Optional[ int ] = 1,
+  ordered: bool = True,
+  schema: str = 'union',
+  source_field: Optional[ str ] = 'source',
+  report: Optional[ 'ValidationReport' ] = None,
+  compact: bool = False,
+  **kwargs ) -> Iterator[ Union[ FeatPair, List[ FeatPair ] ] ]:
+  """
+  `iter_dataset` over several files and layers (see `expand_sources`),
+  streamed as one collection reprojected to `dst_srid` (0 for the srid of
+  the first source).
+
+  The schemas are reconciled with `sources_schema` in `schema` mode and
+  every feature gets the reconciled properties, plus the `source_tag` of
+  its source in the `source_field` property unless that is `None`, as
+  `Props` rows of one `Schema` if `compact` is set.
+  With more than one worker the index ranges of all sources share one
+  process pool, at most two ranges per worker are in flight, so reads of
+  one source overlap with the processing of others and with the consumer.
+  Sources are yielded one after the other if `ordered`, otherwise ranges
+  come as they are done. The other keyword arguments are those of
+  `iter_dataset` (`invalid`, `repair`, `bbox`, `mask`, `where`, `columns`,
+  `ignore_geometry`), `columns` may name fields some sources lack.
+  """
+  expanded = expand_sources( sources )
+  merged = sources_schema( expanded, schema )[ 'properties' ]
+  columns = kwargs.pop( 'columns', None )
+  fields = [ n for n in merged if columns is None or n in columns ]
+  if source_field is not None and source_field in fields:
+    raise ValueError( f"iter_datasets: {source_field} is a field of the sources" )
+  rows = None
+  if compact:
+    types = { n: merged[ n ] for n in fields }
+    if source_field is not None:
+      types[ source_field ] = 'str'
+    rows = Schema( types )
+  opts = dataset_opts( gtype, **kwargs )
+  if dst_srid == 0:
+    with open_dataset( expanded[ 0 ][ 0 ], { 'layer': expanded[ 0 ][ 1 ] } ) as source:
+      dst_srid = dataset_srid( source )
+
+  # Each source only reads the reconciled fields it has
+  jobs = []
+  for path, layer in expanded:
+    with open_dataset( path, { 'layer': layer } ) as source:
+      names = source.schema[ 'properties' ]
+    jobs.append( ( source_tag( path, layer ),
+      dict( opts, layer = layer, columns = [ n for n in fields if n in names ] ), path ) )
+
+  size = chunk_size or CHUNK_SIZE
+  if workers != 1:
+    tasks = ( ( tag, args ) for tag, sopts, path in jobs
+      for args in _shard_tasks( path, dst_srid, size, sopts ) )
+    chunks = _run_shards( tasks, workers, ordered, report )
+  else:
+    chunks = ( ( tag, chunk ) for tag, sopts, path in jobs
+      for chunk in _iter_serial( path, dst_srid, size, sopts, report ) )
+
+  for tag, chunk in chunks:
+    if rows is not None:
+      tagged = () if source_field is None else ( tag, )
+      chunk = [ ( Props( rows, tuple( props.get( n ) for n in fields ) + tagged ), geom )
+        for props, geom in chunk ]
+    else:
+      tagged = {} if source_field is None else { source_field: tag }
+      chunk = [ ( { **{ n: props.get( n ) for n in fields }, **tagged }, geom )
+        for props, geom in chunk ]
+    if chunk_size is None:
+      yield from chunk
+    else:
+      yield chunk
+
+################################################################################
+
+###
+class ValidationReport:
+  """
+  Ids of the features `validate` repaired or dropped.
+  """
+
   ###
   def __init__(
-    self,
-    arg = None ) -> None:
+    self: 'ValidationReport',
+    repaired: Iterable[ Any ] = (),
+    dropped: Iterable[ Any ] = () ) -> None:
+    """
+    """
+    self.repaired = list( repaired )
+    self.dropped = list( dropped )
+
+  ###
+  def __bool__(
+    self: 'ValidationReport' ) -> bool:
+    """
+    """
+    return bool( self.repaired or self.dropped )
+
+  ###
+  def merge(
+    self: 'ValidationReport',
+    other: 'ValidationReport' ) -> None:
+    """
+    """
+    self.repaired.extend( other.repaired )
+    self.dropped.extend( other.dropped )
+
+###
+def validate(
+  gseq: Sequence[ Optional[ BaseGeometry ] ],
+  ids: Optional[ Sequence[ Any ] ] = None,
+  invalid: str = 'fail',
+  repair: str = 'make_valid',
+  report: Optional[ ValidationReport ] = None ) -> Tuple[ List[ Optional[ BaseGeometry ] ], Optional[ np.ndarray ] ]:
+  """
+  Validates a batch of geometries with one vectorized `is_valid` call.
+  Missing geometries count as valid.
+
+  invalid: str, optional
+    ``'fail'`` raises `RuntimeError` on the first invalid geometry,
+    ``'skip'`` drops invalid geometries and
+    ``'repair'`` fixes them with `repair`, dropping those that cannot
+    be fixed or collapse to empty.
+  repair: str, optional
+    ``'make_valid'`` (structure method, collapsed parts removed) or
+    ``'buffer'`` for the classic `buffer(0)`.
+
+  Returns the (possibly repaired) geometries and a mask of the entries to
+  keep, the mask is `None` when every entry is kept.
+  Ids (positions if `ids` is None) of repaired and dropped geometries are
+  added to `report`.
+  """
+  garr = np.empty( len( gseq ), dtype = object )
+  garr[ : ] = gseq
+  bad = ~( shapely.is_valid( garr ) | shapely.is_missing( garr ) )
+  if not bad.any():
+    return list( gseq ), None
+
+  idx = np.flatnonzero( bad )
+  if ids is None:
+    ids = range( len( garr ) )
+
+  if invalid == 'fail':
+    raise RuntimeError( f"validate: invalid geometry ({ids[ idx[ 0 ] ]})" )
+
+  keep = ~bad
+  if invalid == 'repair':
+    if repair == 'buffer':
+      fixed = shapely.buffer( garr[ idx ], 0.0 )
+    else:
+      fixed = shapely.make_valid( garr[ idx ], method = 'structure', keep_collapsed = False )
+    ok = shapely.is_valid( fixed ) & ~shapely.is_empty( fixed )
+    garr[ idx[ ok ] ] = fixed[ ok ]
+    keep[ idx[ ok ] ] = True
+    if report is not None:
+      report.repaired.extend( ids[ i ] for i in idx[ ok ] )
+    idx = idx[ ~ok ]
+
+  if report is not None:
+    report.dropped.extend( ids[ i ] for i in idx )
+
+  return garr.tolist(), keep
+
+################################################################################
+
+###
+# Python type -> fiona field type, used when inferring a schema
+FIELD_TYPES = {
+  bool: 'bool',
+  int: 'int',
+  float: 'float',
+  str: 'str',
+  datetime: 'datetime',
+  date: 'date',
+  time: 'time' }
+
+###
+def dataset_write(
+  dataset: str,
+  feats: Iterable[ Union[ Feat, Tuple[ Dict[ str, Any ], Any ] ] ],
+  srid: int = 0,
+  schema: Optional[ Dict[ str, Any ] ] = None,
+  driver: Optional[ str ] = None,
+  promote: bool = False,
+  chunk_size: int = CHUNK_SIZE,
+  **kwargs ) -> int:
   """
+  Writes features to a new dataset and returns the number written.
+  `feats` holds `Feat`s or (properties, geometry) pairs, geometries may be
+  `Geom`s, shapely geometries or `None`. The input is consumed `chunk_size`
+  features at a time, each chunk is written with one `writerecords` call,
+  i.e. in one transaction on drivers that support them.
+
+  srid: int, optional
+    Srid of the dataset, 0 takes the srid of the first `Geom` (4326 if
+    there is none). `Geom`s in another srid are reprojected in bulk.
+  schema: dict, optional
+    fiona schema, inferred from the first chunk if omitted.
+  driver: str, optional
+    OGR driver, guessed from the file extension if omitted.
+  promote: bool, optional
+    ``True`` to write every geometry as a Multi* geometry with `multi`,
+    so layers mixing single and multi parts have a single type.
+  kwargs:
+    Passed to `fiona.open`, e.g. `layer`.
   """
-    # Initialize geometry
-    init_registry = self.__init.registry
-    self.__init = singledispatch( init_registry[ object ] )
-    self.__init.register( ( dict, BaseGeometry ), self.__init_from_featpair )
-    self.__init.register( BaseGeometry, self.__init_from_shapely )
-    self.__init.register( dict, self.__init_from_dict )
-    self.__init.register( str, self.__init_from_geojson )
-    self.__geom = None
-    self.__dict = None
-    self.__geojson = None
-    self.__init( arg )
+  feats = iter( feats )
+  chunk = list( islice( feats, chunk_size ) )
+  if srid == 0:
+    srid = next( ( g.srid for g in _chunk_geoms( chunk ) if isinstance( g, Geom ) ), 4326 )
+  records = _write_records( chunk, srid, promote )
+  if schema is None:
+    schema = infer_schema( records )
+  if driver is None:
+    driver = driver_from_extension( dataset )
+
+  count = 0
+  with fiona.open( dataset, 'w', driver = driver, schema = schema,
+      crs = CRS.from_epsg( srid ), **kwargs ) as sink:
+    while records:
+      sink.writerecords( records )
+      count += len( records )
+      records = _write_records( list( islice( feats, chunk_size ) ), srid, promote )
+  return count
 
-    # Initialize other vars
-    self.meta = col.meta
-    self.srid = int( ''.join( filter( str.isdigit, col.meta[ 'crs' ][ 'init' ] ) ) )
+###
+def _chunk_geoms(
+  chunk: List[ Any ] ) -> Iterator[ Any ]:
+  """
+  """
+  for feat in chunk:
+    yield feat.geom if isinstance( feat, Feat ) else feat[ 1 ]
+
+###
+def _write_records(
+  chunk: List[ Any ],
+  srid: int,
+  promote: bool ) -> List[ Dict[ str, Any ] ]:
+  """
+  Converts a chunk of features into fiona records.
+  Mappings already held by a `Geom` are reused, `Geom`s in another srid are
+  reprojected with one `reproject_batch` call per srid.
+  """
+  props = []
+  geoms = []
+  other = {}
+  for i, feat in enumerate( chunk ):
+    if isinstance( feat, Feat ):
+      p, g = feat.props, feat.geom
+    else:
+      p, g = feat
+    props.append( p if isinstance( p, dict ) else dict( p ) )
+    if isinstance( g, Geom ):
+      if g.srid != srid:
+        other.setdefault( g.srid, [] ).append( i )
+        g = g.shape
+      elif not promote:
+        g = g.representations().get( 'dict' ) or g.shape
+      else:
+        g = g.shape
+    geoms.append( g )
 
-    # Hacky ¯\_(ツ)_/¯
-    self.reproject = self.__reproject
+  for src_srid, idx in other.items():
+    for i, g in zip( idx, reproject_batch( [ geoms[ i ] for i in idx ], src_srid, srid ) ):
+      geoms[ i ] = g
+
+  records = []
+  for p, g in zip( props, geoms ):
+    if isinstance( g, BaseGeometry ):
+      g = mapping( multi( g ) if promote else g )
+    records.append( { 'geometry': g, 'properties': p } )
+  return records
+
+###
+def infer_schema(
+  records: Sequence[ Dict[ str, Any ] ] ) -> Dict[ str, Any ]:
+  """
+  Infers a fiona schema from GeoJSON-like records.
+  Fields are typed after their first non-null value (ints mixed with floats
+  become floats, unknown types are written as strings), the geometry type
+  is 'Unknown' unless every geometry has the same type.
+  """
+  fields = {}
+  gtypes = set()
+  for rec in records:
+    geom = rec[ 'geometry' ]
+    if geom is not None:
+      gtypes.add( geom[ 'type' ] )
+    for name, value in rec[ 'properties' ].items():
+      ftype = FIELD_TYPES.get( type( value ), 'str' ) if value is not None else None
+      prev = fields.get( name )
+      if prev is None:
+        fields[ name ] = ftype
+      elif ftype is not None and ftype != prev:
+        fields[ name ] = 'float' if { prev, ftype } == { 'int', 'float' } else 'str'
+
+  return {
+    'geometry': gtypes.pop() if len( gtypes ) == 1 else 'Unknown',
+    'properties': { name: ftype or 'str' for name, ftype in fields.items() } }
+
+################################################################################
+
+###
+class FeatCol:
+  """
+  A collection of (properties, geometry) pairs with a spatial index.
+  The STR-tree is built lazily on the first query, features inserted
+  afterwards are kept in a small pending list that is scanned directly
+  until it grows past `rebuild_ratio` of the indexed size.
+  Queries return feature indices in ascending order.
+  """
 
   ###
-  @singledispatch
-  def __init(
-    self: 'Feat',
-    arg: Union[] ) -> None:
+  def __init__(
+    self: 'FeatCol',
+    feats: Iterable[ FeatPair ] = (),
+    srid: int = 4326,
+    node_capacity: int = 10,
+    rebuild_ratio: float = 0.25 ) -> None:
     """
     """
-    raise TypeError( f"{type( arg )} not supported." )
+    self.props = []
+    self.geoms = []
+    for props, geom in feats:
+      self.props.append( props )
+      self.geoms.append( geom )
+    self.srid = srid
+    self.node_capacity = node_capacity
+    self.rebuild_ratio = rebuild_ratio
+    self.__tree = None
+    self.__indexed = 0
+    self.__present = 0
 
   ###
-  def __init_from_featpair(
-    self: 'Feat',
-    arg: ( Dict[ str, Any ], BaseGeometry ) ) -> None:
+  def __len__(
+    self: 'FeatCol' ) -> int:
     """
     """
-    self.__geom = arg
+    return len( self.geoms )
 
   ###
-  def __init_from_shapely(
-    self: 'Feat',
-    arg: BaseGeometry ) -> None:
+  def __getitem__(
+    self: 'FeatCol',
+    i: int ) -> FeatPair:
     """
     """
-    self.__geom = arg
+    return ( self.props[ i ], self.geoms[ i ] )
 
   ###
-  def __init_from_dict(
-    self: 'Feat',
-    arg: Dict[ str, Any ] ) -> None:
+  def __iter__(
+    self: 'FeatCol' ) -> Iterator[ FeatPair ]:
     """
     """
-    self.__dict = arg
+    return zip( self.props, self.geoms )
 
   ###
-  def __init_from_geojson(
-    self: 'Geom',
-    arg: str ) -> None:
+  @classmethod
+  def from_dataset(
+    cls: 'FeatCol',
+    dataset: str,
+    gtype: str,
+    dst_srid: int = 0,
+    **kwargs ) -> 'FeatCol':
     """
+    Extracts a dataset with `iter_dataset` straight into a collection.
     """
-    self.__geojson = arg
+    if dst_srid == 0:
+      with open_dataset( dataset, kwargs ) as source:
+        dst_srid = dataset_srid( source )
+    return cls( iter_dataset( dataset, gtype, dst_srid, **kwargs ), srid = dst_srid )
 
   ###
-  def __reproject(
-    self: 'Feat',
-    srid: int,
-    antimeridian_cutting: bool = False,
-    antimeridian_offset: float = 10.0,
-    precision: int = -1 ) -> None:
+  def insert(
+    self: 'FeatCol',
+    props: Dict[ str, Any ],
+    geom: Optional[ BaseGeometry ] ) -> int:
     """
+    Appends a feature and returns its index.
     """
-    self.dict = reproject( self.dict, self.srid, srid,
-      antimeridian_cutting, antimeridian_offset, precision )
-    self.srid = srid
+    self.props.append( props )
+    self.geoms.append( geom )
+    if self.__tree is not None:
+      pending = len( self.geoms ) - self.__indexed
+      if pending > max( 64, self.rebuild_ratio * self.__indexed ):
+        self.__tree = None
+    return len( self.geoms ) - 1
+
+  ###
+  def build(
+    self: 'FeatCol' ) -> shapely.STRtree:
+    """
+    (Re)builds the STR-tree over every feature and returns it.
+    """
+    self.__tree = shapely.STRtree( self.geoms, self.node_capacity )
+    self.__indexed = len( self.geoms )
+    self.__present = _count_present( self.__tree.geometries )
+    return self.__tree
+
+  ###
+  @property
+  def tree(
+    self: 'FeatCol' ) -> shapely.STRtree:
+    """
+    """
+    if self.__tree is None:
+      self.build()
+    return self.__tree
+
+  ###
+  def __pending(
+    self: 'FeatCol' ) -> Tuple[ np.ndarray, np.ndarray ]:
+    """
+    Returns the indices and geometries inserted after the last build.
+    """
+    idx = np.arange( self.__indexed, len( self.geoms ) )
+    garr = np.empty( len( idx ), dtype = object )
+    garr[ : ] = self.geoms[ self.__indexed : ]
+    return idx, garr
+
+  ###
+  def __search(
+    self: 'FeatCol',
+    geom: BaseGeometry,
+    predicate: Optional[ str ] = None,
+    distance: Optional[ float ] = None ) -> np.ndarray:
+    """
+    Runs an STR-tree query and scans the pending features.
+    """
+    found = self.tree.query( geom, predicate, distance )
+    idx, garr = self.__pending()
+    if len( idx ):
+      if predicate is None:
+        hit = shapely.intersects( shapely.envelope( garr ), geom.envelope )
+      elif predicate == 'dwithin':
+        hit = shapely.dwithin( garr, geom, distance )
+      else:
+        hit = getattr( shapely, predicate )( garr, geom )
+      found = np.concatenate( ( found, idx[ hit ] ) )
+    return np.sort( found )
+
+  ###
+  def query(
+    self: 'FeatCol',
+    bbox: Tuple[ float, float, float, float ] ) -> List[ int ]:
+    """
+    Returns the features whose bounding box intersects
+    `bbox` = (minx, miny, maxx, maxy).
+    """
+    return self.__search( box( *bbox ) ).tolist()
+
+  ###
+  def intersects(
+    self: 'FeatCol',
+    geom: BaseGeometry ) -> List[ int ]:
+    """
+    Returns the features that intersect `geom`.
+    """
+    return self.__search( geom, 'intersects' ).tolist()
+
+  ###
+  def nearest(
+    self: 'FeatCol',
+    geom: BaseGeometry,
+    k: int = 1 ) -> List[ int ]:
+    """
+    Returns the `k` features closest to `geom`, nearest first.
+    The search radius starts at the distance of the nearest feature and
+    doubles until at least `k` features are within it.
+    """
+    if not self.geoms or k <= 0:
+      return []
+    # Missing and empty geometries are never within any distance
+    tree = self.tree
+    idx, garr = self.__pending()
+    present = self.__present + _count_present( garr )
+    if present == 0:
+      return []
+
+    dist = []
+    if self.__indexed:
+      nearest = tree.query_nearest( geom, return_distance = True )[ 1 ]
+      if len( nearest ):
+        dist.append( nearest[ 0 ] )
+    if len( idx ):
+      pending = shapely.distance( garr, geom )
+      if not np.isnan( pending ).all():
+        dist.append( np.nanmin( pending ) )
+    radius = min( dist )
+    step = max( radius, 1.0e-9 )
+    while True:
+      found = self.__search( geom, 'dwithin', radius )
+      if len( found ) >= min( k, present ):
+        break
+      radius += step
+      step *= 2.0
+
+    garr = np.empty( len( found ), dtype = object )
+    garr[ : ] = [ self.geoms[ i ] for i in found ]
+    order = np.argsort( shapely.distance( garr, geom ), kind = 'stable' )
+    return found[ order[ : k ] ].tolist()
+
+  ###
+  def save(
+    self: 'FeatCol',
+    path: str ) -> None:
+    """
+    Writes the collection and its index parameters to `path`.
+    Geometries are stored as WKB, shapely cannot serialize the tree itself
+    so it is bulk-loaded again on the first query after `load`.
+    """
+    state = {
+      'props': self.props,
+      'wkb': shapely.to_wkb( self.geoms ),
+      'srid': self.srid,
+      'node_capacity': self.node_capacity,
+      'rebuild_ratio': self.rebuild_ratio }
+    with open( path, 'wb' ) as f:
+      pickle.dump( state, f, pickle.HIGHEST_PROTOCOL )
 
   ###
   @classmethod
-  def reproject(
-    cls: 'Feat',
-    feat: 'Feat',
-    srid: int,
-    antimeridian_cutting: bool = False,
-    antimeridian_offset: float = 10.0,
-    precision: int = -1 ) -> 'Geom':
+  def load(
+    cls: 'FeatCol',
+    path: str ) -> 'FeatCol':
     """
+    Reads a collection written by `save`.
     """
-    #return cls( reproject( feat.dict, feat.srid, srid,
-      #antimeridian_cutting, antimeridian_offset, precision ), srid = srid )
+    with open( path, 'rb' ) as f:
+      state = pickle.load( f )
+    geoms = shapely.from_wkb( state[ 'wkb' ] ).tolist()
+    return cls( zip( state[ 'props' ], geoms ), state[ 'srid' ],
+      state[ 'node_capacity' ], state[ 'rebuild_ratio' ] )
+
+###
+def _count_present(
+  garr: np.ndarray ) -> int:
+  """
+  Counts the geometries that are neither missing nor empty.
+  """
+  return int( ( ~( shapely.is_missing( garr ) | shapely.is_empty( garr ) ) ).sum() )
+
+################################################################################
+
+###
+# Predicate -> the predicate with its arguments swapped
+SJOIN_PREDICATES = {
+  'intersects': 'intersects',
+  'contains': 'within',
+  'within': 'contains',
+  'covers': 'covered_by',
+  'covered_by': 'covers',
+  'touches': 'touches',
+  'crosses': 'crosses',
+  'overlaps': 'overlaps',
+  'equals': 'equals',
+  'contains_properly': None }
+
+###
+Features = Union[ FeatCol, Sequence[ FeatPair ] ]
+
+###
+def sjoin(
+  left: Features,
+  right: Features,
+  predicate: str = 'intersects',
+  chunk_size: int = CHUNK_SIZE,
+  workers: Optional[ int ] = 1,
+  properties: bool = True,
+  suffixes: Tuple[ str, str ] = ( '_left', '_right' ) ) -> Tuple[ np.ndarray, Optional[ List[ Dict[ str, Any ] ] ] ]:
+  """
+  Joins two collections of (properties, geometry) pairs, e.g. the output
+  of `dataset_extract`, on `predicate( left geometry, right geometry )`.
+  The smaller side is indexed with an STR-tree and prepared, the larger
+  side is queried against it `chunk_size` features at a time, by a pool
+  of `workers` processes if more than one (`None` uses every core).
+  When the right side is indexed the predicate is evaluated with swapped
+  arguments, so the prepared geometry is always the first.
+
+  Returns a (k, 2) array of (left index, right index) pairs sorted by left
+  then right index, and the merged properties of each pair if `properties`
+  is set. Property names found on both sides get `suffixes`.
+  """
+  if predicate not in SJOIN_PREDICATES:
+    raise ValueError( f"sjoin: unsupported predicate ({predicate})" )
+
+  lprops, lgeoms = _sjoin_side( left )
+  rprops, rgeoms = _sjoin_side( right )
+  swap = len( rgeoms ) < len( lgeoms )
+  if swap:
+    index, probe = rgeoms, lgeoms
+  else:
+    index, probe = lgeoms, rgeoms
+  opts = { 'predicate': predicate, 'swap': swap }
+
+  found = [ pairs for _, pairs in _sjoin_render( index, probe, opts, chunk_size, workers ) ]
+  pairs = np.concatenate( found ) if found else np.empty( ( 0, 2 ), dtype = np.int64 )
+  if len( pairs ):
+    pairs = pairs[ np.lexsort( ( pairs[ :, 1 ], pairs[ :, 0 ] ) ) ]
+
+  if not properties:
+    return pairs, None
+  # Rows may not share their keys (e.g. after `FeatCol.insert`), clashes
+  # are found per pair
+  merged = []
+  for i, j in pairs.tolist():
+    lp, rp = lprops[ i ], rprops[ j ]
+    common = lp.keys() & rp.keys()
+    row = { ( k + suffixes[ 0 ] if k in common else k ): v for k, v in lp.items() }
+    row.update( ( ( k + suffixes[ 1 ] if k in common else k ), v ) for k, v in rp.items() )
+    merged.append( row )
+  return pairs, merged
+
+###
+def _sjoin_side(
+  feats: Features ) -> Tuple[ List[ Dict[ str, Any ] ], np.ndarray ]:
+  """
+  """
+  if isinstance( feats, FeatCol ):
+    props, geoms = feats.props, feats.geoms
+  else:
+    props = [ p for p, _ in feats ]
+    geoms = [ g for _, g in feats ]
+  garr = np.empty( len( geoms ), dtype = object )
+  garr[ : ] = geoms
+  return props, garr
+
+###
+def _sjoin_render(
+  index: np.ndarray,
+  probe: np.ndarray,
+  opts: Dict[ str, Any ],
+  chunk_size: int,
+  workers: Optional[ int ] ) -> Iterator[ Tuple[ int, np.ndarray ] ]:
+  """
+  Runs `_sjoin_chunk` over the probe side in this process or in a pool
+  (see `bounded_map`).
+  """
+  starts = range( 0, len( probe ), chunk_size )
+  workers = workers or os.cpu_count() or 1
+  if workers == 1:
+    _sjoin_init( index, opts )
+    try:
+      for start in starts:
+        yield start, _sjoin_chunk( start, probe[ start : start + chunk_size ] )
+    finally:
+      _SJOIN.clear()
+    return
+
+  with ProcessPoolExecutor( workers, initializer = _sjoin_init,
+      initargs = ( index, opts ) ) as pool:
+    tasks = ( ( start, _sjoin_chunk, ( start, probe[ start : start + chunk_size ] ) ) for start in starts )
+    yield from bounded_map( pool, tasks, workers )
+
+###
+# Per-process join state, set up once per worker by `_sjoin_init`
+_SJOIN: Dict[ str, Any ] = {}
+
+###
+def _sjoin_init(
+  index: np.ndarray,
+  opts: Dict[ str, Any ] ) -> None:
+  """
+  """
+  shapely.prepare( index )
+  _SJOIN[ 'index' ] = index
+  _SJOIN[ 'tree' ] = shapely.STRtree( index )
+  _SJOIN[ 'opts' ] = opts
+
+###
+def _sjoin_chunk(
+  start: int,
+  probe: np.ndarray ) -> np.ndarray:
+  """
+  Joins a chunk of the probe side, starting at `start`, against the index.
+  Returns (left index, right index) pairs.
+  """
+  index = _SJOIN[ 'index' ]
+  opts = _SJOIN[ 'opts' ]
+  predicate = opts[ 'predicate' ]
+  swap = opts[ 'swap' ]
+
+  # Candidates by bounding box, then the predicate on the prepared side
+  pi, ti = _SJOIN[ 'tree' ].query( probe )
+  if not swap:
+    hit = getattr( shapely, predicate )( index[ ti ], probe[ pi ] )
+  elif SJOIN_PREDICATES[ predicate ] is not None:
+    hit = getattr( shapely, SJOIN_PREDICATES[ predicate ] )( index[ ti ], probe[ pi ] )
+  else:
+    hit = getattr( shapely, predicate )( probe[ pi ], index[ ti ] )
+  pi = pi[ hit ] + start
+  ti = ti[ hit ]
+  return np.stack( ( pi, ti ) if swap else ( ti, pi ), axis = 1 ).astype( np.int64 )
 
 ################################################################################
+
+###
+def dissolve(
+  feats: Iterable[ Any ],
+  by: Union[ str, Sequence[ str ] ],
+  gtype: Optional[ str ] = None,
+  srid: Optional[ int ] = None,
+  promote: bool = False,
+  partial_size: int = 1 << 16,
+  workers: Optional[ int ] = 1 ) -> List[ Tuple[ Dict[ str, Any ], Optional[ Geom ] ] ]:
+  """
+  Merges the geometries of features sharing the values of the `by`
+  properties. `feats` may be (properties, geometry) pairs, with shapely
+  geometries or `Geom`s, `Feat`s or a `FeatCol`, and is consumed as a
+  stream: once a group holds `partial_size` geometries they are reduced to
+  a partial union, so no group is ever held in memory whole. Partial and
+  final unions are cascaded (`shapely.union_all`) and run on a pool of
+  `workers` processes if more than one (`None` uses every core). Partial
+  unions of features in file order overlap spatially and cost more than
+  one union of the whole group, the threshold is meant for very large
+  groups only.
+
+  Returns one (properties, `Geom`) pair per group in order of first
+  appearance, the properties holding only the `by` fields. Geometries are
+  shaped as `build_geometry` would: restricted to `gtype` if given, as
+  Multi* if `promote` is set, `None` if the group has no geometry.
+  The results are in the srid of the input `Geom`s or `FeatCol`, mixed
+  srids raise `ValueError`. `srid` is the one of plain shapely geometries
+  (4326 by default) and, if given, must match the inputs.
+  """
+  fields = [ by ] if isinstance( by, str ) else list( by )
+  if srid is None and isinstance( feats, FeatCol ):
+    srid = feats.srid
+  if gtype is not None and gtype not in GTYPES:
+    raise ValueError( f"dissolve: unsupported gtype ({gtype})" )
+
+  groups = {}
+  partials = {}
+
+  # Grouping is driven by `bounded_map` pulling partial unions, so the
+  # input is only read as fast as the pool takes them
+  def tasks() -> Iterator[ Tuple[ Any, Callable, Tuple[ Any, ... ] ] ]:
+    nonlocal srid
+    for props, geom, gsrid in _dissolve_pairs( feats ):
+      if gsrid is not None and gsrid != srid:
+        if srid is not None:
+          raise ValueError( f"dissolve: mixed srids ({srid}, {gsrid})" )
+        srid = gsrid
+      key = tuple( props.get( f ) for f in fields )
+      group = groups.setdefault( key, [] )
+      if geom is None:
+        continue
+      group.append( geom )
+      if len( group ) >= partial_size:
+        groups[ key ] = []
+        yield key, _dissolve_union, ( group, )
+
+  workers = workers or os.cpu_count() or 1
+  pool = ProcessPoolExecutor( workers ) if workers > 1 else None
+  try:
+    for key, geom in bounded_map( pool, tasks(), workers, ordered = False ):
+      partials.setdefault( key, [] ).append( geom )
+    finals = ( ( key, _dissolve_final, ( partials.get( key, [] ) + group, gtype, promote ) )
+      for key, group in groups.items() )
+    merged = dict( bounded_map( pool, finals, workers, ordered = False ) )
+  finally:
+    if pool is not None:
+      pool.shutdown()
+
+  if srid is None:
+    srid = 4326
+  return [
+    ( dict( zip( fields, key ) ), None if merged[ key ] is None else Geom( merged[ key ], srid = srid ) )
+    for key in groups ]
+
+###
+def _dissolve_pairs(
+  feats: Iterable[ Any ] ) -> Iterator[ Tuple[ Dict[ str, Any ], Optional[ BaseGeometry ], Optional[ int ] ] ]:
+  """
+  Yields (properties, shapely geometry, srid) triples, the srid is `None`
+  unless the geometry was a `Geom`.
+  """
+  for feat in feats:
+    if isinstance( feat, Feat ):
+      props, geom = feat.props, feat.geom
+    else:
+      props, geom = feat
+    if isinstance( geom, Geom ):
+      yield props, geom.shape, geom.srid
+    else:
+      yield props, geom, None
+
+###
+def _dissolve_union(
+  geoms: List[ BaseGeometry ] ) -> Optional[ BaseGeometry ]:
+  """
+  """
+  garr = np.empty( len( geoms ), dtype = object )
+  garr[ : ] = geoms
+  geom = shapely.union_all( garr )
+  return None if geom.is_empty else geom
+
+###
+def _dissolve_final(
+  geoms: List[ Optional[ BaseGeometry ] ],
+  gtype: Optional[ str ],
+  promote: bool ) -> Optional[ BaseGeometry ]:
+  """
+  """
+  geom = _dissolve_union( [ g for g in geoms if g is not None ] )
+  if geom is not None and gtype is not None:
+    geom = build_geometry( collection_extract( geom, gtype ) )
+  return multi( geom ) if promote else geom
+
+################################################################################
+
+###
+_DTYPES = {
+  'int': np.int64,
+  'float': np.float64,
+  'bool': np.bool_ }
+
+###
+_MULTI = {
+  shapely.GeometryType.POINT: shapely.GeometryType.MULTIPOINT,
+  shapely.GeometryType.LINESTRING: shapely.GeometryType.MULTILINESTRING,
+  shapely.GeometryType.POLYGON: shapely.GeometryType.MULTIPOLYGON }
+
+###
+Ragged = Tuple[ shapely.GeometryType, np.ndarray, Tuple[ np.ndarray, ... ] ]
+
+###
+class ArrayFeatCol:
+  """
+  A columnar feature collection.
+  Geometries live in GeoArrow-style flat buffers: one coordinate array plus
+  one offsets array per nesting level (see `shapely.to_ragged_array`).
+  Properties live in one typed array per field.
+  `Geom` and `Feat` objects are only created when a feature is accessed.
+
+  All geometries must share one type; single and multi geometries of the
+  same family are stored as multi. Missing geometries are stored as empty.
+  Geoms handed out get `policy` as their `ReprPolicy` when it is set.
+  """
+
+  ###
+  def __init__(
+    self: 'ArrayFeatCol',
+    geom_type: shapely.GeometryType,
+    coords: np.ndarray,
+    offsets: Tuple[ np.ndarray, ... ],
+    columns: Dict[ str, np.ndarray ],
+    srid: int = 4326 ) -> None:
+    """
+    """
+    self.geom_type = geom_type
+    self.coords = coords
+    self.offsets = offsets
+    self.columns = columns
+    self.srid = srid
+    self.policy = None
+
+  ###
+  @classmethod
+  def from_features(
+    cls: 'ArrayFeatCol',
+    feats: Iterable[ FeatPair ],
+    schema: Optional[ Dict[ str, Any ] ] = None,
+    srid: int = 4326 ) -> 'ArrayFeatCol':
+    """
+    Builds a collection from (properties, geometry) pairs, consuming them
+    `CHUNK_SIZE` at a time. `schema` is a fiona schema, without one the
+    fields are taken from the first chunk and stored untyped.
+    """
+    feats = iter( feats )
+    chunks = iter( lambda: list( islice( feats, CHUNK_SIZE ) ), [] )
+    return cls.__from_chunks( chunks, schema, srid )
+
+  ###
+  @classmethod
+  def from_dataset(
+    cls: 'ArrayFeatCol',
+    dataset: str,
+    gtype: str,
+    dst_srid: int = 0,
+    **kwargs ) -> 'ArrayFeatCol':
+    """
+    Extracts a dataset with `iter_dataset` straight into columns, typed
+    after `source.meta['schema']`.
+    """
+    with open_dataset( dataset, kwargs ) as source:
+      schema = dataset_schema( source, kwargs )
+      if dst_srid == 0:
+        dst_srid = dataset_srid( source )
+    kwargs.setdefault( 'chunk_size', CHUNK_SIZE )
+    chunks = iter_dataset( dataset, gtype, dst_srid, **kwargs )
+    return cls.__from_chunks( chunks, schema, dst_srid )
+
+  ###
+  @classmethod
+  def __from_chunks(
+    cls: 'ArrayFeatCol',
+    chunks: Iterable[ List[ FeatPair ] ],
+    schema: Optional[ Dict[ str, Any ] ],
+    srid: int ) -> 'ArrayFeatCol':
+    """
+    """
+    # Chunks without any geometry have no type of their own, they are
+    # kept as counts until the type of the collection is known
+    parts = []
+    columns = []
+    for chunk in chunks:
+      if not chunk:
+        continue
+      garr = np.empty( len( chunk ), dtype = object )
+      garr[ : ] = [ g for _, g in chunk ]
+      if shapely.is_missing( garr ).all():
+        parts.append( len( chunk ) )
+      else:
+        parts.append( shapely.to_ragged_array( garr ) )
+      if schema is None:
+        schema = { 'properties': dict.fromkeys( chunk[ 0 ][ 0 ], 'str' ) }
+      columns.append( property_columns( [ p for p, _ in chunk ], schema ) )
+
+    if not parts:
+      return cls( shapely.GeometryType.POINT, np.empty( ( 0, 2 ) ), (),
+        property_columns( [], schema ), srid )
+
+    typed = [ p for p in parts if not isinstance( p, int ) ]
+    empty = shapely.from_wkt( f"{ typed[ 0 ][ 0 ].name if typed else 'POINT' } EMPTY" )
+    parts = [ shapely.to_ragged_array( np.full( p, empty, dtype = object ) )
+      if isinstance( p, int ) else p for p in parts ]
+    geom_type, coords, offsets = ragged_concat( parts )
+    columns = {
+      name: np.concatenate( [ c[ name ] for c in columns ] )
+      for name in columns[ 0 ] }
+    return cls( geom_type, coords, offsets, columns, srid )
+
+  ###
+  def __len__(
+    self: 'ArrayFeatCol' ) -> int:
+    """
+    """
+    if self.offsets:
+      return len( self.offsets[ -1 ] ) - 1
+    return len( self.coords )
+
+  ###
+  def __getitem__(
+    self: 'ArrayFeatCol',
+    i: int ) -> Feat:
+    """
+    """
+    return Feat( ( self.props( i ), self.geom( i ) ), srid = self.srid )
+
+  ###
+  def __iter__(
+    self: 'ArrayFeatCol' ) -> Iterator[ Feat ]:
+    """
+    """
+    for i in range( len( self ) ):
+      yield self[ i ]
+
+  ###
+  @property
+  def nbytes(
+    self: 'ArrayFeatCol' ) -> int:
+    """
+    Size of the coordinate, offset and property buffers.
+    Object columns only count their pointers.
+    """
+    return (
+      self.coords.nbytes +
+      sum( o.nbytes for o in self.offsets ) +
+      sum( c.nbytes for c in self.columns.values() ) )
+
+  ###
+  def column(
+    self: 'ArrayFeatCol',
+    name: str ) -> np.ndarray:
+    """
+    Returns a property column without copying it.
+    """
+    return self.columns[ name ]
+
+  ###
+  def props(
+    self: 'ArrayFeatCol',
+    i: int ) -> Dict[ str, Any ]:
+    """
+    """
+    return { name: col[ i : i + 1 ].tolist()[ 0 ] for name, col in self.columns.items() }
+
+  ###
+  def shape(
+    self: 'ArrayFeatCol',
+    i: int ) -> BaseGeometry:
+    """
+    Rebuilds the shapely geometry of a single feature from the buffers.
+    """
+    if i < 0:
+      i += len( self )
+    start, stop = i, i + 1
+    offsets = []
+    for off in reversed( self.offsets ):
+      seg = off[ start : stop + 1 ]
+      offsets.append( seg - seg[ 0 ] )
+      start, stop = seg[ 0 ], seg[ -1 ]
+    return shapely.from_ragged_array( self.geom_type,
+      self.coords[ start : stop ], tuple( reversed( offsets ) ) or None )[ 0 ]
+
+  ###
+  def geom(
+    self: 'ArrayFeatCol',
+    i: int ) -> Geom:
+    """
+    """
+    geom = Geom( self.shape( i ), srid = self.srid )
+    if self.policy is not None:
+      geom.policy = self.policy
+    return geom
+
+  ###
+  def shapes(
+    self: 'ArrayFeatCol' ) -> np.ndarray:
+    """
+    Rebuilds every shapely geometry in one pass.
+    """
+    return shapely.from_ragged_array( self.geom_type, self.coords, self.offsets or None )
+
+###
+class PropStore:
+  """
+  Property values of many features as one typed array per field of a
+  shared `Schema` (see `property_columns`). Columns are handed out without
+  copying, rows as `Props` views.
+  """
+
+  ###
+  def __init__(
+    self: 'PropStore',
+    schema: Schema,
+    columns: Dict[ str, np.ndarray ] ) -> None:
+    """
+    """
+    self.schema = schema
+    self.columns = columns
+
+  ###
+  @classmethod
+  def from_props(
+    cls: 'PropStore',
+    props: Iterable[ Dict[ str, Any ] ],
+    schema: Optional[ Schema ] = None ) -> 'PropStore':
+    """
+    Stores property dicts or `Props` rows. Without a `schema` the one of
+    the first row is used, or the keys of the first dict, untyped.
+    """
+    props = list( props )
+    if schema is None:
+      first = props[ 0 ] if props else {}
+      schema = first.schema if isinstance( first, Props ) else Schema( list( first ) )
+    fields = dict( zip( schema.names, schema.types ) )
+    return cls( schema, property_columns( props, { 'properties': fields } ) )
+
+  ###
+  def __len__(
+    self: 'PropStore' ) -> int:
+    """
+    """
+    return len( next( iter( self.columns.values() ) ) ) if self.columns else 0
+
+  ###
+  def __getitem__(
+    self: 'PropStore',
+    i: int ) -> Props:
+    """
+    """
+    return Props( self.schema, tuple( col[ i : i + 1 ].tolist()[ 0 ] for col in self.columns.values() ) )
+
+  ###
+  def __iter__(
+    self: 'PropStore' ) -> Iterator[ Props ]:
+    """
+    """
+    rows = zip( *[ col.tolist() for col in self.columns.values() ] )
+    return ( Props( self.schema, row ) for row in rows )
+
+  ###
+  def column(
+    self: 'PropStore',
+    name: str ) -> np.ndarray:
+    """
+    Returns a column without copying it.
+    """
+    return self.columns[ name ]
+
+  ###
+  @property
+  def nbytes(
+    self: 'PropStore' ) -> int:
+    """
+    Size of the columns, object columns only count their pointers.
+    """
+    return sum( c.nbytes for c in self.columns.values() )
+
+###
+def property_columns(
+  props: Sequence[ Dict[ str, Any ] ],
+  schema: Dict[ str, Any ] ) -> Dict[ str, np.ndarray ]:
+  """
+  Converts property dicts into one array per field of a fiona schema.
+  'int', 'float' and 'bool' fields become typed arrays, everything else,
+  and typed fields holding nulls, become object arrays.
+  """
+  columns = {}
+  for name, ftype in schema[ 'properties' ].items():
+    values = [ p.get( name ) for p in props ]
+    dtype = _DTYPES.get( ftype.split( ':' )[ 0 ], object )
+    if dtype is not object and None not in values:
+      columns[ name ] = np.array( values, dtype = dtype )
+    else:
+      columns[ name ] = np.empty( len( values ), dtype = object )
+      columns[ name ][ : ] = values
+  return columns
+
+###
+def ragged_promote(
+  geom_type: shapely.GeometryType,
+  coords: np.ndarray,
+  offsets: Tuple[ np.ndarray, ... ] ) -> Ragged:
+  """
+  Returns ragged arrays of single geometries as their multi counterpart.
+  """
+  if geom_type not in _MULTI:
+    return geom_type, coords, offsets
+
+  n = len( offsets[ -1 ] ) - 1 if offsets else len( coords )
+  return _MULTI[ geom_type ], coords, offsets + ( np.arange( n + 1 ), )
+
+###
+def ragged_concat(
+  parts: Sequence[ Ragged ] ) -> Ragged:
+  """
+  Concatenates ragged arrays, rebasing each offsets level onto the
+  running size of the level below it. Parts mixing single and multi
+  geometries of one family are promoted to multi.
+  """
+  types = { int( t ) for t, _, _ in parts }
+  if len( types ) > 1:
+    parts = [ ragged_promote( *p ) for p in parts ]
+    types = { int( t ) for t, _, _ in parts }
+    if len( types ) > 1:
+      raise ValueError( 'ragged_concat: mixed geometry types' )
+
+  geom_type = parts[ 0 ][ 0 ]
+  coords = np.concatenate( [ c for _, c, _ in parts ] )
+  offsets = []
+  for level in range( len( parts[ 0 ][ 2 ] ) ):
+    base = 0
+    segs = [ np.zeros( 1, dtype = np.int64 ) ]
+    for _, c, o in parts:
+      segs.append( o[ level ][ 1 : ].astype( np.int64 ) + base )
+      base += len( c ) if level == 0 else len( o[ level - 1 ] ) - 1
+    offsets.append( np.concatenate( segs ) )
+  return geom_type, coords, tuple( offsets )
@@ -1,11 +1,20 @@
 
+from collections import OrderedDict
 import copy
-from functools import singledispatch
+from functools import lru_cache, singledispatch
 import json
-from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+import math
+import sys
+from types import MethodType
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+import weakref
 
-from fiona.transform import transform_geom
+from fiona.crs import CRS
+from fiona.transform import transform, transform_geom
 
+import numpy as np
+
+import shapely
 from shapely.geometry import mapping, shape
 from shapely.geometry.base import BaseGeometry, BaseMultipartGeometry
 from shapely.geometry import Point, MultiPoint
@@ -20,6 +29,60 @@ Types = (
   Polygon, MultiPolygon,
   GeometryCollection )
 
+###
+# Conversions between `Geom` representations, looked up at call time so
+# `pygis.vec.instrument` can swap in measured versions
+_wkb_to_shape = shapely.from_wkb
+_dict_to_shape = shape
+_geojson_to_shape = shapely.from_geojson
+_geojson_to_dict = json.loads
+_shape_to_dict = mapping
+_dict_to_geojson = json.dumps
+_shape_to_wkb = shapely.to_wkb
+
+###
+def _canonical_wkb(
+  val: bytes ) -> bytes:
+  """
+  Returns `val` as `_shape_to_wkb` would write it: little-endian extended
+  WKB without an SRID. Other WKB is re-encoded, so equal geometries have
+  equal bytes.
+  """
+  if val[ : 1 ] == b'\x01':
+    code = int.from_bytes( val[ 1 : 5 ], 'little' )
+    if not code & 0x20000000 and code & 0xffff < 1000:
+      return val
+  return _shape_to_wkb( _wkb_to_shape( val ) )
+
+###
+class dualmethod:
+  """
+  A method with one implementation when called on an instance and another
+  when called on the class, e.g. `g.multi()` versus `Geom.multi( g )`.
+  """
+
+  ###
+  def __init__(
+    self: 'dualmethod',
+    finst: Callable,
+    fcls: Callable ) -> None:
+    """
+    """
+    self.finst = finst
+    self.fcls = fcls
+    self.__doc__ = fcls.__doc__
+
+  ###
+  def __get__(
+    self: 'dualmethod',
+    obj: Any,
+    cls: type = None ) -> Callable:
+    """
+    """
+    if obj is None:
+      return MethodType( self.fcls, cls )
+    return MethodType( self.finst, obj )
+
 ###
 class Geom:
   """
@@ -27,6 +90,18 @@ class Geom:
     http://peak.telecommunity.com/DevCenter/Trellis
   """
 
+  ###
+  __slots__ = (
+    '__shape', '__dict', '__geojson', '__wkb', '__policy', 'srid', '__weakref__' )
+
+  ###
+  default_policy = None
+
+  ###
+  # Shared `LODCache` used by `simplified`, opt-in: with `None` every call
+  # simplifies again
+  lod_cache = None
+
   ###
   def __eq__(
       self: 'Geom',
@@ -34,12 +109,38 @@ class Geom:
     """
     """
     if isinstance( other, self.__class__ ):
-      return (
-        self.shape == other.shape and
-        self.srid == other.srid )
+      if self.srid != other.srid:
+        return False
+      # Compare the binary form if neither side has to build a shape for it
+      if self.__wkb is not None and other.__wkb is not None:
+        return self.__wkb == other.__wkb
+      return self.shape == other.shape
     else:
       return False
 
+  ###
+  def __hash__(
+    self: 'Geom' ) -> int:
+    """
+    """
+    return hash( ( self.wkb, self.srid ) )
+
+  ###
+  def __getstate__(
+    self: 'Geom' ) -> Dict[ str, Any ]:
+    """
+    Geoms are pickled as WKB.
+    """
+    return { 'wkb': self.wkb, 'srid': self.srid }
+
+  ###
+  def __setstate__(
+    self: 'Geom',
+    state: Dict[ str, Any ] ) -> None:
+    """
+    """
+    self.__init__( state[ 'wkb' ], srid = state[ 'srid' ] )
+
   ###
   def __init__(
     self: 'Geom',
@@ -48,32 +149,34 @@ class Geom:
     """
     """
     # Initialize geometry
-    init_registry = self.__init.registry
-    self.__init = singledispatch( init_registry[ object ] )
-    self.__init.register( BaseGeometry, self.__init_from_shapely )
-    self.__init.register( dict, self.__init_from_dict )
-    self.__init.register( str, self.__init_from_geojson )
     self.__shape = None
     self.__dict = None
     self.__geojson = None
-    self.__init( arg )
+    self.__wkb = None
+    self.__policy = self.default_policy
+    try:
+      init = self.__inits[ arg.__class__ ]
+    except KeyError:
+      init = self.__resolve( arg.__class__ )
+    init( self, arg )
 
     # Initialize other vars
     self.srid = srid
 
-    # Hacky ¯\_(ツ)_/¯
-    self.collection_extract = self.__collection_extract
-    self.multi = self.__multi
-    self.reproject = self.__reproject
-
   ###
-  @singledispatch
-  def __init(
-    self: 'Geom',
-    arg: Union[ BaseGeometry, Dict[ str, Any ], str ] ) -> None:
+  @classmethod
+  def __resolve(
+    cls: 'Geom',
+    argtype: type ) -> Callable:
     """
+    Finds the initializer for `argtype` along its MRO and caches it in the
+    class-level dispatch table.
     """
-    raise TypeError( f"{type( arg )} not supported." )
+    for base in argtype.__mro__:
+      if base in cls.__inits:
+        init = cls.__inits[ argtype ] = cls.__inits[ base ]
+        return init
+    raise TypeError( f"{argtype} not supported." )
 
   ###
   def __init_from_shapely(
@@ -99,15 +202,40 @@ class Geom:
     """
     self.__geojson = arg
 
+  ###
+  def __init_from_wkb(
+    self: 'Geom',
+    arg: bytes ) -> None:
+    """
+    """
+    self.__wkb = _canonical_wkb( arg )
+
+  ###
+  __inits = {
+    BaseGeometry: __init_from_shapely,
+    dict: __init_from_dict,
+    str: __init_from_geojson,
+    bytes: __init_from_wkb }
+
   ###
   @property
   def shape(
     self: 'Geom' ) -> BaseGeometry:
     """
     """
-    if self.__shape is None:
-      self.__shape = shape( self.dict )
-    return self.__shape
+    val = self.__shape
+    if val is None:
+      if self.__wkb is not None:
+        val = self.__shape = _wkb_to_shape( self.__wkb )
+      elif self.__dict is not None:
+        val = self.__shape = _dict_to_shape( self.__dict )
+      else:
+        val = self.__shape = _geojson_to_shape( self.__geojson )
+      if self.__policy is not None:
+        self.__policy.note( self, 'shape' )
+    elif self.__policy is not None:
+      self.__policy.touch( self, 'shape' )
+    return val
 
   ###
   @shape.setter
@@ -118,9 +246,14 @@ class Geom:
     """
     if self.__shape is val:
       return
+    if self.__policy is not None:
+      self.__policy.forget( self )
+    if _LOD_CACHES:
+      _lod_forget( self )
     self.__shape = val
     self.__dict = None
     self.__geojson = None
+    self.__wkb = None
 
   ###
   @property
@@ -128,12 +261,17 @@ class Geom:
     self: 'Geom' ) -> Dict[ str, Any ]:
     """
     """
-    if self.__dict is None:
-      if self.__shape is None:
-        self.__dict = json.loads( self.geojson )
+    val = self.__dict
+    if val is None:
+      if self.__shape is None and self.__wkb is None:
+        val = self.__dict = _geojson_to_dict( self.__geojson )
       else:
-        self.__dict = mapping( self.shape )
-    return self.__dict
+        val = self.__dict = _shape_to_dict( self.shape )
+      if self.__policy is not None:
+        self.__policy.note( self, 'dict' )
+    elif self.__policy is not None:
+      self.__policy.touch( self, 'dict' )
+    return val
 
   ###
   @dict.setter
@@ -144,9 +282,14 @@ class Geom:
     """
     if self.__dict is val:
       return
+    if self.__policy is not None:
+      self.__policy.forget( self )
+    if _LOD_CACHES:
+      _lod_forget( self )
     self.__shape = None
     self.__dict = val
     self.__geojson = None
+    self.__wkb = None
 
   ###
   @property
@@ -154,9 +297,14 @@ class Geom:
     self: 'Geom' ) -> str:
     """
     """
-    if self.__geojson is None:
-      self.__geojson = json.dumps( self.dict )
-    return self.__geojson
+    val = self.__geojson
+    if val is None:
+      val = self.__geojson = _dict_to_geojson( self.dict )
+      if self.__policy is not None:
+        self.__policy.note( self, 'geojson' )
+    elif self.__policy is not None:
+      self.__policy.touch( self, 'geojson' )
+    return val
 
   ###
   @geojson.setter
@@ -167,9 +315,115 @@ class Geom:
     """
     if self.__geojson is val:
       return
+    if self.__policy is not None:
+      self.__policy.forget( self )
+    if _LOD_CACHES:
+      _lod_forget( self )
     self.__shape = None
     self.__dict = None
     self.__geojson = val
+    self.__wkb = None
+
+  ###
+  @property
+  def wkb(
+    self: 'Geom' ) -> bytes:
+    """
+    """
+    val = self.__wkb
+    if val is None:
+      val = self.__wkb = _shape_to_wkb( self.shape )
+      if self.__policy is not None:
+        self.__policy.note( self, 'wkb' )
+    elif self.__policy is not None:
+      self.__policy.touch( self, 'wkb' )
+    return val
+
+  ###
+  @wkb.setter
+  def wkb(
+    self: 'Geom',
+    val: bytes ) -> None:
+    """
+    """
+    if self.__wkb is val:
+      return
+    if self.__policy is not None:
+      self.__policy.forget( self )
+    if _LOD_CACHES:
+      _lod_forget( self )
+    self.__shape = None
+    self.__dict = None
+    self.__geojson = None
+    self.__wkb = _canonical_wkb( val )
+
+  ###
+  @property
+  def policy(
+    self: 'Geom' ) -> Optional[ 'ReprPolicy' ]:
+    """
+    The `ReprPolicy` managing this geometry's representations, new
+    geometries start with `Geom.default_policy`.
+    """
+    return self.__policy
+
+  ###
+  @policy.setter
+  def policy(
+    self: 'Geom',
+    val: Optional[ 'ReprPolicy' ] ) -> None:
+    """
+    """
+    if self.__policy is val:
+      return
+    if self.__policy is not None:
+      self.__policy.forget( self )
+    self.__policy = val
+    if val is not None:
+      val.note( self )
+
+  ###
+  def representations(
+    self: 'Geom' ) -> Dict[ str, Any ]:
+    """
+    Returns the representations currently held, by name.
+    """
+    forms = {
+      'shape': self.__shape,
+      'dict': self.__dict,
+      'geojson': self.__geojson,
+      'wkb': self.__wkb }
+    return { k: v for k, v in forms.items() if v is not None }
+
+  ###
+  def nbytes(
+    self: 'Geom' ) -> Dict[ str, int ]:
+    """
+    Returns the approximate size in bytes of each representation held.
+    """
+    return { k: repr_nbytes( k, v ) for k, v in self.representations().items() }
+
+  ###
+  def discard(
+    self: 'Geom',
+    form: str ) -> bool:
+    """
+    Drops a representation, it is rebuilt from the others on next access.
+    The last representation held is never dropped.
+    Returns `True` if the representation was dropped.
+    """
+    forms = self.representations()
+    if form not in forms or len( forms ) == 1:
+      return False
+    if form == 'shape':
+      self.__shape = None
+    elif form == 'dict':
+      self.__dict = None
+    elif form == 'geojson':
+      self.__geojson = None
+    else:
+      self.__wkb = None
+    return True
 
   ###
   @property
@@ -216,7 +470,7 @@ class Geom:
     return [ self.__class__( g, srid = self.srid ) for g in glist ]
 
   ###
-  def collection_extract(
+  def __class_collection_extract(
     cls: 'Geom',
     geom: 'Geom',
     gtype: str ) -> List[ 'Geom' ]:
@@ -225,6 +479,9 @@ class Geom:
     glist = collection_extract( geom.shape, gtype )
     return [ cls( g, srid = geom.srid ) for g in glist ]
 
+  ###
+  collection_extract = dualmethod( __collection_extract, __class_collection_extract )
+
   ###
   def __multi(
     self: 'Geom' ) -> None:
@@ -233,13 +490,37 @@ class Geom:
     self.shape = multi( self.shape )
 
   ###
-  @classmethod
-  def multi(
+  def __class_multi(
     cls: 'Geom',
     geom: 'Geom' ) -> 'Geom':
     """
     """
-    return cls( multi( geom.shape ) )
+    return cls( multi( geom.shape ), srid = geom.srid )
+
+  ###
+  multi = dualmethod( __multi, __class_multi )
+
+  ###
+  def simplified(
+    self: 'Geom',
+    tolerance: Optional[ float ] = None,
+    zoom: Optional[ float ] = None,
+    cache: Optional[ 'LODCache' ] = None ) -> BaseGeometry:
+    """
+    Returns the shape simplified, preserving topology, for display at web
+    map `zoom` or for a `tolerance` in srid units. Both are snapped to the
+    nearest zoom level at least as fine, so requests at similar scales
+    share one version, kept in `cache` (default `Geom.lod_cache`).
+    """
+    if zoom is None:
+      if tolerance is None:
+        raise ValueError( 'simplified: tolerance or zoom is required' )
+      zoom = tolerance_zoom( tolerance, self.srid )
+    level = max( 0, math.ceil( zoom ) )
+    cache = cache if cache is not None else self.lod_cache
+    if cache is None:
+      return simplify_level( self.shape, level, self.srid )
+    return cache.get( self, level )
 
   ###
   def __reproject(
@@ -255,8 +536,7 @@ class Geom:
     self.srid = srid
 
   ###
-  @classmethod
-  def reproject(
+  def __class_reproject(
     cls: 'Geom',
     geom: 'Geom',
     srid: int,
@@ -268,6 +548,357 @@ class Geom:
     return cls( reproject( geom.dict, geom.srid, srid,
       antimeridian_cutting, antimeridian_offset, precision ), srid = srid )
 
+  ###
+  reproject = dualmethod( __reproject, __class_reproject )
+
+  ###
+  @classmethod
+  def reproject_many(
+    cls: 'Geom',
+    geoms: Sequence[ Optional[ 'Geom' ] ],
+    srid: int,
+    antimeridian_cutting: bool = False,
+    antimeridian_offset: float = 10.0,
+    precision: int = -1 ) -> List[ Optional[ 'Geom' ] ]:
+    """
+    Reprojects a sequence of geometries in bulk.
+    Geometries are grouped by source srid and each group is transformed
+    with a single call to `reproject_batch`.
+    The result is aligned with the input, `None` entries are preserved.
+    """
+    geoms = list( geoms )
+    groups = {}
+    for i, g in enumerate( geoms ):
+      if g is not None:
+        groups.setdefault( g.srid, [] ).append( i )
+
+    result = [ None ] * len( geoms )
+    for src_srid, idx in groups.items():
+      glist = reproject_batch( [ geoms[ i ].shape for i in idx ], src_srid, srid,
+        antimeridian_cutting, antimeridian_offset, precision )
+      for i, g in zip( idx, glist ):
+        result[ i ] = cls( g, srid = srid )
+
+    return result
+
+################################################################################
+
+###
+class ReprPolicy:
+  """
+  Bounds the memory spent on redundant `Geom` representations.
+  Every representation other than `canonical` that a geometry holds next
+  to another one is tracked; once the tracked total exceeds `budget` bytes
+  the least recently used are dropped. A geometry always keeps at least one
+  representation, the others are rebuilt from it on access.
+  Install it globally with `Geom.default_policy` or assign it to the
+  `policy` of the geometries of a collection.
+  """
+
+  ###
+  def __init__(
+    self: 'ReprPolicy',
+    budget: int,
+    canonical: str = 'shape' ) -> None:
+    """
+    """
+    if canonical not in REPRESENTATIONS:
+      raise ValueError( f"ReprPolicy: unknown representation ({canonical})" )
+    self.budget = budget
+    self.canonical = canonical
+    self.total = 0
+    self.evictions = 0
+    self.__entries = OrderedDict()
+    self.__refs = {}
+
+  ###
+  def note(
+    self: 'ReprPolicy',
+    geom: Geom,
+    form: Optional[ str ] = None ) -> None:
+    """
+    Called by `Geom` after building `form`: starts tracking the secondary
+    representations of `geom`, marks `form` most recently used and evicts
+    down to the budget.
+    """
+    gid = id( geom )
+    forms = geom.representations()
+    if len( forms ) < 2:
+      return
+    if gid not in self.__refs:
+      self.__refs[ gid ] = weakref.ref( geom, lambda _, gid = gid: self.__drop( gid ) )
+    for f, obj in forms.items():
+      key = ( gid, f )
+      if f != self.canonical and key not in self.__entries:
+        nbytes = repr_nbytes( f, obj )
+        self.__entries[ key ] = nbytes
+        self.total += nbytes
+    if form is not None and ( gid, form ) in self.__entries:
+      self.__entries.move_to_end( ( gid, form ) )
+    self.__evict()
+
+  ###
+  def touch(
+    self: 'ReprPolicy',
+    geom: Geom,
+    form: str ) -> None:
+    """
+    Marks a representation of `geom` most recently used.
+    """
+    key = ( id( geom ), form )
+    if key in self.__entries:
+      self.__entries.move_to_end( key )
+
+  ###
+  def forget(
+    self: 'ReprPolicy',
+    geom: Geom ) -> None:
+    """
+    Stops tracking `geom`, e.g. when its representations are replaced.
+    """
+    self.__drop( id( geom ) )
+
+  ###
+  def usage(
+    self: 'ReprPolicy' ) -> Dict[ str, int ]:
+    """
+    Returns the tracked bytes per representation.
+    """
+    result = dict.fromkeys( REPRESENTATIONS, 0 )
+    for ( _, form ), nbytes in self.__entries.items():
+      result[ form ] += nbytes
+    return result
+
+  ###
+  def __drop(
+    self: 'ReprPolicy',
+    gid: int ) -> None:
+    """
+    """
+    if self.__refs.pop( gid, None ) is None:
+      return
+    for form in REPRESENTATIONS:
+      nbytes = self.__entries.pop( ( gid, form ), None )
+      if nbytes is not None:
+        self.total -= nbytes
+
+  ###
+  def __evict(
+    self: 'ReprPolicy' ) -> None:
+    """
+    """
+    while self.total > self.budget and self.__entries:
+      ( gid, form ), nbytes = self.__entries.popitem( last = False )
+      self.total -= nbytes
+      ref = self.__refs.get( gid )
+      geom = ref() if ref is not None else None
+      if geom is not None and geom.discard( form ):
+        self.evictions += 1
+
+###
+REPRESENTATIONS = ( 'shape', 'dict', 'geojson', 'wkb' )
+
+################################################################################
+
+###
+# Width of the world in srid units, for zoom level tolerances; projected
+# srids not listed are assumed to be in meters
+WORLD_WIDTH = {
+  4326: 360.0,
+  3857: 40075016.68557849 }
+
+###
+def zoom_tolerance(
+  zoom: int,
+  srid: int,
+  tile_size: int = 256 ) -> float:
+  """
+  Returns the size of a pixel at `zoom`, in srid units.
+  """
+  return WORLD_WIDTH.get( srid, WORLD_WIDTH[ 3857 ] ) / ( tile_size * 2.0 ** zoom )
+
+###
+def tolerance_zoom(
+  tolerance: float,
+  srid: int,
+  tile_size: int = 256 ) -> int:
+  """
+  Returns the coarsest zoom level whose pixel is no larger than `tolerance`.
+  """
+  if tolerance <= 0.0:
+    raise ValueError( f"tolerance_zoom: tolerance must be positive ({tolerance})" )
+  width = WORLD_WIDTH.get( srid, WORLD_WIDTH[ 3857 ] ) / tile_size
+  return max( 0, math.ceil( math.log2( width / tolerance ) - 1e-9 ) )
+
+###
+def simplify_level(
+  geom: BaseGeometry,
+  level: int,
+  srid: int ) -> BaseGeometry:
+  """
+  Simplifies `geom` to the pixel size of zoom `level`, preserving topology.
+  """
+  return shapely.simplify( geom, zoom_tolerance( level, srid ), preserve_topology = True )
+
+###
+# Bookkeeping of one `LODCache` entry (key, tuple, index)
+_LOD_ENTRY_BYTES = 160
+
+###
+# Every live `LODCache`, so `Geom` setters can invalidate them
+_LOD_CACHES = weakref.WeakSet()
+
+###
+def _lod_forget(
+  geom: Geom ) -> None:
+  """
+  """
+  for cache in list( _LOD_CACHES ):
+    cache.forget( geom )
+
+###
+class LODCache:
+  """
+  Level-of-detail pyramid of simplified `Geom` shapes.
+  Versions are built lazily from the full resolution shape, one per zoom
+  level, and kept until the total exceeds `budget` bytes, then the least
+  recently used are dropped. Entries follow the lifetime of their `Geom`
+  and are invalidated when its geometry is replaced.
+  Install it globally with `Geom.lod_cache` or pass it to `Geom.simplified`
+  for a single collection.
+  """
+
+  ###
+  def __init__(
+    self: 'LODCache',
+    budget: int = 64 << 20 ) -> None:
+    """
+    """
+    self.budget = budget
+    self.total = 0
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self.__entries = OrderedDict()
+    self.__levels = {}
+    self.__refs = {}
+    _LOD_CACHES.add( self )
+
+  ###
+  def get(
+    self: 'LODCache',
+    geom: Geom,
+    level: int ) -> BaseGeometry:
+    """
+    Returns the shape of `geom` simplified for zoom `level`.
+    """
+    gid = id( geom )
+    key = ( gid, geom.srid, level )
+    entry = self.__entries.get( key )
+    if entry is not None:
+      self.__entries.move_to_end( key )
+      self.hits += 1
+      return entry[ 0 ]
+
+    self.misses += 1
+    full = geom.shape
+    simple = simplify_level( full, level, geom.srid )
+    # Nothing to drop at this scale, share the full resolution shape
+    nbytes = _LOD_ENTRY_BYTES
+    if shapely.get_num_coordinates( simple ) == shapely.get_num_coordinates( full ):
+      simple = full
+    else:
+      nbytes += repr_nbytes( 'shape', simple )
+
+    if gid not in self.__refs:
+      self.__refs[ gid ] = weakref.ref( geom, lambda _, gid = gid: self.__drop( gid ) )
+    self.__entries[ key ] = ( simple, nbytes )
+    self.__levels.setdefault( gid, set() ).add( key )
+    self.total += nbytes
+    self.__evict()
+    return simple
+
+  ###
+  def levels(
+    self: 'LODCache',
+    geom: Geom ) -> List[ int ]:
+    """
+    Returns the zoom levels currently cached for `geom`.
+    """
+    return sorted( key[ 2 ] for key in self.__levels.get( id( geom ), () ) )
+
+  ###
+  def forget(
+    self: 'LODCache',
+    geom: Geom ) -> None:
+    """
+    Drops every version of `geom`, e.g. when its geometry is replaced.
+    """
+    self.__drop( id( geom ) )
+
+  ###
+  def clear(
+    self: 'LODCache' ) -> None:
+    """
+    """
+    self.__entries.clear()
+    self.__levels.clear()
+    self.__refs.clear()
+    self.total = 0
+
+  ###
+  def __drop(
+    self: 'LODCache',
+    gid: int ) -> None:
+    """
+    """
+    self.__refs.pop( gid, None )
+    for key in self.__levels.pop( gid, () ):
+      _, nbytes = self.__entries.pop( key )
+      self.total -= nbytes
+
+  ###
+  def __evict(
+    self: 'LODCache' ) -> None:
+    """
+    """
+    while self.total > self.budget and self.__entries:
+      key, ( _, nbytes ) = self.__entries.popitem( last = False )
+      self.total -= nbytes
+      self.evictions += 1
+      keys = self.__levels[ key[ 0 ] ]
+      keys.discard( key )
+      if not keys:
+        del self.__levels[ key[ 0 ] ]
+        self.__refs.pop( key[ 0 ], None )
+
+###
+def repr_nbytes(
+  form: str,
+  obj: Any ) -> int:
+  """
+  Approximate size of a `Geom` representation.
+  Shapes are estimated from their coordinate count, GEOS keeps up to
+  three doubles per coordinate outside the Python heap.
+  """
+  if form == 'shape':
+    return sys.getsizeof( obj ) + 24 * int( shapely.get_num_coordinates( obj ) )
+  if form == 'dict':
+    return _deep_sizeof( obj )
+  return sys.getsizeof( obj )
+
+###
+def _deep_sizeof(
+  obj: Any ) -> int:
+  """
+  """
+  size = sys.getsizeof( obj )
+  if isinstance( obj, dict ):
+    return size + sum( _deep_sizeof( v ) for v in obj.values() )
+  if isinstance( obj, ( list, tuple ) ):
+    return size + sum( _deep_sizeof( v ) for v in obj )
+  return size
+
 ################################################################################
 
 ###
@@ -426,6 +1057,133 @@ def collection_extract(
 
   return glist
 
+###
+_TYPE_IDS = {
+  'Point': shapely.GeometryType.POINT,
+  'LineString': shapely.GeometryType.LINESTRING,
+  'Polygon': shapely.GeometryType.POLYGON }
+
+###
+_MULTI_BUILDERS = {
+  shapely.GeometryType.POINT: shapely.multipoints,
+  shapely.GeometryType.LINESTRING: shapely.multilinestrings,
+  shapely.GeometryType.POLYGON: shapely.multipolygons }
+
+###
+def _as_array(
+  gseq: Sequence[ Optional[ BaseGeometry ] ] ) -> np.ndarray:
+  """
+  Returns the geometries as a 1D object array without copying an existing one.
+  """
+  if isinstance( gseq, np.ndarray ):
+    return gseq
+  garr = np.empty( len( gseq ), dtype = object )
+  garr[ : ] = gseq
+  return garr
+
+###
+def collection_extract_array(
+  gseq: Sequence[ Optional[ BaseGeometry ] ],
+  gtype: str ) -> Tuple[ np.ndarray, np.ndarray ]:
+  """
+  Array version of `collection_extract`.
+  Collections are flattened one nesting level per pass, each pass replacing
+  every collection by its parts in place, so parts keep the depth-first
+  order of the scalar version.
+  Returns the non-empty parts of type `gtype` and, aligned with them, the
+  index of the input geometry each part came from.
+  """
+  if gtype not in _TYPE_IDS:
+    raise RuntimeError( 'collection_extract: '
+      'only point, linestring and polygon may be extracted' )
+
+  garr = _as_array( gseq )
+  index = np.arange( len( garr ) )
+  while True:
+    types = shapely.get_type_id( garr )
+    coll = types >= shapely.GeometryType.MULTIPOINT
+    if not coll.any():
+      break
+
+    # Every collection expands to its parts, everything else stays put
+    counts = np.where( coll, shapely.get_num_geometries( garr ), 1 )
+    starts = np.cumsum( counts ) - counts
+    parts, pidx = shapely.get_parts( garr[ coll ], return_index = True )
+    cidx = np.flatnonzero( coll )
+    rank = np.arange( len( parts ) ) - np.searchsorted( pidx, pidx )
+    pos = starts[ cidx ][ pidx ] + rank
+
+    flat = np.empty( counts.sum(), dtype = object )
+    fidx = np.empty( counts.sum(), dtype = index.dtype )
+    flat[ starts[ ~coll ] ] = garr[ ~coll ]
+    fidx[ starts[ ~coll ] ] = index[ ~coll ]
+    flat[ pos ] = parts
+    fidx[ pos ] = index[ cidx ][ pidx ]
+    garr, index = flat, fidx
+
+  keep = ( types == _TYPE_IDS[ gtype ] ) & ~shapely.is_empty( garr )
+  return garr[ keep ], index[ keep ]
+
+###
+def build_geometry_array(
+  gseq: Sequence[ Optional[ BaseGeometry ] ],
+  index: Optional[ Sequence[ int ] ] = None,
+  size: Optional[ int ] = None ) -> np.ndarray:
+  """
+  Array version of `build_geometry`.
+  Geometries are grouped by `index` (all in one group if `None`) and each
+  group is built the way `build_geometry` would build it: `None` and empty
+  geometries are removed, a single geometry is returned as is, homogeneous
+  points, lines and polygons become Multi* and anything else becomes a
+  GeometryCollection.
+  Returns an array of length `size` (default `max( index ) + 1`) holding
+  the geometry of each group, `None` for groups without geometries.
+  """
+  garr = _as_array( gseq )
+  if index is None:
+    index = np.zeros( len( garr ), dtype = np.intp )
+    size = 1 if size is None else size
+  index = np.asarray( index, dtype = np.intp )
+  if size is None:
+    size = int( index.max() ) + 1 if len( index ) else 0
+  result = np.full( size, None, dtype = object )
+
+  # Remove None and empty geometries, then sort into groups
+  keep = ~( shapely.is_missing( garr ) | shapely.is_empty( garr ) )
+  garr, index = garr[ keep ], index[ keep ]
+  if not len( garr ):
+    return result
+  order = np.argsort( index, kind = 'stable' )
+  garr, index = garr[ order ], index[ order ]
+  types = shapely.get_type_id( garr )
+
+  # Classify every group in a single pass
+  groups, starts, counts = np.unique( index, return_index = True, return_counts = True )
+  tmin = np.minimum.reduceat( types, starts )
+  tmax = np.maximum.reduceat( types, starts )
+  single = counts == 1
+  result[ groups[ single ] ] = garr[ starts[ single ] ]
+
+  member = np.repeat( np.arange( len( groups ) ), counts )
+  mixed = ~single & ( ( tmin != tmax ) | ( tmin >= shapely.GeometryType.MULTIPOINT ) )
+  builders = [ ( mixed, shapely.geometrycollections ) ]
+  for tid, builder in _MULTI_BUILDERS.items():
+    builders.append( ( ~single & ~mixed & ( tmin == tid ), builder ) )
+
+  for gmask, builder in builders:
+    if not gmask.any():
+      continue
+    emask = gmask[ member ]
+    dense = np.cumsum( gmask ) - 1
+    result[ groups[ gmask ] ] = builder( garr[ emask ], indices = dense[ member[ emask ] ] )
+
+  unhandled = ~single & ~mixed & ~np.isin( tmin, list( _MULTI_BUILDERS ) )
+  if unhandled.any():
+    gtype = shapely.GeometryType( tmin[ unhandled ][ 0 ] ).name
+    raise RuntimeError( "build_geometry: unhandled type (" + gtype + ")" )
+
+  return result
+
 ###
 @singledispatch
 def reproject(
@@ -462,8 +1220,8 @@ def __(
   precision: int = -1 ) -> Dict[ str, Any ]:
   """
   """
-  return transform_geom( f"EPSG:{src_srid}", f"EPSG:{dst_srid}", geom,
-    antimeridian_cutting, antimeridian_offset, precision )
+  return transformer( src_srid, dst_srid,
+    antimeridian_cutting, antimeridian_offset, precision ).geom( geom )
 
 ###
 @reproject.register( BaseGeometry )
@@ -476,6 +1234,134 @@ def __(
   precision: int = -1 ) -> BaseGeometry:
   """
   """
-  return shape( reproject( mapping( geom ), src_srid, dst_srid,
-    antimeridian_cutting, antimeridian_offset, precision ) )
+  if antimeridian_cutting:
+    return shape( reproject( mapping( geom ), src_srid, dst_srid,
+      antimeridian_cutting, antimeridian_offset, precision ) )
+
+  return reproject_batch( ( geom, ), src_srid, dst_srid,
+    antimeridian_cutting, antimeridian_offset, precision )[ 0 ]
+
+###
+def reproject_batch(
+  gseq: Sequence[ Optional[ BaseGeometry ] ],
+  src_srid: int,
+  dst_srid: int,
+  antimeridian_cutting: bool = False,
+  antimeridian_offset: float = 10.0,
+  precision: int = -1 ) -> List[ Optional[ BaseGeometry ] ]:
+  """
+  Reprojects a sequence of geometries in bulk.
+  The coordinates of the whole sequence are gathered into one contiguous
+  array, transformed in a single call (one per coordinate dimension) and
+  written back into copies of the geometries.
+  Antimeridian cutting may change the structure of a geometry, so it falls
+  back to reprojecting one geometry at a time.
+  The result is aligned with the input, `None` entries are preserved.
+  """
+  if antimeridian_cutting:
+    return [ reproject( g, src_srid, dst_srid,
+      antimeridian_cutting, antimeridian_offset, precision ) for g in gseq ]
+
+  t = transformer( src_srid, dst_srid,
+    antimeridian_cutting, antimeridian_offset, precision )
+  if t.identity:
+    return list( gseq )
+
+  garr = np.empty( len( gseq ), dtype = object )
+  garr[ : ] = gseq
+  return shapely.transform( garr, t.coords, include_z = None ).tolist()
+
+################################################################################
+
+###
+class Transformer:
+  """
+  A coordinate transformation between two srids with fixed options.
+  The CRS objects are resolved once, instances are shared through the
+  `transformer` cache.
+  """
+
+  ###
+  def __init__(
+    self: 'Transformer',
+    src_srid: int,
+    dst_srid: int,
+    antimeridian_cutting: bool = False,
+    antimeridian_offset: float = 10.0,
+    precision: int = -1 ) -> None:
+    """
+    """
+    self.src_srid = src_srid
+    self.dst_srid = dst_srid
+    self.antimeridian_cutting = antimeridian_cutting
+    self.antimeridian_offset = antimeridian_offset
+    self.precision = precision
+
+    # Same srid without cutting or rounding leaves coordinates untouched
+    self.identity = (
+      src_srid == dst_srid and
+      not antimeridian_cutting and
+      precision < 0 )
+    if self.identity:
+      self.src_crs = self.dst_crs = None
+    else:
+      self.src_crs = CRS.from_epsg( src_srid )
+      self.dst_crs = CRS.from_epsg( dst_srid )
+
+  ###
+  def geom(
+    self: 'Transformer',
+    geom: Dict[ str, Any ] ) -> Dict[ str, Any ]:
+    """
+    Transforms a GeoJSON-like dict.
+    """
+    if self.identity:
+      return geom
+
+    # Newer fiona returns a `fiona.Geometry`, hand back a plain dict.
+    # Rounding is done here, fiona 1.10 drops the type when given a precision
+    out = mapping( transform_geom( self.src_crs, self.dst_crs, geom,
+      self.antimeridian_cutting, self.antimeridian_offset ) )
+    if self.precision >= 0:
+      out = mapping( shapely.transform( shape( out ),
+        lambda c: np.round( c, self.precision ), include_z = None ) )
+    return out
+
+  ###
+  def coords(
+    self: 'Transformer',
+    coords: np.ndarray ) -> np.ndarray:
+    """
+    Transforms an (N, 2) or (N, 3) coordinate array.
+    Only x and y are transformed, z is carried over unchanged.
+    """
+    if self.identity or not len( coords ):
+      return coords
 
+    out = coords.copy()
+    out[ :, 0 ], out[ :, 1 ] = transform( self.src_crs, self.dst_crs,
+      coords[ :, 0 ].tolist(), coords[ :, 1 ].tolist() )
+    if self.precision >= 0:
+      out = np.round( out, self.precision )
+    return out
+
+###
+TRANSFORMER_CACHE_SIZE = 128
+
+###
+@lru_cache( maxsize = TRANSFORMER_CACHE_SIZE )
+def transformer(
+  src_srid: int,
+  dst_srid: int,
+  antimeridian_cutting: bool = False,
+  antimeridian_offset: float = 10.0,
+  precision: int = -1 ) -> Transformer:
+  """
+  Returns the process-wide `Transformer` for the given srids and options.
+  Least recently used transformers are evicted once the cache holds
+  `TRANSFORMER_CACHE_SIZE` entries.
+  Use `transformer.cache_info()` for hit/miss counters and
+  `transformer.cache_clear()` to reset it.
+  """
+  return Transformer( src_srid, dst_srid,
+    antimeridian_cutting, antimeridian_offset, precision )
@@ -0,0 +1,220 @@
+
+from contextlib import contextmanager
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+
+from . import geom as _geom
+from .geom import Geom, REPRESENTATIONS, Transformer
+
+###
+# Transition name -> conversion global in `pygis.vec.geom`
+TRANSITIONS = {
+  'wkb->shape': '_wkb_to_shape',
+  'dict->shape': '_dict_to_shape',
+  'geojson->shape': '_geojson_to_shape',
+  'geojson->dict': '_geojson_to_dict',
+  'shape->dict': '_shape_to_dict',
+  'dict->geojson': '_dict_to_geojson',
+  'shape->wkb': '_shape_to_wkb' }
+
+###
+# Timed name -> `Transformer` method
+REPROJECTIONS = {
+  'reproject': 'geom',
+  'reproject_batch': 'coords' }
+
+###
+Hook = Callable[ [ str, str, float ], None ]
+
+################################################################################
+
+###
+class ConversionStats:
+  """
+  Counters and cumulative timings collected while instrumentation is on.
+    conversions  transition name -> number of real conversions
+    seconds      transition or reprojection name -> cumulative seconds
+    hits         representation -> accesses served from the cache
+    calls        reprojection name -> number of calls
+  """
+
+  ###
+  def __init__(
+    self: 'ConversionStats' ) -> None:
+    """
+    """
+    self.conversions = dict.fromkeys( TRANSITIONS, 0 )
+    self.hits = dict.fromkeys( REPRESENTATIONS, 0 )
+    self.calls = dict.fromkeys( REPROJECTIONS, 0 )
+    self.seconds = dict.fromkeys( list( TRANSITIONS ) + list( REPROJECTIONS ), 0.0 )
+
+  ###
+  def record(
+    self: 'ConversionStats',
+    kind: str,
+    name: str,
+    seconds: float ) -> None:
+    """
+    Adds one event, `kind` is 'conversion', 'hit' or 'reproject'.
+    """
+    if kind == 'hit':
+      self.hits[ name ] += 1
+      return
+    if kind == 'conversion':
+      self.conversions[ name ] += 1
+    else:
+      self.calls[ name ] += 1
+    self.seconds[ name ] += seconds
+
+  ###
+  def __str__(
+    self: 'ConversionStats' ) -> str:
+    """
+    """
+    lines = []
+    for name, count in self.conversions.items():
+      lines.append( f"{name:16} {count:10d} {self.seconds[ name ]:10.4f}s" )
+    for name, count in self.calls.items():
+      lines.append( f"{name:16} {count:10d} {self.seconds[ name ]:10.4f}s" )
+    for name, count in self.hits.items():
+      lines.append( f"{name + ' hits':16} {count:10d}" )
+    return '\n'.join( lines )
+
+################################################################################
+
+###
+_scopes: List[ ConversionStats ] = []
+_hooks: List[ Hook ] = []
+_originals: Dict[ str, object ] = {}
+
+###
+def _emit(
+  kind: str,
+  name: str,
+  seconds: float ) -> None:
+  """
+  """
+  for stats in _scopes:
+    stats.record( kind, name, seconds )
+  for hook in _hooks:
+    hook( kind, name, seconds )
+
+###
+def _timed(
+  kind: str,
+  name: str,
+  func: Callable ) -> Callable:
+  """
+  """
+  def wrapper( *args, **kwargs ):
+    t = time.perf_counter()
+    try:
+      return func( *args, **kwargs )
+    finally:
+      _emit( kind, name, time.perf_counter() - t )
+  return wrapper
+
+###
+def _counted(
+  form: str,
+  prop: property ) -> property:
+  """
+  Wraps a `Geom` representation property to count cache hits.
+  """
+  slot = f"_Geom__{form}"
+  fget = prop.fget
+
+  def getter( self ):
+    if getattr( self, slot ) is not None:
+      _emit( 'hit', form, 0.0 )
+    return fget( self )
+
+  return property( getter, prop.fset, prop.fdel, prop.__doc__ )
+
+###
+def _install() -> None:
+  """
+  Swaps the measured versions in, they are only present while at least
+  one scope or hook is active, so disabled instrumentation costs nothing.
+  """
+  for name, attr in TRANSITIONS.items():
+    func = _originals[ attr ] = getattr( _geom, attr )
+    setattr( _geom, attr, _timed( 'conversion', name, func ) )
+  for name, attr in REPROJECTIONS.items():
+    func = _originals[ 'Transformer.' + attr ] = Transformer.__dict__[ attr ]
+    setattr( Transformer, attr, _timed( 'reproject', name, func ) )
+  for form in REPRESENTATIONS:
+    prop = _originals[ 'Geom.' + form ] = Geom.__dict__[ form ]
+    setattr( Geom, form, _counted( form, prop ) )
+
+###
+def _uninstall() -> None:
+  """
+  """
+  for key, value in _originals.items():
+    if key.startswith( 'Transformer.' ):
+      setattr( Transformer, key.split( '.' )[ 1 ], value )
+    elif key.startswith( 'Geom.' ):
+      setattr( Geom, key.split( '.' )[ 1 ], value )
+    else:
+      setattr( _geom, key, value )
+  _originals.clear()
+
+###
+def _update() -> None:
+  """
+  """
+  active = bool( _scopes or _hooks )
+  if active and not _originals:
+    _install()
+  elif not active and _originals:
+    _uninstall()
+
+################################################################################
+
+###
+def enabled() -> bool:
+  """
+  Returns `True` while conversions are being measured.
+  """
+  return bool( _originals )
+
+###
+def add_hook(
+  hook: Hook ) -> None:
+  """
+  Registers `hook( kind, name, seconds )` to receive every event, e.g. to
+  export them to a metrics system. Instrumentation stays on until the
+  last hook is removed.
+  """
+  _hooks.append( hook )
+  _update()
+
+###
+def remove_hook(
+  hook: Hook ) -> None:
+  """
+  """
+  _hooks.remove( hook )
+  _update()
+
+###
+@contextmanager
+def measure() -> Iterator[ ConversionStats ]:
+  """
+  Measures the conversions and reprojections made inside the block:
+
+    with measure() as stats:
+      ...
+    print( stats )
+
+  Scopes may be nested, an event is recorded in every active scope.
+  """
+  stats = ConversionStats()
+  _scopes.append( stats )
+  _update()
+  try:
+    yield stats
+  finally:
+    _scopes.remove( stats )
+    _update()
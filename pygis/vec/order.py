@@ -0,0 +1,209 @@
+
+import heapq
+import os
+import pickle
+import tempfile
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import shapely
+
+from .featcol import BBox, FeatPair
+
+###
+CURVES = ( 'hilbert', 'zorder' )
+
+###
+# Bits per axis of the curve grid, keys fit in 2 * BITS bits
+BITS = 16
+
+###
+# Features per in-memory run of `external_sort`
+RUN_SIZE = 1 << 20
+
+###
+# Features per pickled block of a run file
+BLOCK_SIZE = 4096
+
+################################################################################
+
+###
+def hilbert_keys(
+  x: np.ndarray,
+  y: np.ndarray,
+  bits: int = BITS ) -> np.ndarray:
+  """
+  Returns the distance along a Hilbert curve of the integer grid cells
+  (x, y), both in [0, 2**bits).
+  """
+  x = np.asarray( x, dtype = np.int64 ).copy()
+  y = np.asarray( y, dtype = np.int64 ).copy()
+  n = 1 << bits
+  d = np.zeros( x.shape, dtype = np.int64 )
+  s = n >> 1
+  while s > 0:
+    rx = ( x & s ) > 0
+    ry = ( y & s ) > 0
+    d += s * s * ( ( 3 * rx ) ^ ry )
+
+    # Rotate the quadrant so the curve stays connected
+    flip = ~ry & rx
+    x = np.where( flip, n - 1 - x, x )
+    y = np.where( flip, n - 1 - y, y )
+    x, y = np.where( ry, x, y ), np.where( ry, y, x )
+    s >>= 1
+  return d
+
+###
+def zorder_keys(
+  x: np.ndarray,
+  y: np.ndarray,
+  bits: int = BITS ) -> np.ndarray:
+  """
+  Returns the Morton code of the integer grid cells (x, y), both in
+  [0, 2**bits) for `bits` up to 32.
+  """
+  return _spread( x ) | ( _spread( y ) << 1 )
+
+###
+def _spread(
+  v: np.ndarray ) -> np.ndarray:
+  """
+  Spreads the low 32 bits of `v` to the even bits.
+  """
+  v = np.asarray( v, dtype = np.uint64 ) & np.uint64( 0xffffffff )
+  for shift, mask in ( ( 16, 0x0000ffff0000ffff ), ( 8, 0x00ff00ff00ff00ff ),
+      ( 4, 0x0f0f0f0f0f0f0f0f ), ( 2, 0x3333333333333333 ), ( 1, 0x5555555555555555 ) ):
+    v = ( v | ( v << np.uint64( shift ) ) ) & np.uint64( mask )
+  return v.astype( np.int64 )
+
+###
+def curve_keys(
+  geoms: Iterable[ Any ],
+  curve: str = 'hilbert',
+  extent: Optional[ BBox ] = None,
+  bits: int = BITS ) -> np.ndarray:
+  """
+  Returns the curve keys of the bounding box centers of `geoms`, on a
+  2**bits grid over `extent` (by default the bounds of `geoms`).
+  Missing and empty geometries get the largest key and sort last.
+  """
+  if curve not in CURVES:
+    raise ValueError( f"curve_keys: unknown curve ({curve})" )
+  geoms = list( geoms )
+  garr = np.empty( len( geoms ), dtype = object )
+  garr[ : ] = geoms
+  bounds = shapely.bounds( garr )
+  cx = ( bounds[ :, 0 ] + bounds[ :, 2 ] ) * 0.5
+  cy = ( bounds[ :, 1 ] + bounds[ :, 3 ] ) * 0.5
+  missing = np.isnan( cx )
+  if extent is None:
+    if missing.all():
+      return np.full( len( garr ), 1 << ( 2 * bits ), dtype = np.int64 )
+    extent = ( np.nanmin( bounds[ :, 0 ] ), np.nanmin( bounds[ :, 1 ] ),
+      np.nanmax( bounds[ :, 2 ] ), np.nanmax( bounds[ :, 3 ] ) )
+
+  xmin, ymin, xmax, ymax = extent
+  n = 1 << bits
+  sx = n / max( xmax - xmin, 1e-300 )
+  sy = n / max( ymax - ymin, 1e-300 )
+  x = np.clip( np.nan_to_num( ( cx - xmin ) * sx ), 0, n - 1 ).astype( np.int64 )
+  y = np.clip( np.nan_to_num( ( cy - ymin ) * sy ), 0, n - 1 ).astype( np.int64 )
+  keys = hilbert_keys( x, y, bits ) if curve == 'hilbert' else zorder_keys( x, y, bits )
+  keys[ missing ] = 1 << ( 2 * bits )
+  return keys
+
+################################################################################
+
+###
+def spatial_sort(
+  feats: Iterable[ FeatPair ],
+  curve: str = 'hilbert',
+  extent: Optional[ BBox ] = None ) -> List[ FeatPair ]:
+  """
+  Returns (properties, geometry) pairs sorted along `curve`.
+  The sort is stable, features with the same key keep their order.
+  """
+  feats = list( feats )
+  keys = curve_keys( [ g for _, g in feats ], curve, extent )
+  return [ feats[ i ] for i in np.argsort( keys, kind = 'stable' ) ]
+
+###
+def external_sort(
+  chunks: Iterable[ List[ FeatPair ] ],
+  extent: BBox,
+  curve: str = 'hilbert',
+  run_size: int = RUN_SIZE,
+  tmpdir: Optional[ str ] = None ) -> Iterator[ FeatPair ]:
+  """
+  Sorts a stream of chunks of (properties, geometry) pairs along `curve`
+  with at most about `run_size` features in memory. Keys are taken on a
+  fixed `extent`, so every run sorts the same way. Runs of `run_size`
+  features are sorted in memory and spilled to temporary files, which are
+  then merged, a stream that fits in one run never touches the disk.
+  The sort is stable.
+  """
+  runs = []
+  run = []
+  with tempfile.TemporaryDirectory( dir = tmpdir, prefix = 'pygis-sort' ) as tmp:
+    for chunk in chunks:
+      run.extend( chunk )
+      if len( run ) >= run_size:
+        runs.append( _spill( _sort_run( run, curve, extent ), tmp, len( runs ) ) )
+        run = []
+
+    keys, feats = _sort_run( run, curve, extent )
+    if not runs:
+      yield from feats
+      return
+    if feats:
+      runs.append( _spill( ( keys, feats ), tmp, len( runs ) ) )
+
+    # heapq.merge keeps the run order for equal keys, so the merge is stable
+    merged = heapq.merge( *[ _read_run( path ) for path in runs ], key = lambda kf: kf[ 0 ] )
+    for _, feat in merged:
+      yield feat
+
+###
+def _sort_run(
+  run: List[ FeatPair ],
+  curve: str,
+  extent: BBox ) -> Tuple[ np.ndarray, List[ FeatPair ] ]:
+  """
+  """
+  keys = curve_keys( [ g for _, g in run ], curve, extent )
+  order = np.argsort( keys, kind = 'stable' )
+  return keys[ order ], [ run[ i ] for i in order ]
+
+###
+def _spill(
+  run: Tuple[ np.ndarray, List[ FeatPair ] ],
+  tmp: str,
+  index: int ) -> str:
+  """
+  Writes a sorted run as pickled blocks of keys, properties and WKB.
+  """
+  keys, feats = run
+  path = os.path.join( tmp, f"run{index}.pkl" )
+  with open( path, 'wb' ) as f:
+    for start in range( 0, len( feats ), BLOCK_SIZE ):
+      block = feats[ start : start + BLOCK_SIZE ]
+      pickle.dump( (
+        keys[ start : start + BLOCK_SIZE ],
+        [ p for p, _ in block ],
+        shapely.to_wkb( [ g for _, g in block ] ) ), f, pickle.HIGHEST_PROTOCOL )
+  return path
+
+###
+def _read_run(
+  path: str ) -> Iterator[ Tuple[ int, FeatPair ] ]:
+  """
+  """
+  with open( path, 'rb' ) as f:
+    while True:
+      try:
+        keys, props, wkb = pickle.load( f )
+      except EOFError:
+        return
+      yield from zip( keys.tolist(), zip( props, shapely.from_wkb( wkb ).tolist() ) )
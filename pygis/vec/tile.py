@@ -0,0 +1,685 @@
+
+from concurrent.futures import ProcessPoolExecutor
+import gzip
+import json
+import math
+import os
+import sqlite3
+import struct
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+import shapely
+from shapely.geometry.base import BaseGeometry
+
+from .featcol import FeatCol, FeatPair, bounded_map
+from .geom import reproject_batch
+
+###
+# Half the width of the web mercator square, in meters
+ORIGIN = 20037508.342789244
+
+###
+EXTENT = 4096
+
+###
+Tile = Tuple[ int, int, int ]
+
+################################################################################
+
+###
+def tile_bounds(
+  z: int,
+  x: int,
+  y: int,
+  margin: float = 0.0 ) -> Tuple[ float, float, float, float ]:
+  """
+  Returns the EPSG:3857 bounds of tile `z/x/y` (XYZ scheme, y down),
+  grown by `margin` tile widths on each side.
+  """
+  size = 2.0 * ORIGIN / ( 1 << z )
+  minx = -ORIGIN + x * size
+  maxy = ORIGIN - y * size
+  pad = margin * size
+  return ( minx - pad, maxy - size - pad, minx + size + pad, maxy + pad )
+
+###
+def bounds_tiles(
+  bounds: np.ndarray,
+  z: int,
+  margin: float = 0.0 ) -> np.ndarray:
+  """
+  Returns the distinct tiles touched by an (n, 4) array of EPSG:3857 bounds,
+  grown by `margin` tile widths, as an (m, 2) array of x, y.
+  """
+  n = 1 << z
+  size = 2.0 * ORIGIN / n
+  pad = margin * size
+  x0 = np.clip( np.floor( ( bounds[ :, 0 ] - pad + ORIGIN ) / size ), 0, n - 1 ).astype( np.int64 )
+  x1 = np.clip( np.floor( ( bounds[ :, 2 ] + pad + ORIGIN ) / size ), 0, n - 1 ).astype( np.int64 )
+  y0 = np.clip( np.floor( ( ORIGIN - bounds[ :, 3 ] - pad ) / size ), 0, n - 1 ).astype( np.int64 )
+  y1 = np.clip( np.floor( ( ORIGIN - bounds[ :, 1 ] + pad ) / size ), 0, n - 1 ).astype( np.int64 )
+
+  # Expand each range into its tiles, x-major
+  w = x1 - x0 + 1
+  h = y1 - y0 + 1
+  count = w * h
+  owner = np.repeat( np.arange( len( count ) ), count )
+  k = np.arange( count.sum() ) - np.repeat( np.cumsum( count ) - count, count )
+  xs = x0[ owner ] + k // h[ owner ]
+  ys = y0[ owner ] + k % h[ owner ]
+  return np.unique( np.stack( ( xs, ys ), axis = 1 ), axis = 0 )
+
+################################################################################
+
+###
+def _key(
+  field: int,
+  wire: int ) -> bytes:
+  """
+  """
+  return _varint( ( field << 3 ) | wire )
+
+###
+def _varint(
+  n: int ) -> bytes:
+  """
+  Encodes a non-negative integer as a protobuf varint.
+  """
+  if n < _SMALL:
+    return _VARINTS[ n ]
+  return _varint_slow( n )
+
+###
+def _varint_slow(
+  n: int ) -> bytes:
+  """
+  """
+  out = bytearray()
+  while n > 0x7f:
+    out.append( ( n & 0x7f ) | 0x80 )
+    n >>= 7
+  out.append( n )
+  return bytes( out )
+
+###
+# Varints of every integer below _SMALL, ids, tags and lengths mostly are
+_SMALL = 1 << 14
+_VARINTS = [ _varint_slow( n ) for n in range( _SMALL ) ]
+
+###
+def _packed_ends(
+  values: np.ndarray ) -> Tuple[ bytes, np.ndarray ]:
+  """
+  Encodes an array of non-negative integers as packed varints, vectorized.
+  Also returns the end offset of each value in the encoded bytes.
+  """
+  values = values.astype( np.uint64 )
+  shifts = np.arange( 0, 70, 7, dtype = np.uint64 )
+  groups = ( values[ :, None ] >> shifts ) & np.uint64( 0x7f )
+  # Number of 7-bit groups needed, at least one
+  used = 1 + np.sum( values[ :, None ] >= ( np.uint64( 1 ) << shifts[ 1: ] ), axis = 1 )
+  cols = np.arange( 10 )
+  more = cols[ None, : ] < ( used[ :, None ] - 1 )
+  data = ( groups | ( more.astype( np.uint64 ) << np.uint64( 7 ) ) ).astype( np.uint8 )
+  return data[ cols[ None, : ] < used[ :, None ] ].tobytes(), np.cumsum( used )
+
+###
+def _bytes_field(
+  field: int,
+  data: bytes ) -> bytes:
+  """
+  """
+  return _key( field, 2 ) + _varint( len( data ) ) + data
+
+###
+def _zigzag(
+  values: np.ndarray ) -> np.ndarray:
+  """
+  """
+  values = values.astype( np.int64 )
+  return ( ( values << 1 ) ^ ( values >> 63 ) ).astype( np.uint64 )
+
+###
+def _value(
+  value: Any ) -> bytes:
+  """
+  Encodes a property value as an MVT `Value` message.
+  """
+  if isinstance( value, bool ):
+    return _key( 7, 0 ) + _varint( int( value ) )
+  if isinstance( value, ( int, np.integer ) ):
+    value = int( value )
+    if value < 0:
+      return _key( 6, 0 ) + _varint( ( value << 1 ) ^ ( value >> 63 ) )
+    return _key( 5, 0 ) + _varint( value )
+  if isinstance( value, ( float, np.floating ) ):
+    return _key( 3, 1 ) + struct.pack( '<d', float( value ) )
+  return _bytes_field( 1, str( value ).encode( 'utf-8' ) )
+
+################################################################################
+
+###
+_MOVE_TO = 1
+_LINE_TO = 2
+_CLOSE_PATH = 7
+
+###
+_POINT = 1
+_LINESTRING = 2
+_POLYGON = 3
+
+###
+# shapely type id -> MVT geometry type
+_MVT_TYPES = {
+  shapely.GeometryType.POINT: _POINT,
+  shapely.GeometryType.MULTIPOINT: _POINT,
+  shapely.GeometryType.LINESTRING: _LINESTRING,
+  shapely.GeometryType.LINEARRING: _LINESTRING,
+  shapely.GeometryType.MULTILINESTRING: _LINESTRING,
+  shapely.GeometryType.POLYGON: _POLYGON,
+  shapely.GeometryType.MULTIPOLYGON: _POLYGON }
+
+###
+# Dimension -> multi geometry constructor
+_COLLECTORS = {
+  0: shapely.multipoints,
+  1: shapely.multilinestrings,
+  2: shapely.multipolygons }
+
+###
+def _command(
+  cid: int,
+  count: np.ndarray ) -> np.ndarray:
+  """
+  """
+  return ( cid & 0x7 ) | ( count.astype( np.uint64 ) << np.uint64( 3 ) )
+
+###
+def _main_parts(
+  geom: BaseGeometry ) -> Optional[ BaseGeometry ]:
+  """
+  Returns the highest dimensional parts of a geometry collection as one
+  multi geometry, clipping may leave lower dimensional slivers.
+  """
+  parts = shapely.get_parts( geom, return_index = False )
+  parts = parts[ ~shapely.is_empty( parts ) ]
+  if not len( parts ):
+    return None
+  dims = shapely.get_dimensions( parts )
+  top = int( dims.max() )
+  return _COLLECTORS[ top ]( shapely.get_parts( parts[ dims == top ] ) )
+
+###
+def encode_geometries(
+  garr: np.ndarray ) -> Tuple[ np.ndarray, List[ Optional[ bytes ] ] ]:
+  """
+  Encodes geometries already in integer tile coordinates into packed MVT
+  geometry commands, the whole array at once.
+  Repeated vertices are dropped, rings are closed implicitly and wound as
+  MVT expects (positive area in tile coordinates for exteriors, negative
+  for holes), rings, lines and polygons that collapsed are dropped.
+  Returns the MVT type of each geometry and its packed commands, `None`
+  where nothing is left.
+  """
+  garr = np.asarray( garr, dtype = object ).copy()
+  tids = shapely.get_type_id( garr )
+  for i in np.flatnonzero( tids == shapely.GeometryType.GEOMETRYCOLLECTION ):
+    garr[ i ] = _main_parts( garr[ i ] )
+  rings = tids == shapely.GeometryType.LINEARRING
+  if rings.any():
+    garr[ rings ] = [ shapely.linestrings( shapely.get_coordinates( g ) ) for g in garr[ rings ] ]
+  tids = shapely.get_type_id( garr )
+  tids[ shapely.is_empty( garr ) ] = -1
+
+  types = np.zeros( len( garr ), dtype = np.int64 )
+  commands = [ None ] * len( garr )
+  for gtype in ( _POINT, _LINESTRING, _POLYGON ):
+    idx = np.flatnonzero( np.isin( tids, [ t for t, m in _MVT_TYPES.items() if m == gtype ] ) )
+    if not len( idx ):
+      continue
+    types[ idx ] = gtype
+    for i, data in zip( idx, _encode_family( garr[ idx ], gtype ) ):
+      commands[ i ] = data
+  return types, commands
+
+###
+def _encode_family(
+  garr: np.ndarray,
+  gtype: int ) -> List[ Optional[ bytes ] ]:
+  """
+  Encodes geometries of a single MVT type, see `encode_geometries`.
+  Vertices are processed as one ragged array of runs, a run being a ring,
+  a line or the points of a (multi)point.
+  """
+  n = len( garr )
+  _, coords, offsets = shapely.to_ragged_array( garr )
+  coords = coords.astype( np.int64 )
+
+  # Run offsets, owning geometry of each run and, for polygons, whether it
+  # is an exterior ring and which polygon it belongs to
+  if gtype == _POINT:
+    run_off = offsets[ 0 ] if offsets else np.arange( n + 1 )
+    run_geom = np.arange( n )
+  else:
+    run_off = offsets[ 0 ]
+    up = offsets[ 1 ] if len( offsets ) > 1 else np.arange( len( run_off ) )
+    run_up = np.repeat( np.arange( len( up ) - 1 ), np.diff( up ) )
+    if gtype == _POLYGON:
+      top = offsets[ 2 ] if len( offsets ) > 2 else np.arange( len( up ) )
+      run_part = run_up
+      run_geom = np.repeat( np.arange( len( top ) - 1 ), np.diff( top ) )[ run_part ]
+      exterior = np.arange( len( run_off ) - 1 ) == up[ :-1 ][ run_part ]
+    else:
+      run_geom = run_up
+  nruns = len( run_off ) - 1
+  rid = np.repeat( np.arange( nruns ), np.diff( run_off ) )
+
+  # Drop closing vertices, then consecutive duplicates
+  keep = np.ones( len( coords ), dtype = bool )
+  if gtype == _POLYGON:
+    ends = run_off[ 1: ] - 1
+    keep[ ends[ np.diff( run_off ) > 0 ] ] = False
+  coords = coords[ keep ]
+  rid = rid[ keep ]
+  if gtype != _POINT and len( coords ):
+    keep = np.ones( len( coords ), dtype = bool )
+    keep[ 1: ] = np.any( coords[ 1: ] != coords[ :-1 ], axis = 1 ) | ( rid[ 1: ] != rid[ :-1 ] )
+    coords = coords[ keep ]
+    rid = rid[ keep ]
+  if gtype == _POLYGON and len( coords ):
+    # A ring may end where it started once quantized
+    first = np.searchsorted( rid, rid )
+    last = np.ones( len( rid ), dtype = bool )
+    last[ :-1 ] = rid[ 1: ] != rid[ :-1 ]
+    keep = ~( last & np.all( coords == coords[ first ], axis = 1 ) & ( np.arange( len( rid ) ) != first ) )
+    coords = coords[ keep ]
+    rid = rid[ keep ]
+  count = np.bincount( rid, minlength = nruns )
+
+  if gtype == _POLYGON:
+    first = np.searchsorted( rid, rid )
+    nxt = np.arange( 1, len( rid ) + 1 )
+    last = np.ones( len( rid ), dtype = bool )
+    last[ :-1 ] = rid[ 1: ] != rid[ :-1 ]
+    nxt[ last ] = first[ last ]
+    x = coords[ :, 0 ].astype( np.float64 )
+    y = coords[ :, 1 ].astype( np.float64 )
+    area = np.bincount( rid, weights = x * y[ nxt ] - x[ nxt ] * y, minlength = nruns )
+    valid = ( count >= 3 ) & ( area != 0 )
+    # Holes go with their exterior
+    part_ok = np.zeros( run_part.max() + 1 if nruns else 0, dtype = bool )
+    part_ok[ run_part[ exterior ] ] = valid[ exterior ]
+    valid &= part_ok[ run_part ]
+    reverse = valid & ( ( area > 0 ) != exterior )
+  else:
+    valid = count >= ( 2 if gtype == _LINESTRING else 1 )
+    reverse = np.zeros( nruns, dtype = bool )
+
+  # Keep the vertices of valid runs, reversed where the winding is wrong
+  vkeep = valid[ rid ]
+  coords = coords[ vkeep ]
+  rid = rid[ vkeep ]
+  start = np.searchsorted( rid, rid )
+  pos = np.arange( len( rid ) ) - start
+  count = np.bincount( rid, minlength = nruns )
+  flip = reverse[ rid ]
+  order = np.where( flip, start + count[ rid ] - 1 - pos, np.arange( len( rid ) ) )
+  coords = coords[ order ]
+
+  # Zigzag deltas, the cursor starts at (0, 0) for each geometry
+  vgeom = run_geom[ rid ]
+  deltas = np.diff( coords, axis = 0, prepend = np.zeros( ( 1, 2 ), dtype = np.int64 ) )
+  gstart = np.ones( len( rid ), dtype = bool )
+  gstart[ 1: ] = vgeom[ 1: ] != vgeom[ :-1 ]
+  deltas[ gstart ] = coords[ gstart ]
+  zz = _zigzag( deltas )
+
+  # Command stream: MoveTo, LineTo and ClosePath around each run
+  runs = np.flatnonzero( valid )
+  rcount = count[ runs ]
+  if gtype == _POINT:
+    rsize = 1 + 2 * rcount
+  else:
+    rsize = 2 * rcount + ( 3 if gtype == _POLYGON else 2 )
+  rstart = np.cumsum( rsize ) - rsize
+  stream = np.empty( int( rsize.sum() ), dtype = np.uint64 )
+  where = np.empty( nruns, dtype = np.int64 )
+  where[ runs ] = rstart
+  vpos = where[ rid ] + 1 + 2 * pos
+  if gtype == _POINT:
+    stream[ rstart ] = _command( _MOVE_TO, rcount )
+  else:
+    stream[ rstart ] = _command( _MOVE_TO, np.ones_like( rcount ) )
+    stream[ rstart + 3 ] = _command( _LINE_TO, rcount - 1 )
+    vpos += np.where( pos > 0, 1, 0 )
+    if gtype == _POLYGON:
+      stream[ rstart + rsize - 1 ] = _command( _CLOSE_PATH, np.ones_like( rcount ) )
+  stream[ vpos ] = zz[ :, 0 ]
+  stream[ vpos + 1 ] = zz[ :, 1 ]
+
+  # Pack once and slice per geometry
+  data, ends = _packed_ends( stream )
+  gsize = np.bincount( run_geom[ runs ], weights = rsize, minlength = n ).astype( np.int64 )
+  gend = np.cumsum( gsize )
+  result = []
+  for g in range( n ):
+    if gsize[ g ] == 0:
+      result.append( None )
+    else:
+      a = gend[ g ] - gsize[ g ]
+      b = gend[ g ]
+      result.append( data[ ( ends[ a - 1 ] if a else 0 ) : ends[ b - 1 ] ] )
+  return result
+
+###
+def encode_layer(
+  name: str,
+  feats: Sequence[ Tuple[ int, Dict[ str, Any ], BaseGeometry ] ],
+  extent: int = EXTENT ) -> bytes:
+  """
+  Encodes (id, properties, geometry) triples, geometries in integer tile
+  coordinates, into an MVT `Layer` message. Returns empty bytes if no
+  feature survives encoding.
+  """
+  garr = np.empty( len( feats ), dtype = object )
+  garr[ : ] = [ g for _, _, g in feats ]
+  types, commands = encode_geometries( garr )
+
+  keys = {}
+  values = {}
+  out = [ _key( 15, 0 ) + _varint( 2 ), _bytes_field( 1, name.encode( 'utf-8' ) ) ]
+  count = 0
+  for ( fid, props, _ ), gtype, data in zip( feats, types.tolist(), commands ):
+    if data is None:
+      continue
+    tags = []
+    for k, v in props.items():
+      if v is None:
+        continue
+      tags.append( keys.setdefault( k, len( keys ) ) )
+      tags.append( values.setdefault( ( type( v ), v ), len( values ) ) )
+    feat = _key( 1, 0 ) + _varint( fid )
+    if tags:
+      feat += _bytes_field( 2, b''.join( _varint( t ) for t in tags ) )
+    feat += _key( 3, 0 ) + _varint( gtype ) + _bytes_field( 4, data )
+    out.append( _bytes_field( 2, feat ) )
+    count += 1
+  if count == 0:
+    return b''
+
+  for k in keys:
+    out.append( _bytes_field( 3, k.encode( 'utf-8' ) ) )
+  for _, v in values:
+    out.append( _bytes_field( 4, _value( v ) ) )
+  out.append( _key( 5, 0 ) + _varint( extent ) )
+  return b''.join( out )
+
+################################################################################
+
+###
+# Per-process tiling state, set up once per worker by `_tile_init`
+_STATE: Dict[ str, Any ] = {}
+
+###
+def _tile_init(
+  wkb: np.ndarray,
+  props: List[ Dict[ str, Any ] ],
+  opts: Dict[ str, Any ] ) -> None:
+  """
+  """
+  geoms = shapely.from_wkb( wkb )
+  _STATE[ 'geoms' ] = geoms
+  _STATE[ 'props' ] = props
+  _STATE[ 'tree' ] = shapely.STRtree( geoms )
+  _STATE[ 'opts' ] = opts
+
+###
+def _tile_batch(
+  tiles: List[ Tile ] ) -> List[ Tuple[ int, int, int, bytes ] ]:
+  """
+  Renders a batch of tiles, returns (z, x, y, gzipped MVT) for the
+  tiles that are not empty.
+  """
+  geoms = _STATE[ 'geoms' ]
+  props = _STATE[ 'props' ]
+  opts = _STATE[ 'opts' ]
+  extent = opts[ 'extent' ]
+  margin = opts[ 'buffer' ] / extent
+
+  boxes = shapely.box( *np.array( [ tile_bounds( z, x, y, margin ) for z, x, y in tiles ] ).T )
+  tidx, fidx = _STATE[ 'tree' ].query( boxes, predicate = 'intersects' )
+  order = np.argsort( tidx, kind = 'stable' )
+  tidx = tidx[ order ]
+  fidx = fidx[ order ]
+  splits = np.searchsorted( tidx, np.arange( len( tiles ) + 1 ) )
+
+  result = []
+  for t, ( z, x, y ) in enumerate( tiles ):
+    found = fidx[ splits[ t ] : splits[ t + 1 ] ]
+    if not len( found ):
+      continue
+    minx, miny, maxx, maxy = tile_bounds( z, x, y )
+    clipped = shapely.clip_by_rect( geoms[ found ], *tile_bounds( z, x, y, margin ) )
+    scale = extent / ( maxx - minx )
+
+    def quantize( coords: np.ndarray ) -> np.ndarray:
+      out = np.empty_like( coords )
+      out[ :, 0 ] = np.rint( ( coords[ :, 0 ] - minx ) * scale )
+      out[ :, 1 ] = np.rint( ( maxy - coords[ :, 1 ] ) * scale )
+      return out
+
+    keep = ~shapely.is_empty( clipped )
+    tiled = shapely.transform( clipped[ keep ], quantize )
+    layer = encode_layer( opts[ 'layer' ],
+      [ ( i, props[ i ], g ) for i, g in zip( found[ keep ].tolist(), tiled ) ], extent )
+    if layer:
+      result.append( ( z, x, y, gzip.compress( _bytes_field( 3, layer ), opts[ 'compresslevel' ], mtime = 0 ) ) )
+  return result
+
+################################################################################
+
+###
+def write_mbtiles(
+  feats: Union[ FeatCol, Iterable[ FeatPair ] ],
+  path: str,
+  minzoom: int = 0,
+  maxzoom: int = 14,
+  srid: int = 4326,
+  layer: str = 'features',
+  extent: int = EXTENT,
+  buffer: int = 64,
+  compresslevel: int = 6,
+  workers: Optional[ int ] = None,
+  batch_size: int = 64,
+  name: Optional[ str ] = None ) -> int:
+  """
+  Renders features into Mapbox Vector Tiles stored in an MBTiles file and
+  returns the number of tiles written.
+  Geometries are reprojected to EPSG:3857 with `reproject_batch`, assigned
+  to tiles with an STR-tree, clipped to the tile plus `buffer` pixels and
+  quantized to `extent` units, tiles are gzipped at `compresslevel`.
+  Tiles are rendered in batches of `batch_size` by a pool of `workers`
+  processes (`None` uses every core), each worker holds its own copy of
+  the features and index.
+
+  feats: FeatCol or iterable of (properties, geometry) pairs
+    Features in `srid`, a `FeatCol` brings its own srid.
+  """
+  if isinstance( feats, FeatCol ):
+    srid = feats.srid
+  props = []
+  geoms = []
+  for p, g in feats:
+    if g is None or g.is_empty:
+      continue
+    props.append( p )
+    geoms.append( g )
+  if srid != 3857:
+    geoms = reproject_batch( geoms, srid, 3857 )
+  garr = np.empty( len( geoms ), dtype = object )
+  garr[ : ] = geoms
+
+  opts = { 'layer': layer, 'extent': extent, 'buffer': buffer, 'compresslevel': compresslevel }
+  bounds = shapely.bounds( garr ) if len( garr ) else np.empty( ( 0, 4 ) )
+  batches = _tile_batches( bounds, minzoom, maxzoom, buffer / extent, batch_size )
+
+  count = 0
+  with MBTilesWriter( path ) as sink:
+    for tiles in _render( batches, garr, props, opts, workers ):
+      sink.write( tiles )
+      count += len( tiles )
+    sink.metadata( name or layer, layer, minzoom, maxzoom, bounds, props )
+  return count
+
+###
+def _tile_batches(
+  bounds: np.ndarray,
+  minzoom: int,
+  maxzoom: int,
+  margin: float,
+  batch_size: int ) -> Iterator[ List[ Tile ] ]:
+  """
+  Yields the tiles covered by the feature bounds, zoom by zoom.
+  """
+  for z in range( minzoom, maxzoom + 1 ):
+    xy = bounds_tiles( bounds, z, margin ).tolist()
+    for i in range( 0, len( xy ), batch_size ):
+      yield [ ( z, x, y ) for x, y in xy[ i : i + batch_size ] ]
+
+###
+def _render(
+  batches: Iterator[ List[ Tile ] ],
+  garr: np.ndarray,
+  props: List[ Dict[ str, Any ] ],
+  opts: Dict[ str, Any ],
+  workers: Optional[ int ] ) -> Iterator[ List[ Tuple[ int, int, int, bytes ] ] ]:
+  """
+  Renders tile batches in this process or in a pool (see `bounded_map`).
+  """
+  wkb = shapely.to_wkb( garr )
+  workers = workers or os.cpu_count() or 1
+  if workers == 1:
+    _tile_init( wkb, props, opts )
+    try:
+      for tiles in batches:
+        yield _tile_batch( tiles )
+    finally:
+      _STATE.clear()
+    return
+
+  with ProcessPoolExecutor( workers, initializer = _tile_init,
+      initargs = ( wkb, props, opts ) ) as pool:
+    for _, rendered in bounded_map( pool, ( ( None, _tile_batch, ( tiles, ) ) for tiles in batches ), workers ):
+      yield rendered
+
+################################################################################
+
+###
+class MBTilesWriter:
+  """
+  Writes tiles to an MBTiles 1.3 file, replacing an existing one.
+  Each `write` call is one transaction.
+  """
+
+  ###
+  def __init__(
+    self: 'MBTilesWriter',
+    path: str ) -> None:
+    """
+    """
+    self.path = path
+    self.__db = None
+
+  ###
+  def __enter__(
+    self: 'MBTilesWriter' ) -> 'MBTilesWriter':
+    """
+    """
+    if os.path.exists( self.path ):
+      os.remove( self.path )
+    db = self.__db = sqlite3.connect( self.path )
+    db.execute( 'PRAGMA synchronous = OFF' )
+    db.execute( 'CREATE TABLE metadata ( name TEXT, value TEXT )' )
+    db.execute( 'CREATE TABLE tiles ( zoom_level INTEGER, tile_column INTEGER, '
+      'tile_row INTEGER, tile_data BLOB )' )
+    db.commit()
+    return self
+
+  ###
+  def __exit__(
+    self: 'MBTilesWriter',
+    exc_type, exc, tb ) -> None:
+    """
+    """
+    if exc_type is None:
+      self.__db.execute( 'CREATE UNIQUE INDEX tile_index '
+        'ON tiles ( zoom_level, tile_column, tile_row )' )
+      self.__db.commit()
+    self.__db.close()
+
+  ###
+  def write(
+    self: 'MBTilesWriter',
+    tiles: Sequence[ Tuple[ int, int, int, bytes ] ] ) -> None:
+    """
+    Stores (z, x, y, data) tiles, `y` in the XYZ scheme.
+    """
+    with self.__db:
+      self.__db.executemany( 'INSERT INTO tiles VALUES ( ?, ?, ?, ? )',
+        ( ( z, x, ( 1 << z ) - 1 - y, data ) for z, x, y, data in tiles ) )
+
+  ###
+  def metadata(
+    self: 'MBTilesWriter',
+    name: str,
+    layer: str,
+    minzoom: int,
+    maxzoom: int,
+    bounds: np.ndarray,
+    props: Sequence[ Dict[ str, Any ] ] ) -> None:
+    """
+    Stores the metadata rows, `bounds` are the EPSG:3857 bounds of the
+    features.
+    """
+    fields = {}
+    for p in props:
+      for k, v in p.items():
+        if v is not None and k not in fields:
+          fields[ k ] = 'Boolean' if isinstance( v, bool ) \
+            else 'Number' if isinstance( v, ( int, float, np.number ) ) else 'String'
+
+    if len( bounds ):
+      minx, miny = bounds[ :, 0 ].min(), bounds[ :, 1 ].min()
+      maxx, maxy = bounds[ :, 2 ].max(), bounds[ :, 3 ].max()
+    else:
+      minx = miny = -ORIGIN
+      maxx = maxy = ORIGIN
+    west, south = mercator_lonlat( minx, miny )
+    east, north = mercator_lonlat( maxx, maxy )
+
+    rows = {
+      'name': name,
+      'format': 'pbf',
+      'type': 'overlay',
+      'version': '1',
+      'minzoom': str( minzoom ),
+      'maxzoom': str( maxzoom ),
+      'bounds': f"{west},{south},{east},{north}",
+      'center': f"{( west + east ) / 2},{( south + north ) / 2},{minzoom}",
+      'json': json.dumps( { 'vector_layers': [ {
+        'id': layer, 'fields': fields, 'minzoom': minzoom, 'maxzoom': maxzoom } ] } ) }
+    with self.__db:
+      self.__db.executemany( 'INSERT INTO metadata VALUES ( ?, ? )', rows.items() )
+
+###
+def mercator_lonlat(
+  x: float,
+  y: float ) -> Tuple[ float, float ]:
+  """
+  Converts EPSG:3857 meters to longitude and latitude.
+  """
+  lon = math.degrees( x / ORIGIN * math.pi )
+  lat = math.degrees( 2.0 * math.atan( math.exp( y / ORIGIN * math.pi ) ) - math.pi / 2.0 )
+  return lon, lat
@@ -16,8 +16,9 @@ setuptools.setup(
   license = 'Apache',
   packages = setuptools.find_packages(),
   install_requires = [
-    'fiona >= 3.12',
-    'shapely >= 0.6' ],
+    'fiona >= 1.9',
+    'numpy',
+    'shapely >= 2.1' ],
   classifiers = [
     'Programming Lanuguage :: Python :: 3.6',
     'License :: OSI Approved :: Apache Software License',
@@ -0,0 +1,463 @@
+
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import fiona
+from fiona.crs import CRS
+
+import numpy as np
+
+from shapely.geometry import MultiPolygon, Point, Polygon, box, mapping
+
+from pygis.vec.cache import CacheReader, CacheWriter, extract_incremental
+from pygis.vec.feat import Feat
+from pygis.vec.featcol import CHUNK_SIZE, ArrayFeatCol, FeatCol, PropStore, ValidationReport, dissolve
+from pygis.vec.featcol import dataset_extract, dataset_write, expand_sources, iter_dataset, iter_datasets
+from pygis.vec.featcol import sjoin, sources_schema, validate
+from pygis.vec.geom import Geom
+
+###
+def write_dataset(
+  path: str,
+  geoms: list,
+  srid: int = 4326,
+  driver: str = 'ESRI Shapefile' ) -> str:
+  """
+  Writes the geometries to a dataset with an `id` and a `name` property.
+  """
+  schema = {
+    'geometry': geoms[ 0 ].geom_type,
+    'properties': { 'id': 'int', 'name': 'str:16' } }
+  with fiona.open( path, 'w', driver = driver,
+      crs = CRS.from_epsg( srid ), schema = schema ) as sink:
+    sink.writerecords( {
+      'geometry': mapping( g ),
+      'properties': { 'id': i, 'name': f"f{i}" } } for i, g in enumerate( geoms ) )
+  return path
+
+###
+class FeatColTestCase( unittest.TestCase ):
+
+  ### Create a small polygon dataset
+  def setUp( self ):
+    self.tmpdir = tempfile.mkdtemp()
+    self.polys = [
+      Polygon( ( ( x, y ), ( x + 1, y ), ( x + 1, y + 1 ), ( x, y + 1 ) ) )
+      for x in range( 10 ) for y in range( 10 ) ]
+    self.dataset = write_dataset(
+      os.path.join( self.tmpdir, 'polys.shp' ), self.polys )
+
+  ###
+  def tearDown( self ):
+    shutil.rmtree( self.tmpdir )
+
+  ###
+  def test_dataset_extract( self ):
+    feats = dataset_extract( self.dataset, 'Polygon' )
+    self.assertTrue( len( feats ) == len( self.polys ) )
+    for ( props, geom ), poly in zip( feats, self.polys ):
+      self.assertTrue( props[ 'name' ] == f"f{props[ 'id' ]}" )
+      self.assertTrue( geom.equals( poly ) )
+
+    feats = dataset_extract( self.dataset, 'Polygon', 3857 )
+    self.assertTrue( len( feats ) == len( self.polys ) )
+    self.assertTrue( feats[ -1 ][ 1 ].bounds[ 2 ] > 1000000.0 )
+
+  ###
+  def test_iter_dataset( self ):
+    feats = dataset_extract( self.dataset, 'Polygon', 3857 )
+    self.assertTrue( list( iter_dataset( self.dataset, 'Polygon', 3857 ) ) == feats )
+
+    chunks = list( iter_dataset( self.dataset, 'Polygon', 3857, chunk_size = 30 ) )
+    self.assertTrue( [ len( c ) for c in chunks ] == [ 30, 30, 30, 10 ] )
+    self.assertTrue( [ f for c in chunks for f in c ] == feats )
+
+  ###
+  def test_iter_dataset_parallel( self ):
+    feats = dataset_extract( self.dataset, 'Polygon', 3857 )
+    self.assertTrue( dataset_extract( self.dataset, 'Polygon', 3857, workers = 2 ) == feats )
+
+    chunks = list( iter_dataset( self.dataset, 'Polygon', 3857,
+      chunk_size = 30, workers = 2, ordered = False ) )
+    self.assertTrue( sorted( len( c ) for c in chunks ) == [ 10, 30, 30, 30 ] )
+    unordered = sorted( ( f for c in chunks for f in c ), key = lambda f: f[ 0 ][ 'id' ] )
+    self.assertTrue( unordered == feats )
+
+  ###
+  def test_featcol_index( self ):
+    col = FeatCol.from_dataset( self.dataset, 'Polygon' )
+    self.assertTrue( len( col ) == len( self.polys ) )
+    ids = lambda idx: sorted( col[ i ][ 0 ][ 'id' ] for i in idx )
+
+    # Polygons are laid out column major, id = 10 * x + y
+    self.assertTrue( ids( col.query( ( 0.5, 0.5, 1.5, 0.5 ) ) ) == [ 0, 10 ] )
+    self.assertTrue( ids( col.intersects( Point( 5.5, 5.5 ) ) ) == [ 55 ] )
+    self.assertTrue( ids( col.nearest( Point( 20.0, 0.5 ), 2 ) ) == [ 90, 91 ] )
+
+    # Pending inserts are visible to queries before a rebuild
+    i = col.insert( { 'id': 100, 'name': 'f100' }, Point( 20.0, 0.5 ) )
+    self.assertTrue( col.intersects( Point( 20.0, 0.5 ) ) == [ i ] )
+    self.assertTrue( col.nearest( Point( 21.0, 0.5 ), 1 ) == [ i ] )
+
+    # Missing and empty geometries are never returned
+    sparse = FeatCol( [ ( { 'a': 1 }, Point( 0, 0 ) ), ( { 'a': 2 }, None ), ( { 'a': 3 }, Polygon() ) ] )
+    self.assertTrue( sparse.nearest( Point( 1, 1 ), 3 ) == [ 0 ] )
+    sparse.insert( { 'a': 4 }, Point( 5, 5 ) )
+    self.assertTrue( sparse.nearest( Point( 1, 1 ), 3 ) == [ 0, 3 ] )
+    self.assertTrue( FeatCol( [ ( { 'a': 2 }, None ) ] ).nearest( Point( 1, 1 ), 2 ) == [] )
+
+    path = os.path.join( self.tmpdir, 'polys.featcol' )
+    col.save( path )
+    loaded = FeatCol.load( path )
+    self.assertTrue( list( loaded ) == list( col ) )
+    self.assertTrue( loaded.query( ( 19.0, 0.0, 21.0, 1.0 ) ) == [ i ] )
+
+  ###
+  def test_array_featcol( self ):
+    feats = dataset_extract( self.dataset, 'Polygon', 3857 )
+    col = ArrayFeatCol.from_dataset( self.dataset, 'Polygon', 3857 )
+    self.assertTrue( len( col ) == len( feats ) )
+    self.assertTrue( col.column( 'id' ).dtype.kind == 'i' )
+    self.assertTrue( col.column( 'id' ).tolist() == [ p[ 'id' ] for p, _ in feats ] )
+    for ( props, geom ), feat in zip( feats, col ):
+      self.assertTrue( feat.props == props )
+      self.assertTrue( feat[ 'name' ] == props[ 'name' ] )
+      self.assertTrue( feat.srid == 3857 )
+      self.assertTrue( feat.geom.shape.equals( geom ) )
+    self.assertTrue( all( a.equals( b ) for a, b in zip( col.shapes(), ( g for _, g in feats ) ) ) )
+
+    # Chunks emptied by the gtype filter are skipped
+    col = ArrayFeatCol.from_dataset( self.dataset, 'Point', chunk_size = 30 )
+    self.assertTrue( len( col ) == 0 and list( col.columns ) == [ 'id', 'name' ] )
+    mixed = os.path.join( self.tmpdir, 'mixed.geojson' )
+    dataset_write( mixed, [ ( { 'id': i }, Point( i, i ) ) for i in range( 40 ) ] +
+      [ ( { 'id': 40 + i }, p ) for i, p in enumerate( self.polys[ : 10 ] ) ] )
+    col = ArrayFeatCol.from_dataset( mixed, 'Polygon', chunk_size = 30 )
+    self.assertTrue( col.column( 'id' ).tolist() == list( range( 40, 50 ) ) )
+
+    # A chunk of missing geometries is stored as empty geometries of the collection's type
+    missing = [ ( { 'id': i }, None ) for i in range( CHUNK_SIZE + 1 ) ]
+    col = ArrayFeatCol.from_features( missing + [ ( { 'id': -1 }, self.polys[ 0 ] ) ] )
+    self.assertTrue( len( col ) == CHUNK_SIZE + 2 )
+    self.assertTrue( col.shape( 0 ).is_empty and col.shape( CHUNK_SIZE + 1 ).equals( self.polys[ 0 ] ) )
+    self.assertTrue( len( ArrayFeatCol.from_features( missing ) ) == CHUNK_SIZE + 1 )
+
+  ###
+  def test_cache( self ):
+    cache_dir = os.path.join( self.tmpdir, 'cache' )
+    feats = dataset_extract( self.dataset, 'Polygon', 3857 )
+    self.assertTrue( dataset_extract( self.dataset, 'Polygon', 3857, cache_dir = cache_dir ) == feats )
+    self.assertTrue( len( os.listdir( cache_dir ) ) == 1 )
+
+    # An entry filled by an unordered parallel read is still in source order
+    other = os.path.join( self.tmpdir, 'cache2' )
+    list( iter_dataset( self.dataset, 'Polygon', 3857, chunk_size = 7,
+      workers = 2, ordered = False, cache_dir = other ) )
+    self.assertTrue( dataset_extract( self.dataset, 'Polygon', 3857, cache_dir = other ) == feats )
+
+    # Served from the cache even if the source can no longer be parsed
+    stem = os.path.splitext( self.dataset )[ 0 ]
+    stat = os.stat( stem + '.shp' )
+    with open( stem + '.shp', 'r+b' ) as f:
+      f.write( b'\0' * 100 )
+    os.utime( stem + '.shp', ns = ( stat.st_atime_ns, stat.st_mtime_ns ) )
+    self.assertTrue( dataset_extract( self.dataset, 'Polygon', 3857, cache_dir = cache_dir ) == feats )
+
+    # A different target srid is a different entry
+    for ext in ( '.shp', '.shx', '.dbf', '.prj', '.cpg' ):
+      if os.path.exists( stem + ext ):
+        os.remove( stem + ext )
+    write_dataset( self.dataset, self.polys )
+    dataset_extract( self.dataset, 'Polygon', 4326, cache_dir = cache_dir )
+    self.assertTrue( len( os.listdir( cache_dir ) ) == 2 )
+
+  ###
+  def test_cache_columns( self ):
+    # Strings, nulls and typed columns round-trip without pickle
+    store = os.path.join( self.tmpdir, 'store' )
+    schema = { 'properties': { 'name': 'str', 'n': 'int', 'x': 'float', 'none': 'str' } }
+    feats = [ ( { 'name': [ 'a', None, '', 'é' ][ i % 4 ], 'n': None if i == 5 else i,
+      'x': i * 0.5, 'none': None }, p ) for i, p in enumerate( self.polys[ : 10 ] ) ]
+    with CacheWriter( store, schema, 4326 ) as writer:
+      writer.write( feats[ : 6 ] )
+      writer.write( feats[ 6 : ] )
+    for name in os.listdir( store ):
+      if name.endswith( '.npy' ):
+        np.load( os.path.join( store, name ), allow_pickle = False )
+
+    with CacheReader( store ) as reader:
+      self.assertTrue( reader.chunk( 0, 10 ) == feats )
+      self.assertTrue( reader.columns[ 'name' ][ np.array( [ 3, 1 ] ) ].tolist() == [ 'é', None ] )
+      copy = os.path.join( self.tmpdir, 'copy' )
+      with CacheWriter( copy, schema, 4326 ) as writer:
+        writer.copy( reader, [ 1, 5, 7 ] )
+    with CacheReader( copy ) as reader:
+      self.assertTrue( reader.chunk( 0, 3 ) == [ feats[ 1 ], feats[ 5 ], feats[ 7 ] ] )
+
+  ###
+  def test_incremental( self ):
+    path = os.path.join( self.tmpdir, 'polys.geojson' )
+    store = os.path.join( self.tmpdir, 'store' )
+
+    def write( feats ):
+      with open( path, 'w' ) as f:
+        json.dump( { 'type': 'FeatureCollection', 'features': [
+          { 'type': 'Feature', 'id': i, 'properties': p, 'geometry': mapping( g ) }
+          for i, p, g in feats ] }, f )
+
+    # A bow-tie, repaired on the first run only
+    feats = [ ( i, { 'name': f"f{i}" }, p ) for i, p in enumerate( self.polys[ : 20 ] ) ]
+    feats[ 3 ] = ( 3, { 'name': 'bow' }, Polygon( ( ( 0, 0 ), ( 1, 1 ), ( 1, 0 ), ( 0, 1 ) ) ) )
+    write( feats )
+    changes = extract_incremental( path, 'Polygon', store, 3857, chunk_size = 6, invalid = 'repair' )
+    self.assertTrue( len( changes.inserted ) == 20 and not changes.modified and not changes.deleted )
+    expect = dataset_extract( path, 'Polygon', 3857, invalid = 'repair' )
+    with CacheReader( store ) as reader:
+      self.assertTrue( [ f for c in reader.chunks() for f in c ] == expect )
+
+    changes = extract_incremental( path, 'Polygon', store, 3857, chunk_size = 6, invalid = 'repair' )
+    self.assertTrue( not changes and changes.unchanged == 20 )
+
+    # Modify one, delete one, insert one and drop a point on the way
+    feats[ 5 ] = ( 5, { 'name': 'moved' }, self.polys[ 50 ] )
+    del feats[ 8 ]
+    feats.append( ( 30, { 'name': 'new' }, self.polys[ 60 ] ) )
+    feats.append( ( 31, { 'name': 'point' }, Point( 0, 0 ) ) )
+    write( feats )
+    changes = extract_incremental( path, 'Polygon', store, 3857, chunk_size = 6, invalid = 'repair' )
+    self.assertTrue( changes.modified == [ '5' ] and changes.deleted == [ '8' ] )
+    self.assertTrue( changes.inserted == [ '30', '31' ] and changes.unchanged == 18 )
+    with CacheReader( store ) as reader:
+      self.assertTrue( [ f for c in reader.chunks() for f in c ] ==
+        dataset_extract( path, 'Polygon', 3857, invalid = 'repair' ) )
+      self.assertTrue( reader.report.repaired == [ '3' ] )
+
+    # Other options rebuild the store
+    changes = extract_incremental( path, 'Polygon', store, 4326, invalid = 'repair' )
+    self.assertTrue( len( changes.inserted ) == 21 )
+
+  ###
+  def test_iter_datasets( self ):
+    # Two per-county shapefiles, one without `name`, and a two-layer GeoPackage
+    counties = os.path.join( self.tmpdir, 'counties' )
+    os.mkdir( counties )
+    pairs = [ ( { 'id': i, 'name': f"f{i}" }, p ) for i, p in enumerate( self.polys ) ]
+    dataset_write( os.path.join( counties, 'c1.shp' ), pairs[ : 30 ] )
+    dataset_write( os.path.join( counties, 'c2.shp' ), [ ( { 'id': p[ 'id' ] }, g ) for p, g in pairs[ 30 : 50 ] ] )
+    gpkg = os.path.join( self.tmpdir, 'layers.gpkg' )
+    dataset_write( gpkg, pairs[ 50 : 60 ], srid = 3857, layer = 'a' )
+    dataset_write( gpkg, pairs[ 60 : 70 ], srid = 3857, layer = 'b' )
+
+    sources = [ os.path.join( counties, '*.shp' ), gpkg ]
+    self.assertTrue( expand_sources( sources ) == [ ( os.path.join( counties, 'c1.shp' ), None ),
+      ( os.path.join( counties, 'c2.shp' ), None ), ( gpkg, 'a' ), ( gpkg, 'b' ) ] )
+    self.assertTrue( len( expand_sources( counties ) ) == 2 )
+    self.assertTrue( sources_schema( sources )[ 'properties' ] == { 'id': 'int:18', 'name': 'str:80' } )
+    self.assertTrue( list( sources_schema( sources, 'common' )[ 'properties' ] ) == [ 'id' ] )
+    with self.assertRaises( ValueError ):
+      sources_schema( sources, 'strict' )
+
+    feats = list( iter_datasets( sources, 'Polygon' ) )
+    self.assertTrue( [ p[ 'id' ] for p, _ in feats ] == list( range( 70 ) ) )
+    self.assertTrue( feats[ 40 ][ 0 ] == { 'id': 40, 'name': None, 'source': os.path.join( counties, 'c2.shp' ) } )
+    self.assertTrue( feats[ 65 ][ 0 ][ 'source' ] == gpkg + '|b' )
+    self.assertTrue( list( iter_datasets( sources, 'Polygon', compact = True ) ) == feats )
+    col = FeatCol.from_dataset( gpkg, 'Polygon', layer = 'b' )
+    self.assertTrue( col.srid == 3857 and col[ 0 ][ 1 ].equals( self.polys[ 60 ] ) )
+    self.assertTrue( all( g.equals( p ) for ( _, g ), ( _, p ) in zip( feats[ : 50 ], pairs ) ) )
+    # The GeoPackage layers are reprojected to the srid of the first source
+    self.assertTrue( feats[ 69 ][ 1 ].bounds[ 3 ] < 1e-4 )
+
+    chunks = list( iter_datasets( sources, 'Polygon', 3857, chunk_size = 7, workers = 2,
+      columns = [ 'name' ], source_field = None, bbox = ( 0, 0, 5e5, 5e5 ) ) )
+    self.assertTrue( all( len( c ) <= 7 for c in chunks ) )
+    expect = dataset_extract( gpkg, 'Polygon', layer = 'b', columns = [ 'name' ], bbox = ( 0, 0, 5e5, 5e5 ) )
+    self.assertTrue( [ f for c in chunks for f in c ][ -len( expect ) : ] == expect )
+    self.assertTrue( all( list( p ) == [ 'name' ] for c in chunks for p, _ in c ) )
+
+  ###
+  def test_compact( self ):
+    feats = dataset_extract( self.dataset, 'Polygon', compact = True )
+    self.assertTrue( feats == dataset_extract( self.dataset, 'Polygon' ) )
+    schema = feats[ 0 ][ 0 ].schema
+    self.assertTrue( schema.names == ( 'id', 'name' ) and schema.types[ 0 ].startswith( 'int' ) )
+    self.assertTrue( all( p.schema is schema for p, _ in feats ) )
+    self.assertTrue( Feat( feats[ 7 ] )[ 'name' ] == 'f7' and 'id' in feats[ 7 ][ 0 ] )
+    self.assertTrue( list( feats[ 7 ][ 0 ].values() ) == [ 7, 'f7' ] and feats[ 7 ][ 0 ].row == ( 7, 'f7' ) )
+    self.assertTrue( pickle.loads( pickle.dumps( feats[ 7 ][ 0 ] ) ) == { 'id': 7, 'name': 'f7' } )
+    with self.assertRaises( TypeError ):
+      feats[ 7 ][ 0 ][ 'id' ] = 8
+
+    store = PropStore.from_props( p for p, _ in feats )
+    self.assertTrue( store.column( 'id' ).dtype == np.int64 and store.column( 'id' ) is store.columns[ 'id' ] )
+    self.assertTrue( store[ 7 ] == feats[ 7 ][ 0 ] and list( store ) == [ p for p, _ in feats ] )
+    self.assertTrue( PropStore.from_props( [ { 'a': 1 }, { 'a': None } ] ).column( 'a' ).tolist() == [ 1, None ] )
+
+    path = os.path.join( self.tmpdir, 'compact.gpkg' )
+    self.assertTrue( dataset_write( path, feats ) == 100 )
+    self.assertTrue( dataset_extract( path, 'Polygon' ) == feats )
+
+  ###
+  def test_validate( self ):
+    bowtie = Polygon( ( ( 0, 0 ), ( 1, 1 ), ( 1, 0 ), ( 0, 1 ) ) )
+    sliver = Polygon( ( ( 0, 0 ), ( 1, 0 ), ( 2, 0 ) ) )
+    polys = self.polys[ : 3 ] + [ bowtie, sliver ]
+    dataset = write_dataset( os.path.join( self.tmpdir, 'invalid.shp' ), polys )
+
+    with self.assertRaises( RuntimeError ):
+      dataset_extract( dataset, 'Polygon' )
+
+    report = ValidationReport()
+    feats = dataset_extract( dataset, 'Polygon', invalid = 'skip', report = report )
+    self.assertTrue( [ p[ 'id' ] for p, _ in feats ] == [ 0, 1, 2 ] )
+    self.assertTrue( report.repaired == [] )
+    self.assertTrue( report.dropped == [ '3', '4' ] )
+
+    for repair in ( 'make_valid', 'buffer' ):
+      report = ValidationReport()
+      feats = dataset_extract( dataset, 'Polygon', invalid = 'repair',
+        repair = repair, report = report, workers = 2 )
+      self.assertTrue( [ p[ 'id' ] for p, _ in feats ] == [ 0, 1, 2, 3 ] )
+      self.assertTrue( all( g.is_valid for _, g in feats ) )
+      self.assertTrue( report.repaired == [ '3' ] )
+      self.assertTrue( report.dropped == [ '4' ] )
+
+    # The report is replayed from the cache
+    cache_dir = os.path.join( self.tmpdir, 'cache' )
+    for _ in range( 2 ):
+      report = ValidationReport()
+      dataset_extract( dataset, 'Polygon', invalid = 'repair',
+        cache_dir = cache_dir, report = report )
+      self.assertTrue( report.repaired == [ '3' ] )
+      self.assertTrue( report.dropped == [ '4' ] )
+
+    geoms, keep = validate( polys, invalid = 'skip' )
+    self.assertTrue( keep.tolist() == [ True, True, True, False, False ] )
+    geoms, keep = validate( self.polys )
+    self.assertTrue( keep is None )
+
+  ###
+  def test_filters( self ):
+    feats = dataset_extract( self.dataset, 'Polygon', 3857 )
+    region = box( 250000.0, 250000.0, 400000.0, 350000.0 )
+    expect = [ p[ 'id' ] for p, g in feats if g.intersects( region ) ]
+    self.assertTrue( expect == [ 22, 23, 32, 33 ] )
+    for workers in ( 1, 2 ):
+      got = dataset_extract( self.dataset, 'Polygon', 3857,
+        bbox = region.bounds, workers = workers )
+      self.assertTrue( [ p[ 'id' ] for p, _ in got ] == expect )
+
+    tri = Polygon( ( ( 0.5, 0.5 ), ( 3.5, 0.5 ), ( 0.5, 3.5 ) ) )
+    got = dataset_extract( self.dataset, 'Polygon', mask = tri, where = 'id < 20' )
+    self.assertTrue( [ p[ 'id' ] for p, _ in got ] == [ 0, 1, 2, 3, 10, 11, 12, 13 ] )
+
+    self.assertTrue( dataset_extract( self.dataset, 'Point' ) == [] )
+    with self.assertRaises( ValueError ):
+      dataset_extract( self.dataset, 'Polygon', bbox = region.bounds, mask = tri )
+
+  ###
+  def test_columns( self ):
+    feats = dataset_extract( self.dataset, 'Polygon', 3857, columns = [ 'name' ] )
+    self.assertTrue( feats == [ ( { 'name': p[ 'name' ] }, g )
+      for p, g in dataset_extract( self.dataset, 'Polygon', 3857 ) ] )
+
+    for workers in ( 1, 2 ):
+      feats = dataset_extract( self.dataset, 'Polygon', 3857, workers = workers,
+        columns = [], ignore_geometry = True, where = 'id >= 98' )
+      self.assertTrue( feats == [ ( {}, None ), ( {}, None ) ] )
+
+    col = ArrayFeatCol.from_dataset( self.dataset, 'Polygon', columns = [ 'id' ] )
+    self.assertTrue( list( col.columns ) == [ 'id' ] )
+    col = ArrayFeatCol.from_dataset( self.dataset, 'Polygon', columns = ( 'id', ), where = 'id >= 98' )
+    self.assertTrue( len( col ) == 2 and list( col.columns ) == [ 'id' ] )
+    with self.assertRaises( ValueError ):
+      dataset_extract( self.dataset, 'Polygon', ignore_geometry = True, bbox = ( 0, 0, 1, 1 ) )
+
+  ###
+  def test_dataset_write( self ):
+    feats = dataset_extract( self.dataset, 'Polygon' )
+    path = os.path.join( self.tmpdir, 'out.gpkg' )
+    pairs = ( ( p, Geom( g ) if p[ 'id' ] % 2 else g ) for p, g in feats )
+    self.assertTrue( dataset_write( path, pairs, chunk_size = 7 ) == 100 )
+    self.assertTrue( dataset_extract( path, 'Polygon' ) == feats )
+    with fiona.open( path ) as source:
+      self.assertTrue( source.schema == {
+        'geometry': 'Polygon', 'properties': { 'id': 'int', 'name': 'str' } } )
+
+    # Mixed single and multi parts, Feats in another srid
+    mixed = [ Feat( ( p, Geom.reproject( Geom( g ), 3857 ) ) ) for p, g in feats[ : 4 ] ]
+    mixed.append( Feat( ( { 'id': 4, 'name': None }, MultiPolygon( self.polys[ 4 : 7 : 2 ] ) ) ) )
+    path = os.path.join( self.tmpdir, 'multi.shp' )
+    self.assertTrue( dataset_write( path, mixed, srid = 4326, promote = True ) == 5 )
+    with fiona.open( path ) as source:
+      self.assertTrue( source.schema[ 'geometry' ] == 'Polygon' )
+      self.assertTrue( source.crs.to_epsg() == 4326 )
+    got = dataset_extract( path, 'Polygon' )
+    # Shapefiles do not tell single-part multi polygons from polygons
+    self.assertTrue( all( g.normalize().equals_exact( f[ 1 ].normalize(), 1e-6 )
+      for ( _, g ), f in zip( got[ : 4 ], feats ) ) )
+    self.assertTrue( got[ 4 ][ 1 ].geom_type == 'MultiPolygon' )
+
+  ###
+  def test_sjoin( self ):
+    left = [ ( { 'id': i, 'name': f"l{i}" }, p ) for i, p in enumerate( self.polys ) ]
+    right = [ ( { 'id': i }, Point( x + 0.5, y + 0.5 ).buffer( 0.8 ) )
+      for i, ( x, y ) in enumerate( ( x, y ) for x in range( 0, 10, 3 ) for y in range( 0, 10, 3 ) ) ]
+    right.append( ( { 'id': 99 }, None ) )
+
+    # The larger side is probed either way round
+    for predicate, flipped in ( ( 'intersects', 'intersects' ), ( 'contains', 'within' ),
+        ( 'within', 'contains' ), ( 'contains_properly', None ) ):
+      expect = [ [ i, j ] for i, ( _, a ) in enumerate( left )
+        for j, ( _, b ) in enumerate( right ) if b is not None and getattr( a, predicate )( b ) ]
+      pairs, _ = sjoin( left, right, predicate, chunk_size = 7, properties = False )
+      self.assertTrue( pairs.tolist() == expect )
+      if flipped:
+        pairs, _ = sjoin( right, left, flipped, chunk_size = 7, properties = False )
+        self.assertTrue( sorted( pairs[ :, ::-1 ].tolist() ) == expect )
+
+    pairs, props = sjoin( FeatCol( left ), right, chunk_size = 5 )
+    self.assertTrue( props[ 0 ] == { 'id_left': pairs[ 0, 0 ], 'name': f"l{pairs[ 0, 0 ]}", 'id_right': pairs[ 0, 1 ] } )
+    # A clash that only shows up in a later row
+    _, props3 = sjoin( [ ( { 'a': 1 }, Point( 0, 0 ) ), ( { 'name': 'l' }, Point( 5, 5 ) ) ],
+      [ ( { 'b': 2 }, Point( 0, 0 ) ), ( { 'name': 'r' }, Point( 5, 5 ) ) ] )
+    self.assertTrue( props3 == [ { 'a': 1, 'b': 2 }, { 'name_left': 'l', 'name_right': 'r' } ] )
+    pairs2, props2 = sjoin( FeatCol( left ), right, chunk_size = 5, workers = 2 )
+    self.assertTrue( pairs2.tolist() == pairs.tolist() and props2 == props )
+    with self.assertRaises( ValueError ):
+      sjoin( left, right, 'nearby' )
+
+  ###
+  def test_dissolve( self ):
+    feats = [ ( { 'col': i // 10, 'half': i % 10 < 5 }, p ) for i, p in enumerate( self.polys ) ]
+    feats.append( ( { 'col': 10, 'half': True }, None ) )
+    got = dissolve( feats, 'col', partial_size = 3 )
+    self.assertTrue( [ p for p, _ in got ] == [ { 'col': i } for i in range( 11 ) ] )
+    self.assertTrue( all( g.shape.normalize().equals( box( i, 0, i + 1, 10 ).normalize() )
+      for i, ( _, g ) in enumerate( got[ : 10 ] ) ) )
+    self.assertTrue( got[ 10 ][ 1 ] is None )
+
+    got2 = dissolve( [ Feat( f ) for f in feats ], [ 'col', 'half' ], 'Polygon',
+      promote = True, partial_size = 2, workers = 2 )
+    self.assertTrue( len( got2 ) == 21 )
+    self.assertTrue( got2[ 1 ][ 0 ] == { 'col': 0, 'half': False } )
+    self.assertTrue( got2[ 1 ][ 1 ].shape.geom_type == 'MultiPolygon' )
+    self.assertTrue( got2[ 1 ][ 1 ].shape.equals( box( 0, 5, 1, 10 ) ) )
+
+    # The srid comes from the inputs
+    merc = [ Feat( ( { 'k': 1 }, Geom( p, srid = 3857 ) ) ) for p in self.polys[ : 2 ] ]
+    self.assertTrue( dissolve( merc, 'k' )[ 0 ][ 1 ].srid == 3857 )
+    self.assertTrue( dissolve( FeatCol( feats[ : 3 ], srid = 3857 ), 'col' )[ 0 ][ 1 ].srid == 3857 )
+    self.assertTrue( got[ 0 ][ 1 ].srid == 4326 )
+    with self.assertRaises( ValueError ):
+      dissolve( merc + [ Feat( ( { 'k': 1 }, Geom( self.polys[ 5 ] ) ) ) ], 'k' )
+    with self.assertRaises( ValueError ):
+      dissolve( merc, 'k', srid = 4326 )
+
+###
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,76 @@
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from shapely.geometry import Point, box
+
+from pygis.vec.featcol import dataset_extract, dataset_write, iter_dataset
+from pygis.vec.order import curve_keys, external_sort, hilbert_keys, spatial_sort, zorder_keys
+
+###
+class OrderTestCase( unittest.TestCase ):
+
+  ### Shuffled unit squares on a 16 x 16 grid
+  def setUp( self ):
+    self.tmpdir = tempfile.mkdtemp()
+    cells = [ ( x, y ) for x in range( 16 ) for y in range( 16 ) ]
+    random.Random( 0 ).shuffle( cells )
+    self.feats = [ ( { 'id': i }, box( x, y, x + 1, y + 1 ) ) for i, ( x, y ) in enumerate( cells ) ]
+
+  ###
+  def tearDown( self ):
+    shutil.rmtree( self.tmpdir )
+
+  ###
+  def test_keys( self ):
+    x, y = np.meshgrid( np.arange( 8 ), np.arange( 8 ) )
+    x, y = x.ravel(), y.ravel()
+    d = hilbert_keys( x, y, 3 )
+    self.assertTrue( sorted( d.tolist() ) == list( range( 64 ) ) )
+    # Consecutive cells along the curve are neighbours
+    order = np.argsort( d )
+    steps = np.abs( np.diff( x[ order ] ) ) + np.abs( np.diff( y[ order ] ) )
+    self.assertTrue( ( steps == 1 ).all() )
+
+    self.assertTrue( zorder_keys( [ 0, 1, 0, 1, 2, 3 ], [ 0, 0, 1, 1, 0, 3 ] ).tolist() == [ 0, 1, 2, 3, 4, 15 ] )
+    keys = curve_keys( [ Point( 0, 0 ), None, Point( 1, 1 ) ], 'zorder' )
+    self.assertTrue( keys[ 1 ] > keys[ 2 ] > keys[ 0 ] )
+    gen = ( g for g in [ Point( 0, 0 ), None, Point( 1, 1 ) ] )
+    self.assertTrue( curve_keys( gen, 'zorder' ).tolist() == keys.tolist() )
+    with self.assertRaises( ValueError ):
+      curve_keys( [ Point( 0, 0 ) ], 'peano' )
+
+  ###
+  def test_sort( self ):
+    feats = spatial_sort( self.feats )
+    centers = np.array( [ g.centroid.coords[ 0 ] for _, g in feats ] )
+    self.assertTrue( ( np.abs( np.diff( centers, axis = 0 ) ).sum( axis = 1 ) == 1 ).all() )
+
+    chunks = [ self.feats[ i : i + 10 ] for i in range( 0, len( self.feats ), 10 ) ]
+    for curve in ( 'hilbert', 'zorder' ):
+      expect = spatial_sort( self.feats, curve, ( 0, 0, 16, 16 ) )
+      got = list( external_sort( chunks, ( 0, 0, 16, 16 ), curve, run_size = 25, tmpdir = self.tmpdir ) )
+      self.assertTrue( got == expect )
+    self.assertTrue( os.listdir( self.tmpdir ) == [] )
+
+  ###
+  def test_dataset_order( self ):
+    path = os.path.join( self.tmpdir, 'cells.shp' )
+    dataset_write( path, self.feats )
+    feats = dataset_extract( path, 'Polygon' )
+    self.assertTrue( dataset_extract( path, 'Polygon', order = 'hilbert' ) == spatial_sort( feats ) )
+    chunks = list( iter_dataset( path, 'Polygon', 3857, chunk_size = 30, order = 'hilbert', run_size = 50 ) )
+    self.assertTrue( [ len( c ) for c in chunks ] == [ 30 ] * 8 + [ 16 ] )
+    self.assertTrue( [ f for c in chunks for f in c ] ==
+      spatial_sort( dataset_extract( path, 'Polygon', 3857 ) ) )
+    with self.assertRaises( ValueError ):
+      dataset_extract( path, 'Polygon', order = 'peano' )
+
+###
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,160 @@
+
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+
+from shapely.geometry import LineString, Point, Polygon
+
+from pygis.vec.featcol import FeatCol
+from pygis.vec.tile import bounds_tiles, encode_layer, tile_bounds, write_mbtiles
+
+###
+def read_message(
+  data: bytes ) -> list:
+  """
+  Decodes a protobuf message into (field, value) pairs, length-delimited
+  values are left as bytes.
+  """
+  fields = []
+  i = 0
+  while i < len( data ):
+    key, i = read_varint( data, i )
+    field, wire = key >> 3, key & 7
+    if wire == 0:
+      value, i = read_varint( data, i )
+    elif wire == 1:
+      value, i = data[ i : i + 8 ], i + 8
+    else:
+      n, i = read_varint( data, i )
+      value, i = data[ i : i + n ], i + n
+    fields.append( ( field, value ) )
+  return fields
+
+###
+def read_varint(
+  data: bytes,
+  i: int ) -> tuple:
+  """
+  """
+  value = shift = 0
+  while True:
+    b = data[ i ]
+    i += 1
+    value |= ( b & 0x7f ) << shift
+    shift += 7
+    if b < 0x80:
+      return value, i
+
+###
+def read_packed(
+  data: bytes ) -> list:
+  """
+  """
+  values = []
+  i = 0
+  while i < len( data ):
+    v, i = read_varint( data, i )
+    values.append( v )
+  return values
+
+###
+def decode_rings(
+  commands: list ) -> list:
+  """
+  Decodes MVT geometry commands into lists of absolute vertices.
+  """
+  runs = []
+  x = y = 0
+  i = 0
+  while i < len( commands ):
+    cid, count = commands[ i ] & 7, commands[ i ] >> 3
+    i += 1
+    if cid == 7:
+      continue
+    for _ in range( count ):
+      dx, dy = commands[ i ], commands[ i + 1 ]
+      x += ( dx >> 1 ) ^ -( dx & 1 )
+      y += ( dy >> 1 ) ^ -( dy & 1 )
+      i += 2
+      if cid == 1:
+        runs.append( [] )
+      runs[ -1 ].append( ( x, y ) )
+  return runs
+
+###
+class TileTestCase( unittest.TestCase ):
+
+  ### A small grid of squares around the origin
+  def setUp( self ):
+    self.tmpdir = tempfile.mkdtemp()
+    self.feats = [
+      ( { 'id': 10 * i + j, 'name': f"f{i}{j}" },
+        Polygon( ( ( i, j ), ( i + 0.5, j ), ( i + 0.5, j + 0.5 ), ( i, j + 0.5 ) ) ) )
+      for i in range( -5, 5 ) for j in range( -5, 5 ) ]
+
+  ###
+  def tearDown( self ):
+    shutil.rmtree( self.tmpdir )
+
+  ###
+  def test_tile_math( self ):
+    self.assertTrue( np.allclose( tile_bounds( 0, 0, 0 ),
+      ( -20037508.342789244, -20037508.342789244, 20037508.342789244, 20037508.342789244 ) ) )
+    minx, miny, maxx, maxy = tile_bounds( 1, 1, 0 )
+    self.assertTrue( minx == 0.0 and miny == 0.0 )
+    tiles = bounds_tiles( np.array( [ [ -1.0, -1.0, 1.0, 1.0 ] ] ), 1 )
+    self.assertTrue( tiles.tolist() == [ [ 0, 0 ], [ 0, 1 ], [ 1, 0 ], [ 1, 1 ] ] )
+
+  ###
+  def test_encode_layer( self ):
+    square = Polygon( ( ( 0, 0 ), ( 0, 10 ), ( 10, 10 ), ( 10, 0 ) ) )
+    layer = read_message( encode_layer( 'l', [
+      ( 0, { 'a': 1, 'b': 'x' }, square ),
+      ( 1, { 'a': -2.5 }, LineString( ( ( 0, 0 ), ( 5, 5 ) ) ) ),
+      ( 2, { 'a': 1 }, Point( 3, 4 ) ),
+      ( 3, {}, Polygon( ( ( 0, 0 ), ( 1, 0 ), ( 2, 0 ) ) ) ) ] ) )
+    feats = [ read_message( v ) for f, v in layer if f == 2 ]
+    self.assertTrue( len( feats ) == 3 )
+    self.assertTrue( [ v for f, v in layer if f == 3 ] == [ b'a', b'b' ] )
+    self.assertTrue( len( [ v for f, v in layer if f == 4 ] ) == 3 )
+
+    ring = decode_rings( read_packed( dict( feats[ 0 ] )[ 4 ] ) )[ 0 ]
+    self.assertTrue( len( ring ) == 4 )
+    area = sum( x0 * y1 - x1 * y0 for ( x0, y0 ), ( x1, y1 ) in zip( ring, ring[ 1: ] + ring[ : 1 ] ) )
+    self.assertTrue( area > 0 )
+    self.assertTrue( decode_rings( read_packed( dict( feats[ 2 ] )[ 4 ] ) ) == [ [ ( 3, 4 ) ] ] )
+
+  ###
+  def test_write_mbtiles( self ):
+    path = os.path.join( self.tmpdir, 'out.mbtiles' )
+    count = write_mbtiles( FeatCol( self.feats ), path, 0, 4, workers = 1 )
+    with sqlite3.connect( path ) as db:
+      rows = db.execute( 'SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles' ).fetchall()
+      meta = dict( db.execute( 'SELECT name, value FROM metadata' ).fetchall() )
+    self.assertTrue( count == len( rows ) )
+    self.assertTrue( sorted( ( z, x, y ) for z, x, y, _ in rows if z < 2 ) ==
+      [ ( 0, 0, 0 ), ( 1, 0, 0 ), ( 1, 0, 1 ), ( 1, 1, 0 ), ( 1, 1, 1 ) ] )
+    self.assertTrue( meta[ 'format' ] == 'pbf' )
+    self.assertTrue( json.loads( meta[ 'json' ] )[ 'vector_layers' ][ 0 ][ 'fields' ] ==
+      { 'id': 'Number', 'name': 'String' } )
+
+    # Every feature shows up once at zoom 0
+    data = [ d for z, _, _, d in rows if z == 0 ][ 0 ]
+    layer = read_message( dict( read_message( gzip.decompress( data ) ) )[ 3 ] )
+    self.assertTrue( len( [ f for f, _ in layer if f == 2 ] ) == 100 )
+
+    path2 = os.path.join( self.tmpdir, 'out2.mbtiles' )
+    self.assertTrue( write_mbtiles( self.feats, path2, 0, 4, workers = 2 ) == count )
+    with sqlite3.connect( path2 ) as db:
+      rows2 = db.execute( 'SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles' ).fetchall()
+    self.assertTrue( sorted( rows2 ) == sorted( rows ) )
+
+###
+if __name__ == '__main__':
+  unittest.main()
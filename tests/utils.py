@@ -1,13 +1,19 @@
 
 from itertools import chain
+import pickle
 import unittest
 
+import shapely
 from shapely.geometry import Point, MultiPoint
 from shapely.geometry import LinearRing, LineString, MultiLineString
 from shapely.geometry import Polygon, MultiPolygon
 from shapely.geometry import GeometryCollection
+from shapely.geometry import mapping, shape
 
-from pygis.vec.geom import Geom
+from pygis.vec.geom import Geom, LODCache, ReprPolicy, reproject, transformer, zoom_tolerance
+from pygis.vec.geom import build_geometry, build_geometry_array
+from pygis.vec.geom import collection_extract, collection_extract_array
+from pygis.vec import instrument
 
 ###
 def speedups() -> bool:
@@ -89,6 +95,90 @@ class GeomTestCase( unittest.TestCase ):
     self.assertTrue( g.type == 'GeometryCollection' )
     self.assertTrue( g.is_collection )
 
+  ###
+  def test_wkb( self ):
+    for geom in self.geoms + ( GeometryCollection( self.geoms ), ):
+      g = Geom( geom )
+      w = Geom( g.wkb )
+      self.assertTrue( w.wkb is g.wkb )
+      self.assertTrue( w == g )
+      self.assertTrue( hash( w ) == hash( g ) )
+      self.assertTrue( w.shape == geom )
+      self.assertTrue( Geom( w.geojson ).shape == geom )
+      self.assertTrue( Geom( w.dict ).wkb == g.wkb )
+
+      p = pickle.loads( pickle.dumps( g ) )
+      self.assertTrue( p == g )
+      self.assertTrue( p.srid == g.srid )
+
+    g = Geom( self.pnt1.wkb )
+    g.shape = self.pnt2
+    self.assertTrue( g.wkb == self.pnt2.wkb )
+    self.assertFalse( g == Geom( self.pnt2, srid = 3857 ) )
+
+    # Big-endian WKB compares and hashes like the shape it encodes
+    a = Geom( shapely.to_wkb( Point( 1, 2 ), byte_order = 0 ) )
+    b = Geom( Point( 1, 2 ) )
+    self.assertTrue( a == b and hash( a ) == hash( b ) )
+    a.wkb, b.wkb
+    self.assertTrue( a == b and len( { a, b } ) == 1 )
+
+  ###
+  def test_repr_policy( self ):
+    policy = ReprPolicy( 4096, canonical = 'shape' )
+    gseq = [ Geom( Polygon( ( ( i, 0 ), ( i + 1, 0 ), ( i + 1, 1 ) ) ) ) for i in range( 50 ) ]
+    for g in gseq:
+      g.policy = policy
+      self.assertTrue( g.dict[ 'type' ] == 'Polygon' )
+      self.assertTrue( g.geojson )
+      self.assertTrue( policy.total <= policy.budget )
+    self.assertTrue( policy.evictions > 0 )
+    self.assertTrue( all( 'shape' in g.representations() for g in gseq ) )
+    self.assertTrue( policy.usage()[ 'shape' ] == 0 )
+
+    # Evicted representations are rebuilt from the canonical one
+    self.assertTrue( Geom( gseq[ 0 ].geojson ).shape == gseq[ 0 ].shape )
+
+    # The only representation is never dropped
+    g = Geom( self.pnt1 )
+    self.assertFalse( g.discard( 'shape' ) )
+    g.wkb
+    self.assertTrue( set( g.nbytes() ) == { 'shape', 'wkb' } )
+    self.assertTrue( g.discard( 'shape' ) )
+    self.assertTrue( g.shape == self.pnt1 )
+
+    # Dropped geometries stop counting against the budget
+    del gseq, g
+    self.assertTrue( policy.total == 0 )
+
+  ###
+  def test_lod_cache( self ):
+    # Opt-in, nothing is cached unless a cache is installed or passed
+    self.assertTrue( Geom.lod_cache is None )
+    circle = Point( -93.0, 42.0 ).buffer( 0.5, 256 )
+    cache = LODCache( 1 << 20 )
+    g = Geom( circle )
+    coarse = g.simplified( zoom = 6, cache = cache )
+    self.assertTrue( len( coarse.exterior.coords ) < len( circle.exterior.coords ) )
+    self.assertTrue( g.simplified( zoom = 5.2, cache = cache ) is coarse )
+    self.assertTrue( g.simplified( tolerance = zoom_tolerance( 6, 4326 ) * 1.5, cache = cache ) is coarse )
+    self.assertTrue( cache.hits == 2 and cache.misses == 1 )
+    self.assertTrue( g.simplified( zoom = 30, cache = cache ) is g.shape )
+    self.assertTrue( cache.levels( g ) == [ 6, 30 ] )
+
+    # Replacing the geometry invalidates its versions
+    g.shape = Point( 0.0, 0.0 ).buffer( 0.5, 256 )
+    self.assertTrue( cache.levels( g ) == [] and cache.total == 0 )
+
+    # Memory stays bounded, dead geometries are dropped
+    gseq = [ Geom( Point( i, 0.0 ).buffer( 0.4, 256 ) ) for i in range( 200 ) ]
+    cache = LODCache( 20000 )
+    for g in gseq:
+      g.simplified( zoom = 8, cache = cache )
+    self.assertTrue( cache.total <= cache.budget and cache.evictions > 0 )
+    del gseq, g
+    self.assertTrue( cache.total == 0 )
+
   ###
   def test_multi( self ):
     g = Geom( self.pnt1 )
@@ -106,6 +196,23 @@ class GeomTestCase( unittest.TestCase ):
     g.multi()
     self.assertTrue( g.type == 'MultiPolygon' )
 
+  ###
+  def test_calling_conventions( self ):
+    g = Geom( self.pnt1, srid = 3857 )
+    self.assertFalse( hasattr( g, '__dict__' ) )
+
+    m = Geom.multi( g )
+    self.assertTrue( m.type == 'MultiPoint' and m.srid == 3857 )
+    self.assertTrue( g.type == 'Point' )
+    self.assertTrue( g.multi() is None )
+    self.assertTrue( g.type == 'MultiPoint' )
+
+    g = Geom( GeometryCollection( self.geoms ) )
+    self.assertTrue( Geom.collection_extract( g, 'Polygon' ) == g.collection_extract( 'Polygon' ) )
+
+    with self.assertRaises( TypeError ):
+      Geom( 1 )
+
   ###
   def test_build_geometry( self ):
     gseq = ( Geom( p ) for p in self.pnts )
@@ -141,12 +248,102 @@ class GeomTestCase( unittest.TestCase ):
     for p in glst:
       self.assertTrue( p.type == 'Polygon' )
 
+  ###
+  def test_collection_extract_array( self ):
+    gseq = [
+      GeometryCollection( self.geoms ),
+      None,
+      self.pnt1,
+      GeometryCollection( ( MultiPolygon( self.polys ), GeometryCollection( self.lstrs ) ) ) ]
+    for gtype in ( 'Point', 'LineString', 'Polygon' ):
+      parts, index = collection_extract_array( gseq, gtype )
+      expect = [ ( i, p ) for i, g in enumerate( gseq ) for p in collection_extract( g, gtype ) ]
+      self.assertTrue( index.tolist() == [ i for i, _ in expect ] )
+      self.assertTrue( list( parts ) == [ p for _, p in expect ] )
+
+  ###
+  def test_build_geometry_array( self ):
+    gseq = self.pnts + self.lstrs + self.polys + ( GeometryCollection( self.geoms ), None )
+    index = [ 0 ] * 8 + [ 1 ] * 8 + [ 2, 3, 4, 4 ]
+    glst = build_geometry_array( gseq, index, size = 6 )
+    self.assertTrue( [ g and g.geom_type for g in glst ] == [
+      'MultiPoint', 'MultiLineString', 'Polygon', 'Polygon', 'GeometryCollection', None ] )
+    for i, g in enumerate( glst[ : 5 ] ):
+      self.assertTrue( g == build_geometry( [ h for h, j in zip( gseq, index ) if j == i ] ) )
+
+    self.assertTrue( build_geometry_array( self.geoms )[ 0 ] == build_geometry( self.geoms ) )
+
   ###
   def test_reproject( self ):
     g = Geom( self.poly2, srid = 4326 )
     g.reproject( 3857 )
     self.assertTrue( g.srid == 3857 )
 
+    # Rounded output agrees between the dict, instance, class and batch paths
+    pnt = Point( 1.123, 2.987 )
+    expect = reproject( pnt, 4326, 3857, precision = 1 )
+    self.assertTrue( expect.x == round( expect.x, 1 ) )
+    self.assertTrue( shape( reproject( mapping( pnt ), 4326, 3857, precision = 1 ) ) == expect )
+    self.assertTrue( Geom.reproject( Geom( pnt ), 3857, precision = 1 ).shape == expect )
+    g = Geom( pnt )
+    g.reproject( 3857, precision = 1 )
+    self.assertTrue( g.shape == expect )
+    g = Geom( pnt )
+    g.reproject( 4326, precision = 1 )
+    self.assertTrue( g.shape == Point( 1.1, 3.0 ) )
+
+  ###
+  def test_reproject_many( self ):
+    gseq = [ Geom( g, srid = 4326 ) for g in self.geoms ]
+    glst = Geom.reproject_many( gseq, 3857 )
+    self.assertTrue( len( glst ) == len( gseq ) )
+    for g, r in zip( gseq, glst ):
+      self.assertTrue( r.srid == 3857 )
+      self.assertTrue( r.type == g.type )
+      self.assertTrue( r.shape.equals_exact( Geom.reproject( g, 3857 ).shape, 1e-9 ) )
+
+  ###
+  def test_transformer_cache( self ):
+    transformer.cache_clear()
+    g = Geom( self.poly2, srid = 4326 )
+    Geom.reproject( g, 3857 )
+    Geom.reproject( g, 3857 )
+    info = transformer.cache_info()
+    self.assertTrue( info.misses == 1 )
+    self.assertTrue( info.hits == 1 )
+    self.assertTrue( transformer( 4326, 4326 ).identity )
+
+    d = g.dict
+    g.reproject( 4326 )
+    self.assertTrue( g.dict is d )
+
+  ###
+  def test_instrument( self ):
+    events = []
+    hook = lambda kind, name, seconds: events.append( ( kind, name ) )
+    self.assertTrue( not instrument.enabled() )
+    with instrument.measure() as stats:
+      self.assertTrue( instrument.enabled() )
+      g = Geom( self.poly2 )
+      g.wkb
+      g.wkb
+      g.dict
+      with instrument.measure() as inner:
+        Geom( g.wkb ).shape
+      instrument.add_hook( hook )
+      Geom.reproject( g, 3857 )
+      instrument.remove_hook( hook )
+    self.assertTrue( not instrument.enabled() )
+    self.assertTrue( stats.conversions[ 'shape->wkb' ] == 1 )
+    self.assertTrue( stats.conversions[ 'shape->dict' ] == 1 )
+    self.assertTrue( stats.conversions[ 'wkb->shape' ] == 1 )
+    self.assertTrue( stats.hits[ 'wkb' ] == 2 )
+    self.assertTrue( stats.calls[ 'reproject' ] == 1 )
+    self.assertTrue( inner.conversions[ 'wkb->shape' ] == 1 )
+    self.assertTrue( inner.conversions[ 'shape->wkb' ] == 0 )
+    self.assertTrue( ( 'reproject', 'reproject' ) in events )
+    self.assertTrue( Geom.__dict__[ 'wkb' ].fget.__name__ == 'wkb' )
+
 ###
 if __name__ == '__main__':
   unittest.main()